@@ -1,12 +1,13 @@
 import asyncio
 
-from apscheduler.triggers.cron import CronTrigger
 from fastapi import FastAPI, Depends
 from prometheus_fastapi_instrumentator import Instrumentator
 
-from config.jwt_bearer import JWTBearer
+from config.jwt_bearer import jwt_bearer
 from monitoring.fastapi_metrics import app_info
-from config.config import initiate_database
+from config.config import close_database, get_database, initiate_database
+from database.cache import invalidation_bus
+from database.indexes import report_missing_indexes
 from routes.admin import router as AdminRouter
 from routes.auth import router as AuthRouter
 from routes.media import router as MediaRouter
@@ -14,35 +15,33 @@ from routes.routine import router as RoutineRouter
 from routes.user import router as UserRouter
 from routes.couple import router as CoupleRouter
 from routes.gemini import router as GeminiRouter
-from service.routine_service import cron_notification, reset_sessions_status, mark_not_done
-from service.tracker_service import update_all_users_streaks
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from service.scheduler_service import leader, start_scheduler
 from routes.predict import router as PredictRouter
 from routes.tracker import router as TrackerRouter
 from routes.request import router as RequestRouter
 app = FastAPI()
-token_listener = JWTBearer()
+# Shared with get_principal, so each request's token is checked once
+token_listener = jwt_bearer
 
 # Initialize Prometheus metrics
 instrumentator = Instrumentator()
 instrumentator.instrument(app).expose(app)
 
-def start_scheduler():
+@app.on_event("startup")
+async def on_startup():
     try:
-        scheduler = AsyncIOScheduler()
-        scheduler.add_job(lambda: cron_notification.delay(), CronTrigger(second=0), id="cron_notification")
-        scheduler.add_job(lambda: mark_not_done.delay(), CronTrigger(second=10), id="mark_not_done")
-        scheduler.add_job(lambda: reset_sessions_status.delay(), CronTrigger(hour=0, minute=0), id="reset_sessions_status")
-        scheduler.add_job(lambda: update_all_users_streaks.delay(), CronTrigger(hour=0, minute=0), id="update_all_users_streaks")
-        scheduler.start()
+        start_scheduler()
     except Exception as e:
         print(f"Error starting scheduler: {e}")
-
-
-@app.on_event("startup")
-async def on_startup():
-    start_scheduler()
     await initiate_database()
+    await report_missing_indexes(get_database())
+    await invalidation_bus.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await leader.release()
+    await invalidation_bus.stop()
+    close_database()
 
 @app.get("/", tags=["Root"])
 async def read_root():
@@ -1,4 +1,5 @@
 from typing import Optional
+import asyncio
 import os
 
 from beanie import init_beanie
@@ -10,10 +11,21 @@ import models as models
 class Settings(BaseSettings):
     # database configurations
     DATABASE_URL: Optional[str] = None
+    DATABASE_MAX_POOL_SIZE: Optional[int] = 50
+    DATABASE_MIN_POOL_SIZE: Optional[int] = 5
+    DATABASE_MAX_IDLE_TIME_MS: Optional[int] = 300000
+    DATABASE_CONNECT_TIMEOUT_MS: Optional[int] = 5000
+    DATABASE_SERVER_SELECTION_TIMEOUT_MS: Optional[int] = 5000
+    DATABASE_SOCKET_TIMEOUT_MS: Optional[int] = 30000
+    # Compressors the server does not support, or whose library is missing, are skipped
+    DATABASE_COMPRESSORS: Optional[str] = "zstd,snappy,zlib"
     REDIS_URL: Optional[str] = None
     secret_key:Optional[str] = None
     algorithm: Optional[str] = None
     push_notification_url: Optional[str] = None
+    push_notification_concurrency: Optional[int] = 4
+    cron_shard_size: Optional[int] = 1000
+    cron_max_shards: Optional[int] = 16
     SENDER_EMAIL: Optional[str] = None
     SENDER_PASSWORD: Optional[str] = None
     SMTP_SERVER: Optional[str] = None
@@ -32,8 +44,65 @@ class Settings(BaseSettings):
         from_attributes = True
 
 
+_client: Optional[AsyncIOMotorClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_client_pid: Optional[int] = None
+_beanie_initialized = False
+
+
+def create_client(settings: Settings) -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(
+        settings.DATABASE_URL,
+        maxPoolSize=settings.DATABASE_MAX_POOL_SIZE,
+        minPoolSize=settings.DATABASE_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.DATABASE_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=settings.DATABASE_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.DATABASE_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=settings.DATABASE_SOCKET_TIMEOUT_MS,
+        compressors=settings.DATABASE_COMPRESSORS or None,
+    )
+
+
+def get_client() -> AsyncIOMotorClient:
+    """
+    Return the process's Motor client, creating it on first use.
+
+    The client is bound to the event loop it was first used on, so a new
+    one is created (and Beanie re-initialized) only when the loop or the
+    process changes, e.g. after a fork or in a script calling asyncio.run twice.
+    """
+    global _client, _client_loop, _client_pid, _beanie_initialized
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop or _client_pid != os.getpid():
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = create_client(Settings())
+        _client_loop = loop
+        _client_pid = os.getpid()
+        _beanie_initialized = False
+    return _client
+
+
+def get_database():
+    return get_client().get_default_database()
+
+
 async def initiate_database():
-    client = AsyncIOMotorClient(Settings().DATABASE_URL)
+    """Initialize Beanie on the shared client; later calls are no-ops."""
+    global _beanie_initialized
+    client = get_client()
+    if _beanie_initialized:
+        return client
     await init_beanie(
         database=client.get_default_database(), document_models=models.__all__
     )
+    _beanie_initialized = True
+    return client
+
+
+def close_database():
+    global _client, _client_loop, _client_pid, _beanie_initialized
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+    _client = _client_loop = _client_pid = None
+    _beanie_initialized = False
@@ -1,15 +1,46 @@
-from fastapi import Request, HTTPException
+from typing import Optional
+
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
+from fastapi import Depends, Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pydantic import BaseModel
 
 from .jwt_handler import decode_jwt
 
 
-def verify_jwt(jwtoken: str) -> bool:
-    payload = decode_jwt(jwtoken)
-    return bool(payload)
+class Principal(BaseModel):
+    """The authenticated user of a request, as read from their token."""
+    user_id: PydanticObjectId
+    role: Optional[str] = None
+    email: Optional[str] = None
+
+    class Config:
+        frozen = True
+
+
+def principal_from_token(token: str) -> Principal:
+    """
+    Decode a token into its principal.
+
+    Raises:
+        HTTPException: 401 if the token is invalid or expired, 400 if it has no valid user id
+    """
+    payload = decode_jwt(token)
+    try:
+        return Principal(user_id=PydanticObjectId(payload["sub"]), role=payload.get("role"), email=payload.get("email"))
+    except (KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid token: user_id not found")
 
 
 class JWTBearer(HTTPBearer):
+    """
+    Require a valid bearer token and return it.
+
+    The token is decoded once per request: its principal is kept on
+    request.state for every later dependency, such as get_principal.
+    """
+
     def __init__(self, auto_error: bool = True):
         super().__init__(auto_error=auto_error)
 
@@ -20,9 +51,16 @@ class JWTBearer(HTTPBearer):
                 status_code=403, detail="Invalid authentication token"
             )
 
-        if not verify_jwt(credentials.credentials):
-            raise HTTPException(
-                status_code=403, detail="Invalid token or expired token"
-            )
+        if getattr(request.state, "token", None) != credentials.credentials:
+            request.state.principal = principal_from_token(credentials.credentials)
+            request.state.token = credentials.credentials
 
         return credentials.credentials
+
+
+jwt_bearer = JWTBearer()
+
+
+async def get_principal(request: Request, token: str = Depends(jwt_bearer)) -> Principal:
+    """Dependency returning the authenticated user of the request."""
+    return request.state.principal
@@ -1,9 +1,12 @@
 import jwt
+import threading
 import time
 from datetime import datetime, timedelta
 from typing import Dict
+from cachetools import LRUCache
 from fastapi import HTTPException
 from config.config import Settings
+from monitoring.fastapi_metrics import increment_cache_request
 
 # Khai báo bí mật và thuật toán
 secret_key = Settings().secret_key  # Đảm bảo bảo mật
@@ -31,17 +34,41 @@ def sign_jwt(user_id: str, role: str, email: str, phone: str) -> Dict[str, str]:
     return token_response(token)
 
 
+# Token đã kiểm tra chữ ký, dùng lại cho đến khi hết hạn
+VERIFIED_TOKEN_CACHE_SIZE = 10000
+_verified_tokens: LRUCache = LRUCache(maxsize=VERIFIED_TOKEN_CACHE_SIZE)
+_verified_tokens_lock = threading.Lock()
+
+
 # Hàm giải mã JWT
 def decode_jwt(token: str) -> dict:
-    try:
-        decoded_token = jwt.decode(token, secret_key, algorithms=[ALGORITHM])
+    """
+    Decode a token, verifying its signature only the first time it is seen.
 
-        if decoded_token["exp"] < time.time():
-            raise HTTPException(status_code=401, detail="Token has expired")
+    Recently verified tokens are kept in an LRU until they expire, so the
+    HMAC check runs once per token rather than once per request.
 
-        return decoded_token
+    Raises:
+        HTTPException: 401 if the token is invalid or expired
+    """
+    with _verified_tokens_lock:
+        payload = _verified_tokens.get(token)
+    if payload is not None:
+        if payload["exp"] > time.time():
+            increment_cache_request("jwt", "local_hit")
+            return dict(payload)
+        with _verified_tokens_lock:
+            _verified_tokens.pop(token, None)
+        raise HTTPException(status_code=401, detail="Token has expired")
 
+    increment_cache_request("jwt", "miss")
+    try:
+        payload = jwt.decode(token, secret_key, algorithms=[ALGORITHM], options={"require": ["exp"]})
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    with _verified_tokens_lock:
+        _verified_tokens[token] = payload
+    return dict(payload)
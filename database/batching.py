@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Type
+
+from beanie import Document, PydanticObjectId
+from pydantic import BaseModel
+
+from monitoring.fastapi_metrics import record_background_job_batch_duration
+
+
+async def iter_batches(
+    document: Type[Document],
+    query: Optional[Dict[str, Any]] = None,
+    projection_model: Optional[Type[BaseModel]] = None,
+    batch_size: int = 500,
+) -> AsyncIterator[List[Any]]:
+    """
+    Iterate over a collection in `_id` order, one batch at a time.
+
+    Each batch is fetched with an `_id > last seen` condition instead of
+    skip/limit, so every page is an index range scan.
+
+    Args:
+        document: Beanie document class to read
+        query: Optional filter on the documents
+        projection_model: Optional projection model; it must expose `id`
+        batch_size: Number of documents per batch
+
+    Yields:
+        Lists of documents (or projections) of at most batch_size items
+    """
+    last_id: Optional[PydanticObjectId] = None
+    while True:
+        conditions = [query or {}]
+        if last_id is not None:
+            conditions.append({"_id": {"$gt": last_id}})
+
+        batch = await document.find(
+            *conditions, projection_model=projection_model
+        ).sort("_id").limit(batch_size).to_list()
+        if not batch:
+            return
+
+        yield batch
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1].id
+
+
+async def process_in_batches(
+    document: Type[Document],
+    handler: Callable[[Any], Awaitable[Any]],
+    job: str,
+    query: Optional[Dict[str, Any]] = None,
+    projection_model: Optional[Type[BaseModel]] = None,
+    batch_size: int = 500,
+    concurrency: int = 10,
+) -> int:
+    """
+    Run an async handler over every matching document with bounded concurrency.
+
+    Args:
+        document: Beanie document class to read
+        handler: Coroutine function called with each document
+        job: Job name used for the per-batch timing metric
+        query: Optional filter on the documents
+        projection_model: Optional projection model; it must expose `id`
+        batch_size: Number of documents per batch
+        concurrency: Maximum number of handlers running at once
+
+    Returns:
+        int: Number of documents processed
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item):
+        async with semaphore:
+            await handler(item)
+
+    processed = 0
+    async for batch in iter_batches(document, query, projection_model, batch_size):
+        started = time.monotonic()
+        await asyncio.gather(*[run(item) for item in batch])
+        record_background_job_batch_duration(job, time.monotonic() - started)
+        processed += len(batch)
+    return processed
@@ -0,0 +1,332 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Iterable, Optional, Type, TypeVar
+
+from cachetools import TTLCache
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from config.config import Settings
+from database.redis_client import get_redis
+from models.routine import Routine
+from monitoring.fastapi_metrics import increment_cache_invalidation, increment_cache_request
+from schemas.user import UserProfile
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Bumps the version stamp, evicts the key (or moves to a new generation when
+# no key is given) and announces it, atomically so messages arrive in version order
+INVALIDATE_SCRIPT = """
+local version = redis.call('incr', KEYS[1])
+if ARGV[3] == '' then
+    redis.call('incr', KEYS[2])
+else
+    local generation = redis.call('get', KEYS[2]) or '0'
+    redis.call('del', 'cache:' .. ARGV[2] .. ':' .. generation .. ':' .. ARGV[3])
+end
+redis.call('publish', ARGV[1], cjson.encode({cache = ARGV[2], key = ARGV[3], version = version}))
+return version
+"""
+
+# Fills a key unless the version stamp moved since the value was read, so a
+# write invalidated while the value was loading is not cached
+FILL_SCRIPT = """
+if (redis.call('get', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('set', KEYS[2], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+
+class DocumentCache:
+    """
+    Read-through cache of serialized models, keyed by id.
+
+    An in-process LRU sits in front of Redis. Values are kept as JSON and
+    validated on every hit, so each caller gets its own copy.
+
+    Every invalidation bumps a version stamp in Redis and is published on
+    the invalidation bus, which evicts the entry in every process. The
+    stamp is re-read at most every `stamp_interval` seconds; a process that
+    finds it ahead of the last version it saw has missed a message and
+    drops its whole local tier, so a lost message serves stale data for at
+    most `stamp_interval` seconds.
+
+    A value loaded on a miss is only cached if nothing was invalidated while
+    it was loading, in this process or (through the version stamp) in any other.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model: Type[ModelT],
+        ttl: int = 300,
+        local_ttl: float = 30,
+        local_maxsize: int = 10000,
+        stamp_interval: float = 5,
+    ):
+        self.name = name
+        self.model = model
+        self.ttl = ttl
+        self.stamp_interval = stamp_interval
+        self._local = TTLCache(maxsize=local_maxsize, ttl=local_ttl)
+        self._generation: Optional[int] = None
+        self._version: Optional[int] = None
+        self._stamps_at = 0.0
+        self._redis_enabled: Optional[bool] = None
+        # Local evictions so far, checked around a load
+        self._evictions = 0
+
+    @property
+    def generation_key(self) -> str:
+        return f"cache:{self.name}:generation"
+
+    @property
+    def version_key(self) -> str:
+        return f"cache:{self.name}:version"
+
+    def _redis_key(self, generation: int, key: str) -> str:
+        return f"cache:{self.name}:{generation}:{key}"
+
+    def _redis(self):
+        if self._redis_enabled is None:
+            self._redis_enabled = bool(Settings().REDIS_URL)
+        return get_redis() if self._redis_enabled else None
+
+    async def _sync_stamps(self, redis) -> int:
+        """Re-read the generation and version stamps when they are due, and return the generation."""
+        now = time.monotonic()
+        if self._generation is None or now - self._stamps_at > self.stamp_interval:
+            generation, version = await redis.mget(self.generation_key, self.version_key)
+            self._generation = int(generation or 0)
+            self._stamps_at = now
+            self.apply_invalidation(int(version or 0))
+        return self._generation
+
+    def expire_stamps(self):
+        """Re-read the stamps on the next lookup."""
+        self._stamps_at = 0.0
+
+    def apply_invalidation(self, version: int, key: Optional[str] = None, source: str = "stamp"):
+        """
+        Evict local entries for an invalidation seen on the bus or through the version stamp.
+
+        Args:
+            version: Version stamp after the invalidation
+            key: Evicted key, None when the whole cache was invalidated or when
+                only the stamp was read
+            source: Where the invalidation was seen, for the metrics
+        """
+        seen = self._version
+        self._version = version if seen is None else max(seen, version)
+
+        if source == "bus":
+            self._evictions += 1
+            if key is None:
+                self._local.clear()
+            else:
+                self._local.pop(key, None)
+            increment_cache_invalidation(self.name, source)
+            if key is None or seen is None:
+                return
+            # A key message is exactly one version ahead unless one was lost
+            expected = seen + 1
+        elif seen is None:
+            return
+        else:
+            expected = seen
+
+        if version > expected:
+            self._evictions += 1
+            self._local.clear()
+            increment_cache_invalidation(self.name, "missed")
+
+    async def get(self, key, loader: Callable[[], Awaitable[Optional[ModelT]]]) -> Optional[ModelT]:
+        """
+        Return the cached value for a key, loading and caching it on a miss.
+
+        Args:
+            key: Cache key, usually a document id
+            loader: Coroutine function reading the value from MongoDB
+
+        Returns:
+            The value, or None if the loader found nothing (misses are not cached)
+        """
+        key = str(key)
+        redis = self._redis()
+        generation = None
+        if redis is not None:
+            try:
+                generation = await self._sync_stamps(redis)
+            except RedisError as e:
+                logger.warning(f"Cache {self.name} stamp read failed: {str(e)}")
+                redis = None
+
+        raw = self._local.get(key)
+        if raw is not None:
+            increment_cache_request(self.name, "local_hit")
+            return self.model.model_validate_json(raw)
+
+        if redis is not None:
+            try:
+                raw = await redis.get(self._redis_key(generation, key))
+            except RedisError as e:
+                logger.warning(f"Cache {self.name} read failed: {str(e)}")
+                redis = None
+            if raw is not None:
+                self._local[key] = raw
+                increment_cache_request(self.name, "redis_hit")
+                return self.model.model_validate_json(raw)
+
+        increment_cache_request(self.name, "miss")
+        evictions = self._evictions
+        if redis is not None:
+            try:
+                # Read with the stamp the fill is checked against
+                generation, version = await redis.mget(self.generation_key, self.version_key)
+                generation, version = int(generation or 0), int(version or 0)
+            except RedisError as e:
+                logger.warning(f"Cache {self.name} stamp read failed: {str(e)}")
+                redis = None
+
+        value = await loader()
+        if value is None:
+            return None
+
+        raw = value.model_dump_json(by_alias=True)
+        filled = True
+        if redis is not None:
+            try:
+                filled = bool(await redis.eval(
+                    FILL_SCRIPT, 2, self.version_key, self._redis_key(generation, key), version, raw, self.ttl
+                ))
+            except RedisError as e:
+                logger.warning(f"Cache {self.name} write failed: {str(e)}")
+        if filled and self._evictions == evictions:
+            self._local[key] = raw
+        return value
+
+    async def _publish(self, key: str):
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            await redis.eval(
+                INVALIDATE_SCRIPT, 2, self.version_key, self.generation_key,
+                INVALIDATION_CHANNEL, self.name, key
+            )
+        except RedisError as e:
+            logger.warning(f"Cache {self.name} invalidation of '{key}' failed: {str(e)}")
+
+    async def invalidate(self, key):
+        """Evict one key after its document was written, in every process."""
+        key = str(key)
+        self._evictions += 1
+        self._local.pop(key, None)
+        increment_cache_invalidation(self.name, "write")
+        await self._publish(key)
+
+    async def invalidate_many(self, keys: Iterable):
+        """Evict several keys after a bulk write, in every process, in one Redis round trip."""
+        keys = list(dict.fromkeys(str(key) for key in keys))
+        if not keys:
+            return
+        self._evictions += 1
+        for key in keys:
+            self._local.pop(key, None)
+            increment_cache_invalidation(self.name, "write")
+
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.eval(
+                        INVALIDATE_SCRIPT, 2, self.version_key, self.generation_key,
+                        INVALIDATION_CHANNEL, self.name, key
+                    )
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Cache {self.name} invalidation of {len(keys)} keys failed: {str(e)}")
+
+    async def invalidate_all(self):
+        """Evict every key after a bulk write, in every process."""
+        self._evictions += 1
+        self._local.clear()
+        increment_cache_invalidation(self.name, "write")
+        await self._publish("")
+
+
+class InvalidationBus:
+    """
+    Listens for cache invalidations published by any process and evicts the
+    matching local entries.
+
+    The listener runs as a task on the process's event loop and resubscribes
+    after Redis errors. Messages published while it was not subscribed are
+    caught by the caches' version stamps.
+    """
+
+    def __init__(self, caches: Iterable[DocumentCache], channel: str = INVALIDATION_CHANNEL, retry_delay: float = 1.0):
+        self.caches = {cache.name: cache for cache in caches}
+        self.channel = channel
+        self.retry_delay = retry_delay
+        self._task: Optional[asyncio.Task] = None
+
+    def handle(self, data: str):
+        """Apply one invalidation message."""
+        try:
+            message = json.loads(data)
+            cache = self.caches.get(message["cache"])
+            if cache is not None:
+                cache.apply_invalidation(int(message["version"]), message["key"] or None, source="bus")
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed cache invalidation {data!r}: {str(e)}")
+
+    async def _listen(self):
+        while True:
+            pubsub = get_redis().pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                for cache in self.caches.values():
+                    cache.expire_stamps()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.handle(message["data"])
+            except RedisError as e:
+                logger.warning(f"Cache invalidation bus disconnected: {str(e)}")
+                await asyncio.sleep(self.retry_delay)
+            finally:
+                await pubsub.aclose()
+
+    async def start(self):
+        """Start listening on the running event loop; a no-op without REDIS_URL."""
+        if not Settings().REDIS_URL or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._listen())
+        logger.info(f"Cache invalidation bus listening on '{self.channel}'")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+# Routines keyed by user_id, user profiles (no password) keyed by user id
+routine_cache = DocumentCache("routine", Routine)
+user_cache = DocumentCache("user", UserProfile)
+
+invalidation_bus = InvalidationBus([routine_cache, user_cache])
@@ -1,19 +1,25 @@
 from celery import Celery, signals
-from config.config import Settings, initiate_database
+from config.config import Settings, close_database, initiate_database
 from config.logging_config import setup_logging
+from database.cache import invalidation_bus
 import asyncio
+import logging
+import os
+import threading
 
 # Celery metrics monitoring removed - focusing on FastAPI only
 
 setup_logging()  
 
+logger = logging.getLogger(__name__)
+
 def make_celery():
     settings = Settings()
     celery_app = Celery(
         "worker",
         broker=settings.REDIS_URL,
         backend=settings.REDIS_URL,
-        include=["service.routine_service", "service.tracker_service"]
+        include=["service.routine_service", "service.tracker_service", "service.push_receipt_service"]
     )
 
     celery_app.conf.update(
@@ -30,15 +36,83 @@ def make_celery():
 
 celery_app = make_celery()
 
+
+class WorkerRuntime:
+    """
+    Long-lived asyncio runtime shared by all tasks of a worker process.
+
+    The event loop runs in a background thread for the life of the process,
+    and the database (one Motor client and its connection pool) is
+    initialized on it once. Tasks submit coroutines with `run`, from any
+    pool thread. A forked child starts its own runtime on first use.
+    """
+
+    def __init__(self, initializer=initiate_database):
+        self.initializer = initializer
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="worker-async-runtime", daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self.initializer(), loop).result()
+        except Exception:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            raise
+        self._loop, self._thread, self._pid = loop, thread, os.getpid()
+        logger.info(f"Worker async runtime started in process {self._pid}")
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # Threads do not survive fork, so a child must not reuse the parent's loop
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._start()
+            return self._loop
+
+    @staticmethod
+    async def _close():
+        await invalidation_bus.stop()
+        close_database()
+
+    def run(self, coro):
+        """Run a coroutine on the runtime loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.get_loop()).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                return
+            asyncio.run_coroutine_threadsafe(self._close(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            if not self._loop.is_running():
+                self._loop.close()
+            self._loop = self._thread = self._pid = None
+
+
+runtime = WorkerRuntime()
+
+
+def run_async(coro):
+    """Run a task's coroutine on the worker's shared event loop."""
+    return runtime.run(coro)
+
+
 @signals.worker_process_init.connect
 def init_worker(**kwargs):
-    """Initialize the database when the worker starts."""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(initiate_database())
-    finally:
-        loop.close()
+    """Start the async runtime, initialize the database and listen for cache invalidations."""
+    runtime.run(invalidation_bus.start())
+
+@signals.worker_process_shutdown.connect
+def shutdown_worker(**kwargs):
+    """Stop the async runtime when the worker process exits."""
+    runtime.shutdown()
 
 if __name__ == "__main__":
-    celery_app.start()
\ No newline at end of file
+    celery_app.start()
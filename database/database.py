@@ -1,10 +1,15 @@
 from typing import Optional
+from datetime import date
 from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
 from models.admin import Admin
 from models.tracker import Tracker
 from models.user import User
 from models.routine import Routine
 from models.request import Request
+from models.job import JobCheckpoint
+from database.cache import user_cache
+from service.snapshot_service import refresh_partner_snapshot
 from pydantic import BaseModel
 
 
@@ -13,6 +18,7 @@ user_collection = User
 routine_collection = Routine
 tracker_collection = Tracker
 request_collection = Request
+job_checkpoint_collection = JobCheckpoint
 
 # Thêm người dùng mới
 async def add_admin(new_admin: Admin) -> Admin:
@@ -35,6 +41,20 @@ async def add_request(new_request: Request) -> Request:
     request = await new_request.create()
     return request
 
+async def get_or_create_checkpoint(job: str, run_date: date) -> JobCheckpoint:
+    checkpoint = await job_checkpoint_collection.find_one(
+        JobCheckpoint.job == job, JobCheckpoint.run_date == run_date
+    )
+    if checkpoint is None:
+        try:
+            checkpoint = await JobCheckpoint(job=job, run_date=run_date).create()
+        except DuplicateKeyError:
+            # Another worker created it first
+            checkpoint = await job_checkpoint_collection.find_one(
+                JobCheckpoint.job == job, JobCheckpoint.run_date == run_date
+            )
+    return checkpoint
+
 async def update_user_data(id: PydanticObjectId, data: dict) -> Optional[User]:
     des_body = {k: v for k, v in data.items() if v is not None}
     
@@ -47,6 +67,8 @@ async def update_user_data(id: PydanticObjectId, data: dict) -> Optional[User]:
     if not user:
         raise ValueError(f"User with ID {id} not found.")
     await user.update(update_query)
+    await user_cache.invalidate(id)
+    await refresh_partner_snapshot(id, event="profile")
     return user
 
 
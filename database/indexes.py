@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import sys
+from typing import Dict, List, Optional, Tuple, Type
+
+from beanie import Document
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
+
+import models as models
+
+logger = logging.getLogger(__name__)
+
+IndexSpec = Tuple[Tuple[Tuple[str, int], ...], bool]
+
+
+def declared_indexes(document: Type[Document]) -> List[IndexSpec]:
+    """
+    Return the indexes a document declares in its Settings.
+
+    Args:
+        document: Beanie document class
+
+    Returns:
+        List of (keys, unique) pairs, keys being (field, direction) tuples
+    """
+    specs = []
+    for index in getattr(getattr(document, "Settings", None), "indexes", None) or []:
+        if isinstance(index, IndexModel):
+            keys = tuple((field, int(direction)) for field, direction in index.document["key"].items())
+            specs.append((keys, bool(index.document.get("unique", False))))
+        elif isinstance(index, str):
+            specs.append((((index, 1),), False))
+        else:
+            specs.append((tuple((field, int(direction)) for field, direction in index), False))
+    return specs
+
+
+def describe_index(spec: IndexSpec) -> str:
+    keys, unique = spec
+    name = "_".join(f"{field}_{direction}" for field, direction in keys)
+    return f"{name} (unique)" if unique else name
+
+
+async def find_missing_indexes(
+    database: AsyncIOMotorDatabase, document_models: Optional[List[Type[Document]]] = None
+) -> Dict[str, List[str]]:
+    """
+    Compare the declared indexes of each document with the database.
+
+    Args:
+        database: Database to inspect
+        document_models: Documents to check, all models by default
+
+    Returns:
+        Dict mapping collection name to its missing indexes, empty if none are missing
+    """
+    missing = {}
+    for document in document_models or models.__all__:
+        collection = getattr(document.Settings, "name", None) or document.__name__
+        existing = set()
+        for info in (await database[collection].index_information()).values():
+            keys = tuple((field, int(direction)) for field, direction in info["key"])
+            existing.add((keys, bool(info.get("unique", False))))
+
+        # A unique index also serves a non-unique declaration on the same keys
+        absent = [
+            describe_index(spec) for spec in declared_indexes(document)
+            if spec not in existing and not (not spec[1] and (spec[0], True) in existing)
+        ]
+        if absent:
+            missing[collection] = absent
+    return missing
+
+
+async def report_missing_indexes(database: AsyncIOMotorDatabase) -> Dict[str, List[str]]:
+    """Log the declared indexes the database does not have."""
+    missing = await find_missing_indexes(database)
+    for collection, indexes in missing.items():
+        logger.warning(f"Collection '{collection}' is missing indexes: {', '.join(indexes)}")
+    if not missing:
+        logger.info("All declared indexes are present")
+    return missing
+
+
+async def main() -> int:
+    from config.config import get_database
+
+    missing = await find_missing_indexes(get_database())
+    for collection, indexes in missing.items():
+        print(f"❌ {collection}: {', '.join(indexes)}")
+    if not missing:
+        print("✅ All declared indexes are present")
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,58 @@
+import base64
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
+
+
+def encode_cursor(created_at: datetime, document_id: PydanticObjectId) -> str:
+    """
+    Encode the position after a document in a newest-first listing.
+
+    Args:
+        created_at: Creation time of the last document of the page
+        document_id: ID of the last document of the page
+
+    Returns:
+        An opaque, URL-safe cursor
+    """
+    raw = f"{created_at.isoformat()}|{document_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, PydanticObjectId]:
+    """
+    Decode a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, document_id = raw.split("|")
+        return datetime.fromisoformat(created_at), PydanticObjectId(document_id)
+    except (ValueError, UnicodeDecodeError, InvalidId):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def after_cursor(cursor: Optional[str]) -> Dict[str, Any]:
+    """
+    Build the filter of the documents after a cursor, sorted by created_at then _id, newest first.
+
+    Args:
+        cursor: Cursor of the previous page, None for the first page
+
+    Returns:
+        The filter, empty for the first page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return {}
+    created_at, document_id = decode_cursor(cursor)
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": document_id}}
+    ]}
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from typing import Optional
+from uuid import uuid4
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from config.config import Settings
+from monitoring.fastapi_metrics import increment_scheduler_job_skipped
+
+logger = logging.getLogger(__name__)
+
+# Only the holder of a lock, identified by its token, may extend or release it
+EXTEND_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_client: Optional[Redis] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_redis() -> Redis:
+    """Return the process's Redis client, opened on the running event loop."""
+    global _client, _loop
+    # Connections are bound to the event loop they were opened on
+    loop = asyncio.get_running_loop()
+    if _client is None or _loop is not loop:
+        _client = Redis.from_url(Settings().REDIS_URL, decode_responses=True)
+        _loop = loop
+    return _client
+
+
+async def acquire_lock(key: str, ttl: int) -> Optional[str]:
+    """
+    Take a lock if nobody holds it.
+
+    Args:
+        key: Redis key of the lock
+        ttl: Seconds after which the lock expires if it is not released
+
+    Returns:
+        The lock token if the lock was taken, None otherwise
+    """
+    token = uuid4().hex
+    if await get_redis().set(key, token, nx=True, ex=ttl):
+        return token
+    return None
+
+
+async def extend_lock(key: str, token: str, ttl: int) -> bool:
+    """Extend a lock held with the given token, False if it was lost."""
+    return bool(await get_redis().eval(EXTEND_SCRIPT, 1, key, token, ttl * 1000))
+
+
+async def release_lock(key: str, token: str) -> bool:
+    """Release a lock held with the given token, False if it was lost."""
+    return bool(await get_redis().eval(RELEASE_SCRIPT, 1, key, token))
+
+
+async def run_exclusive(job: str, func, ttl: int, *args, **kwargs):
+    """
+    Run a job unless a previous run of the same job is still in progress.
+
+    Args:
+        job: Job name, also the lock name
+        func: Coroutine function running the job
+        ttl: Seconds after which the run lock expires, longer than a normal run
+
+    Returns:
+        The job's result, None if it was skipped
+    """
+    key = f"job:lock:{job}"
+    try:
+        token = await acquire_lock(key, ttl)
+    except RedisError as e:
+        logger.warning(f"Could not take the run lock of {job}, running anyway: {str(e)}")
+        return await func(*args, **kwargs)
+
+    if token is None:
+        logger.info(f"Previous run of {job} is still in progress, skipping")
+        increment_scheduler_job_skipped(job, "running")
+        return None
+
+    try:
+        return await func(*args, **kwargs)
+    finally:
+        try:
+            await release_lock(key, token)
+        except RedisError as e:
+            logger.warning(f"Could not release the run lock of {job}: {str(e)}")
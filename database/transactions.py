@@ -0,0 +1,66 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from motor.motor_asyncio import AsyncIOMotorClientSession, AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Whether each client's deployment supports transactions, asked once per client
+_transaction_support: Dict[int, bool] = {}
+
+
+async def supports_transactions(database: AsyncIOMotorDatabase) -> bool:
+    """
+    Return whether the deployment behind a database supports multi-document transactions.
+
+    Only replica sets and sharded clusters do; a standalone server (or a
+    mock) does not.
+
+    Args:
+        database: Database whose deployment to check
+
+    Returns:
+        bool: True on a replica set or mongos
+    """
+    key = id(database.client)
+    if key not in _transaction_support:
+        try:
+            hello = await database.command("hello")
+            _transaction_support[key] = bool(hello.get("setName") or hello.get("msg") == "isdbgrid")
+        except Exception as e:
+            logger.info(f"Could not detect transaction support, assuming none: {str(e)}")
+            _transaction_support[key] = False
+    return _transaction_support[key]
+
+
+async def run_in_transaction(
+    database: AsyncIOMotorDatabase,
+    operation: Callable[[Optional[AsyncIOMotorClientSession]], Awaitable[T]],
+) -> T:
+    """
+    Run an operation in a transaction when the deployment supports them.
+
+    The operation receives the session to pass to each of its writes, or
+    None when there is no transaction; it then has to undo its own partial
+    writes on failure. Transient transaction errors are retried by the driver.
+
+    Args:
+        database: Database the operation writes to
+        operation: Coroutine function taking the session
+
+    Returns:
+        The operation's result
+    """
+    if not await supports_transactions(database):
+        return await operation(None)
+
+    async with await database.client.start_session() as session:
+        result: Dict[str, Any] = {}
+
+        async def callback(session: AsyncIOMotorClientSession):
+            result["value"] = await operation(session)
+
+        await session.with_transaction(callback)
+        return result["value"]
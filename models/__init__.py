@@ -4,5 +4,9 @@ from models.routine import Routine
 from models.tracker import Tracker
 from models.request import Request
 from models.couple import Couple
+from models.job import JobCheckpoint
+from models.schedule import SessionSchedule
+from models.notification import PushTicketRecord
+from models.snapshot import PartnerSnapshot
 
-__all__ = [User, Admin, Routine, Tracker, Request, Couple]
+__all__ = [User, Admin, Routine, Tracker, Request, Couple, JobCheckpoint, SessionSchedule, PushTicketRecord, PartnerSnapshot]
@@ -1,4 +1,5 @@
 from beanie import Document
+from pymongo import ASCENDING, IndexModel
 from fastapi.security import HTTPBasicCredentials
 from pydantic import BaseModel, EmailStr
 
@@ -19,6 +20,9 @@ class Admin(Document):
 
     class Settings:
         name = "admin"
+        indexes = [
+            IndexModel([("email", ASCENDING)], unique=True),
+        ]
 
 
 class AdminSignIn(HTTPBasicCredentials):
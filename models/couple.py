@@ -2,10 +2,24 @@ from typing import Optional, Any
 
 from beanie import Document
 from fastapi.security import HTTPBasicCredentials
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, model_validator
 from beanie import PydanticObjectId
 from datetime import datetime
 from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+def pair_key(user_a: PydanticObjectId, user_b: PydanticObjectId) -> str:
+    """Return the key of a pair of users, the same whichever order they are given in."""
+    return ":".join(sorted([str(user_a), str(user_b)]))
+
+
+# Unique among documents that have a pair_key, so documents not backfilled yet do not collide
+def unique_pair_key_index() -> IndexModel:
+    return IndexModel(
+        [("pair_key", ASCENDING)], unique=True,
+        partialFilterExpression={"pair_key": {"$type": "string"}}
+    )
 
 
 class Couple(Document):
@@ -13,6 +27,13 @@ class Couple(Document):
     user_2: PydanticObjectId
     streak: Optional[int] = 0
     created_at: datetime = Field(default_factory=datetime.now)
+    # Derived from user_1 and user_2 on every validation
+    pair_key: Optional[str] = None
+
+    @model_validator(mode="after")
+    def set_pair_key(self):
+        self.pair_key = pair_key(self.user_1, self.user_2)
+        return self
     
     class Config:
         json_schema_extra = {
@@ -26,4 +47,11 @@ class Couple(Document):
 
     class Settings:
         name = "couple"
+        indexes = [
+            # A user's couple is looked up from either side
+            "user_1",
+            "user_2",
+            # At most one couple per pair of users
+            unique_pair_key_index(),
+        ]
 
@@ -0,0 +1,35 @@
+from typing import Optional
+
+from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, IndexModel
+from pydantic import Field
+from datetime import datetime, date
+
+
+class JobCheckpoint(Document):
+    job: str
+    run_date: date
+    last_id: Optional[PydanticObjectId] = None
+    last_minute: Optional[int] = None
+    processed: int = 0
+    completed: bool = False
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job": "update_all_users_streaks",
+                "run_date": date.today(),
+                "last_id": "60d5ec9af3b76be4f42c5f90",
+                "last_minute": None,
+                "processed": 1000,
+                "completed": False,
+                "updated_at": datetime.now()
+            }
+        }
+
+    class Settings:
+        name = "job_checkpoint"
+        indexes = [
+            IndexModel([("job", ASCENDING), ("run_date", ASCENDING)], unique=True),
+        ]
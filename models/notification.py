@@ -0,0 +1,22 @@
+from beanie import Document
+from pydantic import Field
+from datetime import datetime
+
+
+class PushTicketRecord(Document):
+    ticket_id: str
+    push_token: str
+    created_at: datetime = Field(default_factory=datetime.now)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ticket_id": "XXXXXXXX-XXXX-XXXX-XXXX-XXXXXXXXXXXX",
+                "push_token": "ExponentPushToken[4nydRdM8BJ582YQ40-PiLm]",
+                "created_at": datetime.now()
+            }
+        }
+
+    class Settings:
+        name = "push_ticket"
+        indexes = ["created_at"]
@@ -1,12 +1,15 @@
 from typing import Optional, Any
 
 from beanie import Document
+from pymongo import ASCENDING, DESCENDING
 from fastapi.security import HTTPBasicCredentials
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, model_validator
 from beanie import PydanticObjectId
 from datetime import datetime
 from pydantic import Field
 from enum import Enum
+
+from models.couple import pair_key, unique_pair_key_index
 class StatusEnum(str, Enum):
     pending = "pending"
     accepted = "accepted"
@@ -16,6 +19,14 @@ class Request(Document):
     partner_id: PydanticObjectId
     status: StatusEnum = StatusEnum.pending
     created_at: datetime = Field(default_factory=datetime.now)
+    # Derived from user_id and partner_id on every validation
+    pair_key: Optional[str] = None
+
+    @model_validator(mode="after")
+    def set_pair_key(self):
+        self.pair_key = pair_key(self.user_id, self.partner_id)
+        return self
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -28,4 +39,11 @@ class Request(Document):
 
     class Settings:
         name = "request"
+        indexes = [
+            # Sent and received lists, paginated newest first with _id breaking ties
+            [("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            [("partner_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            # Requests are pending or accepted, and a pair has at most one of either
+            unique_pair_key_index(),
+        ]
 
@@ -1,7 +1,37 @@
 from beanie import Document, PydanticObjectId
-from pydantic import BaseModel, Field
+from pymongo import ASCENDING, IndexModel
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional
 from enum import Enum
+from datetime import datetime
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+SESSION_TIME_FORMATS = ["%I:%M %p", "%H:%M"]
+
+
+def parse_session_time(time_str: str) -> Optional[int]:
+    """Return the minute of day of a session time such as "07:00 AM" or "19:00"."""
+    value = time_str.strip().upper()
+    for time_format in SESSION_TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(value, time_format)
+        except ValueError:
+            continue
+        return parsed.hour * 60 + parsed.minute
+    return None
+
+
+def weekday_index(day_of_week: str) -> Optional[int]:
+    """Return the weekday number (Monday is 0) of a day name."""
+    try:
+        return WEEKDAYS.index(day_of_week.strip().lower())
+    except ValueError:
+        return None
+
+
+def minute_of_day(moment: datetime) -> int:
+    """Return the minute of day of a datetime."""
+    return moment.hour * 60 + moment.minute
 
 class StatusEnum(str, Enum):
     pending = "pending"
@@ -18,11 +48,44 @@ class Session(BaseModel):
     status: StatusEnum = StatusEnum.pending
     time: str
     steps: List[Step]
+    # Derived from time when missing, None if time cannot be parsed; stored values are trusted
+    minute_of_day: Optional[int] = None
+
+    @model_validator(mode="after")
+    def set_minute_of_day(self):
+        if self.minute_of_day is None:
+            self.minute_of_day = parse_session_time(self.time)
+        return self
 
 # Day cho mỗi ngày trong tuần
 class Day(BaseModel):
     day_of_week: str
     sessions: List[Session]
+    # Derived from day_of_week when missing, Monday is 0; stored values are trusted
+    weekday: Optional[int] = None
+
+    @model_validator(mode="after")
+    def set_weekday(self):
+        if self.weekday is None:
+            self.weekday = weekday_index(self.day_of_week)
+        return self
+
+
+# Fields derived from day_of_week and time, never taken from a client
+DERIVED_DAY_FIELDS = {"weekday": True, "sessions": {"__all__": {"minute_of_day"}}}
+
+
+def day_from_input(day: BaseModel) -> Day:
+    """Validate a day sent by a client into a Day, deriving its weekday and minute fields afresh."""
+    return Day.model_validate(day.model_dump(exclude=DERIVED_DAY_FIELDS))
+
+
+def find_day(days: List[Day], weekday: Optional[int]) -> Optional[Day]:
+    """Return the day of a routine with the given weekday number."""
+    if weekday is None:
+        return None
+    return next((day for day in days if day.weekday == weekday), None)
+
 class Routine(Document):
     user_id: PydanticObjectId
     routine_name: Optional[str] = None
@@ -85,6 +148,10 @@ class Routine(Document):
 
     class Settings:
         name = "routine"  # Đặt tên collection MongoDB là "routine"
+        indexes = [
+            # One routine per user
+            IndexModel([("user_id", ASCENDING)], unique=True),
+        ]
 
     class Config:
         json_schema_extra = {
@@ -0,0 +1,36 @@
+from typing import Optional
+
+from beanie import Document, PydanticObjectId
+
+
+class SessionSchedule(Document):
+    routine_id: PydanticObjectId
+    user_id: PydanticObjectId
+    push_token: Optional[str] = None
+    weekday: int  # 0 = Monday
+    minute_of_day: int  # 0..1439
+    time: str  # session time as stored on the routine
+    steps_count: int = 0
+    deadline_minute: Optional[int] = None  # first minute the session counts as missed
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "routine_id": "60d5ec9af3b76be4f42c5f92",
+                "user_id": "60d5ec9af3b76be4f42c5f90",
+                "push_token": "ExponentPushToken[4nydRdM8BJ582YQ40-PiLm]",
+                "weekday": 0,
+                "minute_of_day": 420,
+                "time": "07:00 AM",
+                "steps_count": 5,
+                "deadline_minute": 481
+            }
+        }
+
+    class Settings:
+        name = "session_schedule"
+        indexes = [
+            [("weekday", 1), ("minute_of_day", 1)],
+            [("weekday", 1), ("deadline_minute", 1)],
+            "routine_id",
+        ]
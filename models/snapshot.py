@@ -0,0 +1,40 @@
+from typing import Any, Dict, Optional
+
+from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, IndexModel
+from pydantic import Field
+from datetime import datetime, date
+
+
+class PartnerSnapshot(Document):
+    """What a user's partner sees on the couple dashboard, kept up to date on writes."""
+    user_id: PydanticObjectId
+    day: date  # today_tracker and today_routine are for this day
+    fullname: Optional[str] = None
+    email: str
+    avatar: Optional[str] = None
+    streak: Optional[int] = 0
+    today_tracker: Optional[Dict[str, Any]] = None
+    today_routine: Optional[Dict[str, Any]] = None
+    built_at: datetime = Field(default_factory=datetime.now)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "user_id": "60d5ec9af3b76be4f42c5f90",
+                "day": date.today(),
+                "fullname": "Vo Quoc Huy",
+                "email": "test@gmail.com",
+                "avatar": None,
+                "streak": 3,
+                "today_tracker": None,
+                "today_routine": None,
+                "built_at": datetime.now()
+            }
+        }
+
+    class Settings:
+        name = "partner_snapshot"
+        indexes = [
+            IndexModel([("user_id", ASCENDING)], unique=True),
+        ]
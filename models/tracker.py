@@ -1,4 +1,5 @@
 from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, DESCENDING
 from typing import List, Optional
 from enum import Enum
 from schemas.routine import DaySchema
@@ -20,6 +21,12 @@ class Tracker(Document):
 
     class Settings:
         name = "tracker"  # Đặt tên collection MongoDB là "routine"
+        indexes = [
+            # Day lookups, date ranges and the latest tracker, all sorted by date
+            [("user_id", ASCENDING), ("date", DESCENDING)],
+            # The nightly streak job reads recent trackers of every user, resuming by user_id
+            [("date", ASCENDING), ("user_id", ASCENDING)],
+        ]
 
     class Config:
         json_schema_extra = {
@@ -1,6 +1,8 @@
 from typing import Optional, Any
+from datetime import date
 
 from beanie import Document
+from pymongo import ASCENDING, IndexModel
 from fastapi.security import HTTPBasicCredentials
 from pydantic import BaseModel, EmailStr
 
@@ -14,6 +16,8 @@ class User(Document):
     gender: Optional[str] = None
     avatar: Optional[str] = None
     streak: Optional[int] = 0
+    longest_streak: Optional[int] = 0
+    last_tracked_date: Optional[date] = None
     push_token: Optional[str] = None
     class Config:
         json_schema_extra = {
@@ -25,10 +29,15 @@ class User(Document):
                 "gender": "male",
                 "role": "baseUser",
                 "streak": 0,
+                "longest_streak": 0,
+                "last_tracked_date": None,
                 "push_token": "push_token"
             }
         }
 
     class Settings:
         name = "user"
+        indexes = [
+            IndexModel([("email", ASCENDING)], unique=True),
+        ]
 
@@ -16,6 +16,11 @@ user_logins = Counter('user_logins_total', 'Total number of user logins')
 image_predictions = Counter('image_predictions_total', 'Total number of image predictions')
 routine_completions = Counter('routine_completions_total', 'Total number of routine completions')
 
+# Push notification metrics
+push_notifications_delivered = Counter('push_notifications_delivered_total', 'Push notifications delivered according to Expo receipts')
+push_notifications_failed = Counter('push_notifications_failed_total', 'Push notifications rejected by Expo', ['error'])
+push_tokens_pruned = Counter('push_tokens_pruned_total', 'Dead push tokens removed from users and routines')
+
 # Database metrics
 db_connections = Gauge('database_connections_active', 'Active database connections')
 db_query_duration = Histogram('database_query_duration_seconds', 'Database query duration')
@@ -40,6 +45,18 @@ def increment_routine_completion():
     """Increment routine completion counter"""
     routine_completions.inc()
 
+def increment_push_delivered(count: int = 1):
+    """Increment delivered push notification counter"""
+    push_notifications_delivered.inc(count)
+
+def increment_push_failed(error: str, count: int = 1):
+    """Increment failed push notification counter"""
+    push_notifications_failed.labels(error=error or "unknown").inc(count)
+
+def increment_push_tokens_pruned(count: int = 1):
+    """Increment pruned push token counter"""
+    push_tokens_pruned.inc(count)
+
 def record_db_query_time(duration: float):
     """Record database query duration"""
     db_query_duration.observe(duration)
@@ -50,4 +67,48 @@ def record_prediction_accuracy(score: float):
 
 def record_model_inference_time(duration: float):
     """Record model inference time"""
-    model_inference_time.observe(duration) 
\ No newline at end of file
+    model_inference_time.observe(duration) 
+# Background job metrics
+background_job_duration = Histogram('background_job_duration_seconds', 'Background job duration', ['job'])
+background_job_batch_duration = Histogram('background_job_batch_duration_seconds', 'Background job batch duration', ['job'])
+
+def record_background_job_duration(job: str, duration: float):
+    """Record background job duration"""
+    background_job_duration.labels(job=job).observe(duration)
+
+def record_background_job_batch_duration(job: str, duration: float):
+    """Record the duration of one batch of a background job"""
+    background_job_batch_duration.labels(job=job).observe(duration)
+
+# Scheduler metrics
+scheduler_jobs_enqueued = Counter('scheduler_jobs_enqueued_total', 'Scheduled jobs enqueued by the scheduler leader', ['job'])
+scheduler_jobs_skipped = Counter('scheduler_jobs_skipped_total', 'Scheduled job runs skipped as duplicates', ['job', 'reason'])
+
+def increment_scheduler_job_enqueued(job: str):
+    """Increment enqueued scheduled job counter"""
+    scheduler_jobs_enqueued.labels(job=job).inc()
+
+def increment_scheduler_job_skipped(job: str, reason: str):
+    """Increment skipped duplicate scheduled job counter"""
+    scheduler_jobs_skipped.labels(job=job, reason=reason).inc()
+
+# Cache metrics
+cache_requests = Counter('cache_requests_total', 'Read-through cache lookups', ['cache', 'result'])
+
+def increment_cache_request(cache: str, result: str):
+    """Increment cache lookup counter; result is local_hit, redis_hit or miss"""
+    cache_requests.labels(cache=cache, result=result).inc()
+
+cache_invalidations = Counter('cache_invalidations_total', 'Local cache evictions', ['cache', 'source'])
+
+def increment_cache_invalidation(cache: str, source: str):
+    """Increment cache eviction counter; source is write, bus or missed"""
+    cache_invalidations.labels(cache=cache, source=source).inc()
+
+# Partner event metrics
+partner_events_published = Counter('partner_events_published_total', 'Partner events appended to Redis streams', ['type'])
+partner_event_streams = Gauge('partner_event_streams_open', 'Open partner event stream connections')
+
+def increment_partner_event_published(event_type: str):
+    """Increment published partner event counter"""
+    partner_events_published.labels(type=event_type).inc()
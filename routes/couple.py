@@ -1,12 +1,15 @@
-from typing import List, Dict, Any
+import asyncio
+import json
+from typing import List, Dict, Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Path, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Path, BackgroundTasks, Header
+from fastapi.responses import StreamingResponse
 from beanie import PydanticObjectId
 from bson import ObjectId
 from datetime import datetime
 
-from config.jwt_bearer import JWTBearer
-from config.jwt_handler import decode_jwt
+from config.jwt_bearer import Principal, get_principal
+from config.config import Settings
 from service.couple_service import (
     get_couples_by_user, 
     get_couple_by_id, 
@@ -21,6 +24,12 @@ from models.user import User
 from models.tracker import Tracker
 from models.routine import Routine
 from service.routine_service import get_routine_by_user_id
+from service.user_service import get_user_profile
+from service.partner_events import Subscription, format_sse, partner_event_hub
+from service.snapshot_service import format_partner_data, get_partner_snapshot
+
+# Comment lines sent on idle streams so proxies keep the connection open
+EVENT_STREAM_HEARTBEAT = 15
 
 router = APIRouter(
     responses={
@@ -39,7 +48,7 @@ router = APIRouter(
     summary="Get current user's couple",
     description="Get the couple relationship where the authenticated user is a member, including partner's today routine and full tracker information"
 )
-async def get_user_couple(token: str = Depends(JWTBearer())):
+async def get_user_couple(principal: Principal = Depends(get_principal)):
     """
     Get the couple relationship where the current user is a member.
     The response includes:
@@ -51,16 +60,7 @@ async def get_user_couple(token: str = Depends(JWTBearer())):
     Returns information about the couple relationship.
     """
     try:
-        # Extract and validate user ID from token
-        payload = decode_jwt(token)
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid token: user_id not found"
-            )
-            
-        user_id = PydanticObjectId(user_id)
+        user_id = principal.user_id
         
         # Get the couple for this user
         couple = await get_couples_by_user(user_id)
@@ -80,6 +80,73 @@ async def get_user_couple(token: str = Depends(JWTBearer())):
             detail=f"An unexpected error occurred: {str(e)}"
         )
 
+async def partner_event_stream(subscription: Subscription, partner_id: PydanticObjectId):
+    """
+    Yield the partner's events as server-sent events until the client disconnects.
+
+    A "snapshot" event with the partner's full current state comes first
+    when the client is not resuming or cannot resume from its cursor.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        if subscription.resync:
+            snapshot = await get_partner_snapshot(partner_id)
+            if snapshot:
+                event_id = subscription.last_id if subscription.last_id != "0-0" else None
+                yield format_sse(event_id, "snapshot", json.dumps(format_partner_data(snapshot), default=str))
+
+        # A client too slow to keep up is disconnected and resumes from its cursor
+        while not subscription.lagging:
+            try:
+                event_id, fields = await asyncio.wait_for(subscription.queue.get(), EVENT_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if subscription.accept(event_id):
+                yield format_sse(event_id, fields["type"], fields["data"])
+    finally:
+        partner_event_hub.unsubscribe(subscription)
+
+
+@router.get(
+    "/events",
+    status_code=status.HTTP_200_OK,
+    summary="Stream partner events",
+    description="Server-sent events pushed when the partner completes a session, scans their face, or their streak or routine changes"
+)
+async def stream_partner_events(
+    principal: Principal = Depends(get_principal),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Stream the partner's events as they happen, replacing polling of GET /.
+
+    Each event carries the partner data in the same shape as the "partner"
+    field of GET /. Reconnecting clients send the Last-Event-ID header and
+    receive the events they missed.
+    """
+    user_id = principal.user_id
+    if not Settings().REDIS_URL:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Partner events are not available"
+        )
+
+    couple = await Couple.find_one({"$or": [{"user_1": user_id}, {"user_2": user_id}]})
+    if not couple:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No couple relationship found for this user"
+        )
+    partner_id = couple.user_2 if couple.user_1 == user_id else couple.user_1
+
+    subscription = await partner_event_hub.subscribe(partner_id, last_event_id)
+    return StreamingResponse(
+        partner_event_stream(subscription, partner_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.delete(
     "/{couple_id}", 
     status_code=status.HTTP_200_OK,
@@ -88,27 +155,20 @@ async def get_user_couple(token: str = Depends(JWTBearer())):
 )
 async def delete_couple(
     couple_id: str = Path(..., description="The ID of the couple to delete"),
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
     """
     Delete a couple relationship by its ID and related accepted friend request.
     
     Args:
         couple_id: The ID of the couple to delete
-        token: JWT token for authentication
+        principal: The authenticated user
         
     Returns:
         Success message if deleted successfully
     """
     try:
-        # Extract and validate user ID from token
-        payload = decode_jwt(token)
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid token: user_id not found"
-            )
+        user_id = principal.user_id
         
         # Validate couple_id format
         try:
@@ -128,7 +188,6 @@ async def delete_couple(
             )
         
         # Check if the user is authorized to delete this couple
-        user_id = PydanticObjectId(user_id)
         if couple.user_1 != user_id and couple.user_2 != user_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -163,34 +222,26 @@ async def delete_couple(
 async def reminder(
     data: CoupleReminderSchema, 
     background_tasks: BackgroundTasks = BackgroundTasks(),
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
     """
     Send reminder to partner
     """
     try:
-        # Extract and validate user ID from token
-        payload = decode_jwt(token)
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid token: user_id not found"
-            )
+        user_id = principal.user_id
         if not data.partner_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid partner_id"
             )
         
-        user_id = PydanticObjectId(user_id)
-        user_current = await User.get(user_id)
+        user_current = await get_user_profile(user_id)
         if not user_current:    
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
-        user_partner = await User.get(data.partner_id)
+        user_partner = await get_user_profile(data.partner_id)
         print(user_partner)
         if not user_partner:
             raise HTTPException(
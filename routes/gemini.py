@@ -3,7 +3,7 @@ from fastapi.responses import JSONResponse
 import google.generativeai as genai
 from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional, Union
-from config.jwt_bearer import JWTBearer
+from config.jwt_bearer import Principal, get_principal
 from config.config import Settings
 import os
 import base64
@@ -510,14 +510,14 @@ def create_safe_fallback_response(response_text: str, error: str = None) -> Dict
 @router.post("/analyze")
 async def analyze_with_gemini(
     request_data: GeminiRequest,
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
     """
     Analyze skin image with Gemini AI - Direct image analysis approach.
     
     Args:
         request_data: Contains base64 image (required), optional pre-detected acne summary, and analysis type
-        token: JWT authentication token
+        principal: The authenticated user
         
     Returns:
         JSONResponse with comprehensive, structured analysis results based on direct image observation
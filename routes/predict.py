@@ -10,8 +10,7 @@ from typing import List
 from beanie import PydanticObjectId
 from monitoring.fastapi_metrics import increment_image_prediction, record_model_inference_time
 
-from config.jwt_bearer import JWTBearer
-from config.jwt_handler import decode_jwt
+from config.jwt_bearer import Principal, get_principal, jwt_bearer
 from models.routine import Routine, Day
 from schemas.routine import RoutineSchema, SessionSchema, DaySchema, DayResponseSchema, RoutineUpdateSchema, \
     RoutineUpdatePushToken
@@ -31,7 +30,7 @@ model = YOLO("./models_ai/yolov8.pt")
 async def predict_image(
         file: UploadFile = File(...),
         background_tasks: BackgroundTasks = BackgroundTasks(),
-        token: str = Depends(JWTBearer())
+        principal: Principal = Depends(get_principal)
 ):
     import time
     start_time = time.time()
@@ -133,7 +132,7 @@ async def predict_image(
     # Schedule the background task to save results
     background_tasks.add_task(
         tracker_on_day,
-        token,
+        principal.user_id,
         buffered.getvalue(),
         class_summary
     )
@@ -150,7 +149,7 @@ async def predict_image(
 async def benchmark_predict_api(
         file: UploadFile = File(...),
         concurrent_requests: int = Body(..., description="Number of concurrent requests to send"),
-        token: str = Depends(JWTBearer())
+        token: str = Depends(jwt_bearer)
 ):
     """
     Benchmark API endpoint to test predict API performance with concurrent requests
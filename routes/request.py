@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-from fastapi import APIRouter, Body, HTTPException, Depends, BackgroundTasks, status, Path, Query
+from fastapi import APIRouter, Body, HTTPException, Depends, BackgroundTasks, status, Path, Query, Response
 from service.request import (
     check_can_create_request, 
     create_send_request, 
@@ -11,13 +11,11 @@ from service.request import (
     accept_request,
     cancel_request,
     reject_request,
-    delete_sent_request,
-    cleanup_other_requests
+    delete_sent_request
 )
 from pydantic import BaseModel
 
-from config.jwt_bearer import JWTBearer
-from config.jwt_handler import decode_jwt
+from config.jwt_bearer import Principal, get_principal
 from models.user import User
 from models.request import Request, StatusEnum
 from schemas.request import (
@@ -48,7 +46,7 @@ router = APIRouter(
 async def create_friend_request(
     request_data: CreateRequestSchema = Body(...), 
     background_tasks: BackgroundTasks = BackgroundTasks(), 
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
     """
     Send a friend request to another user.
@@ -58,9 +56,7 @@ async def create_friend_request(
     Returns the created friend request or an error.
     """
     try:
-        payload = decode_jwt(token) 
-        user_id = payload.get("sub")
-        user_id = PydanticObjectId(user_id)
+        user_id = principal.user_id
         
         # Verify target user exists
         user_exists = await User.find_one(User.email == request_data.email)
@@ -117,8 +113,7 @@ async def create_friend_request(
 )
 async def accept_friend_request(
     request_id: str = Path(..., description="The ID of the friend request to accept"), 
-    background_tasks: BackgroundTasks = BackgroundTasks(),
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
     """
     Accept a pending friend request.
@@ -129,22 +124,12 @@ async def accept_friend_request(
     Note: When a request is accepted, any other pending requests between the two users will be automatically deleted.
     """
     try:
-        payload = decode_jwt(token) 
-        user_id = payload.get("sub")
-        user_id = PydanticObjectId(user_id)
+        user_id = principal.user_id
         request_id = PydanticObjectId(request_id)
         
-        # Chấp nhận lời mời kết bạn
+        # Chấp nhận lời mời kết bạn, xóa luôn các lời mời dư thừa
         request = await accept_request(request_id, user_id)
         
-        # Xóa các lời mời kết bạn dư thừa trong background
-        background_tasks.add_task(
-            cleanup_other_requests, 
-            user_id=request.user_id,
-            partner_id=request.partner_id,
-            accepted_request_id=request.id
-        )
-        
         # Trả về thông tin chi tiết về request đã được chấp nhận
         return {
             "id": str(request.id),
@@ -152,8 +137,7 @@ async def accept_friend_request(
             "partner_id": str(request.partner_id),
             "status": request.status,
             "created_at": request.created_at,
-            "message": "Friend request accepted successfully",
-            "note": "Cleanup of redundant friend requests is being processed in the background"
+            "message": "Friend request accepted successfully"
         }
     except HTTPException:
         # Re-raise HTTP exceptions to preserve status code
@@ -173,7 +157,7 @@ async def accept_friend_request(
 )
 async def delete_sent_friend_request(
     request_id: str = Path(..., description="The ID of the friend request to delete"),
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
     """
     Delete a friend request that you sent to another user.
@@ -183,9 +167,7 @@ async def delete_sent_friend_request(
     Returns a confirmation message or an error.
     """
     try:
-        payload = decode_jwt(token) 
-        user_id = payload.get("sub")
-        user_id = PydanticObjectId(user_id)
+        user_id = principal.user_id
         request_id = PydanticObjectId(request_id)
         result = await delete_sent_request(request_id, user_id)
         return result
@@ -206,7 +188,7 @@ async def delete_sent_friend_request(
 )
 async def reject_friend_request(
     request_id: str = Path(..., description="The ID of the friend request to reject"),
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
     """
     Reject a friend request that you received from another user.
@@ -216,9 +198,7 @@ async def reject_friend_request(
     Returns a confirmation message or an error.
     """
     try:
-        payload = decode_jwt(token) 
-        user_id = payload.get("sub")
-        user_id = PydanticObjectId(user_id)
+        user_id = principal.user_id
         request_id = PydanticObjectId(request_id)
         
         result = await reject_request(request_id, user_id)
@@ -241,7 +221,7 @@ async def reject_friend_request(
 )
 async def delete_any_friend_request(
     request_id: str = Path(..., description="The ID of the friend request to delete"),
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
     """
     Automatically detect if you are the sender or receiver of the request and perform the appropriate action.
@@ -252,9 +232,7 @@ async def delete_any_friend_request(
     Returns a confirmation message or an error.
     """
     try:
-        payload = decode_jwt(token) 
-        user_id = payload.get("sub")
-        user_id = PydanticObjectId(user_id)
+        user_id = principal.user_id
         request_id = PydanticObjectId(request_id)
         
         # Check if the request exists
@@ -296,20 +274,27 @@ async def delete_any_friend_request(
     description="Get a list of pending friend requests received by the authenticated user with sender information"
 )
 async def list_received_requests(
-    token: str = Depends(JWTBearer())
+    response: Response,
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of requests to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    principal: Principal = Depends(get_principal)
 ):
     """
     Get a list of pending friend requests received by the current user.
     Includes sender information (fullname, email, avatar).
     
-    Returns a list of friend request objects or an error.
+    Returns one page of friend request objects, newest first, or an error.
+    When there are more, the X-Next-Cursor header holds the cursor of the next page.
     """
     try:
-        payload = decode_jwt(token) 
-        user_id = payload.get("sub")
-        user_id = PydanticObjectId(user_id)
+        user_id = principal.user_id
         
-        return await get_list_request_received(user_id)
+        requests, next_cursor = await get_list_request_received(user_id, limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return requests
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -324,20 +309,27 @@ async def list_received_requests(
     description="Get a list of pending friend requests sent by the authenticated user with receiver information"
 )
 async def list_sent_requests(
-    token: str = Depends(JWTBearer())
+    response: Response,
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of requests to return"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    principal: Principal = Depends(get_principal)
 ):
     """
     Get a list of pending friend requests sent by the current user.
     Includes receiver information (fullname, email, avatar).
     
-    Returns a list of friend request objects or an error.
+    Returns one page of friend request objects, newest first, or an error.
+    When there are more, the X-Next-Cursor header holds the cursor of the next page.
     """
     try:
-        payload = decode_jwt(token) 
-        user_id = payload.get("sub")
-        user_id = PydanticObjectId(user_id)
+        user_id = principal.user_id
         
-        return await get_sent_request(user_id)
+        requests, next_cursor = await get_sent_request(user_id, limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return requests
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -4,27 +4,23 @@ from typing import List
 from beanie import PydanticObjectId
 from datetime import datetime, timezone, timedelta
 from monitoring.fastapi_metrics import increment_routine_completion
-from config.jwt_bearer import JWTBearer
-from config.jwt_handler import decode_jwt
-from models.routine import Routine, Day
+from config.jwt_bearer import Principal, get_principal
+from models.routine import Routine, Day, Session, day_from_input, find_day, minute_of_day, weekday_index
 from schemas.routine import RoutineSchema, SessionSchema, DaySchema, DayResponseSchema, RoutineUpdateSchema, \
     RoutineUpdatePushToken, RoutineNameUpdate
-from service.routine_service import cron_notification, process_routine
+from service.routine_service import process_routine, get_routine_by_user_id
 from service.user_service import update_push_token_user
+from service.schedule_service import sync_routine_schedule, sync_schedule_push_token
+from database.cache import routine_cache
+from service.snapshot_service import refresh_partner_snapshot
 router = APIRouter()
 
 
 @router.get("/", response_model=RoutineSchema)
-async def get_detail_routine(token: str = Depends(JWTBearer())):
-    payload = decode_jwt(token)
-    user_id = payload.get("sub")
+async def get_detail_routine(principal: Principal = Depends(get_principal)):
+    user_id = principal.user_id
 
-    try:
-        user_id = ObjectId(user_id)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail="Invalid user_id format")
-
-    routine = await Routine.find_one(Routine.user_id == user_id)
+    routine = await get_routine_by_user_id(user_id)
 
     if routine is None:
         raise HTTPException(status_code=404, detail="Routine not found")
@@ -32,15 +28,8 @@ async def get_detail_routine(token: str = Depends(JWTBearer())):
     return routine
 
 @router.put("/", response_model=RoutineSchema)
-async def update_routine(routine: RoutineSchema, token: str = Depends(JWTBearer())):
-    payload = decode_jwt(token)
-    user_id = payload.get("sub")
-    print(routine.days[0].sessions[0].status)
-    print(routine)
-    try:
-        user_id = ObjectId(user_id)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail="Invalid user_id format")
+async def update_routine(routine: RoutineSchema, principal: Principal = Depends(get_principal)):
+    user_id = principal.user_id
 
     existing_routine = await Routine.find_one({"user_id": user_id})
     if not existing_routine:
@@ -48,177 +37,113 @@ async def update_routine(routine: RoutineSchema, token: str = Depends(JWTBearer(
 
     existing_routine.routine_name = routine.routine_name
     existing_routine.push_token = routine.push_token
-    existing_routine.days = routine.days
+    # Validate into Day models so the derived weekday and minute fields are stored
+    existing_routine.days = [day_from_input(day) for day in routine.days]
 
     await existing_routine.save()
+    await routine_cache.invalidate(user_id)
+    await refresh_partner_snapshot(user_id, event="routine")
+    await sync_routine_schedule(existing_routine)
     return existing_routine
 
 
-@router.post("/cron", )
-async def test_routine():
-    await cron_notification()
-    return HTTPException(status_code=200, detail="Routine test successfully")
-
+UTC7 = timezone(timedelta(hours=7))
 
 
-def parse_time_string(time_str: str) -> datetime:
-    return datetime.strptime(time_str, "%I:%M %p")
+def now_minute_utc7() -> int:
+    """Return the current minute of day in UTC+7"""
+    return minute_of_day(datetime.now(UTC7))
 
-def is_past_time_utc7(time_str: str) -> bool:
-    """Check if the given time is in the past in UTC+7 timezone"""
-    try:
-        # Get current time in UTC+7
-        utc7_tz = timezone(timedelta(hours=7))
-        now_utc7 = datetime.now(utc7_tz)
-        
-        # Parse the session time and set it to today's date in UTC+7
-        session_time = datetime.strptime(time_str, "%I:%M %p")
-        today_session_time = now_utc7.replace(
-            hour=session_time.hour, 
-            minute=session_time.minute, 
-            second=0, 
-            microsecond=0
-        )
-        
-        return today_session_time < now_utc7
-    except:
+def is_past_time_utc7(session_minute: int) -> bool:
+    """Check if the given minute of day is in the past in UTC+7 timezone"""
+    if session_minute is None:
         return False
+    return session_minute < now_minute_utc7()
 
 @router.put("/update-day", response_model=DaySchema)
 async def update_sessions_for_day(
     updated_day: DaySchema = Body(...),
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
 
-    payload = decode_jwt(token)
-    user_id = payload.get("sub")
-
-    try:
-        user_id = ObjectId(user_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    user_id = principal.user_id
 
     routine = await Routine.find_one(Routine.user_id == user_id)
     if not routine:
         raise HTTPException(status_code=404, detail="Routine not found")
 
-    for day in routine.days:
-        if day.day_of_week.lower() == updated_day.day_of_week.lower():
-            # Store old sessions for comparison
-            old_sessions = {session.time: session.status for session in day.sessions or []}
-            
-            # Process new sessions
-            processed_sessions = []
-            for new_session in updated_day.sessions or []:
-                # Priority 1: If request explicitly sends "done" status, keep it
-                if new_session.status == "done":
-                    # Keep the "done" status from request
-                    pass
-                # Priority 2: If session time exists in old sessions, preserve the old status
-                elif new_session.time in old_sessions:
-                    new_session.status = old_sessions[new_session.time]
-                # Priority 3: If this is a new session and the time is in the past, set status to "not_done"
-                elif is_past_time_utc7(new_session.time):
-                    new_session.status = "not_done"
-                # Priority 4: Otherwise keep the status from the new session data
-                
-                processed_sessions.append(new_session)
-                
-                # Debug log
-                print(f"Session {new_session.time}: final status = {new_session.status}")
-            
-            # Sort sessions by time and update
-            day.sessions = sorted(processed_sessions, key=lambda s: parse_time_string(s.time))
-            await routine.save()
-            print(f"Updated day: {day}")
-            return day
+    day = find_day(routine.days, weekday_index(updated_day.day_of_week))
+    if day:
+        # Store old sessions for comparison
+        old_sessions = {session.time: session.status for session in day.sessions or []}
+
+        # Process new sessions
+        processed_sessions = []
+        for new_session in updated_day.sessions or []:
+            new_session = Session.model_validate(new_session.model_dump())
+            # Priority 1: If request explicitly sends "done" status, keep it
+            if new_session.status == "done":
+                # Keep the "done" status from request
+                pass
+            # Priority 2: If session time exists in old sessions, preserve the old status
+            elif new_session.time in old_sessions:
+                new_session.status = old_sessions[new_session.time]
+            # Priority 3: If this is a new session and the time is in the past, set status to "not_done"
+            elif is_past_time_utc7(new_session.minute_of_day):
+                new_session.status = "not_done"
+            # Priority 4: Otherwise keep the status from the new session data
+
+            processed_sessions.append(new_session)
+
+        # Sort sessions by time, unparseable times last, and update
+        day.sessions = sorted(
+            processed_sessions,
+            key=lambda s: (s.minute_of_day is None, s.minute_of_day or 0)
+        )
+        await routine.save()
+        await routine_cache.invalidate(user_id)
+        await refresh_partner_snapshot(user_id, event="routine")
+        await sync_routine_schedule(routine)
+        return day
 
     raise HTTPException(status_code=404, detail="Day not found in routine")
 
-def is_within_deadline_utc7(session_time_str: str) -> bool:
+def is_within_deadline_utc7(session_minute: int) -> bool:
     """Check if current time is within 1 hour after the session time in UTC+7 timezone"""
-    try:
-        utc7_tz = timezone(timedelta(hours=7))
-        now_utc7 = datetime.now(utc7_tz)
-        
-        session_time_str_normalized = session_time_str.upper()
-        
-        session_time = None
-        for time_format in ["%I:%M %p", "%H:%M"]:
-            try:
-                session_time = datetime.strptime(session_time_str_normalized, time_format)
-                break
-            except ValueError:
-                continue
-        
-        if session_time is None:
-            print(f"Could not parse time format: {session_time_str}")
-            return False
-        
-        # Set session time to today's date in UTC+7
-        today_session_time = now_utc7.replace(
-            hour=session_time.hour, 
-            minute=session_time.minute, 
-            second=0, 
-            microsecond=0
-        )
-        
-        # Calculate deadline (1 hour after session time)
-        deadline = today_session_time + timedelta(hours=1)
-        
-        # Debug logs
-        print(f"Current time (UTC+7): {now_utc7}")
-        print(f"Session time: {today_session_time}")
-        print(f"Deadline: {deadline}")
-        print(f"Is within deadline: {today_session_time <= now_utc7 <= deadline}")
-        
-        # Check if current time is between session time and deadline
-        return today_session_time <= now_utc7 <= deadline
-    except Exception as e:
-        print(f"Error in is_within_deadline_utc7: {e}")
+    if session_minute is None:
         return False
+    # Deadline is 1 hour after the session time, on the same day
+    return session_minute <= now_minute_utc7() <= session_minute + 60
 
 @router.put("/session/mark-done", response_model=DaySchema)
 async def mark_session_done(
     day_of_week: str = Body(...),
     time: str = Body(...),
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
-    payload = decode_jwt(token)
-    user_id = payload.get("sub")
-
-    try:
-        user_id = ObjectId(user_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    user_id = principal.user_id
 
     routine = await Routine.find_one(Routine.user_id == user_id)
     if not routine:
         raise HTTPException(status_code=404, detail="Routine not found")
 
-    # Debug: Print the time being checked
-    print(f"Attempting to mark done - Day: {day_of_week}, Time: {time}")
-    
-    # Check if current time is within deadline (1 hour after session time)
-    # Temporarily disabled for debugging
-    if not is_within_deadline_utc7(time):
-        # For debugging, let's see what times we're working with but allow it anyway
-        print(f"WARNING: Outside deadline but allowing for debug - Time: {time}")
-        # Uncomment the line below to re-enable deadline checking
-        # raise HTTPException(
-        #     status_code=400, 
-        #     detail=f"Cannot mark session as done. Deadline has passed (1 hour after session time). Current session time: {time}"
-        # )
-
-    for day in routine.days:
-        if day.day_of_week.lower() == day_of_week.lower():
-            for session in day.sessions:
-                if session.time == time:
-                    if session.status != "done":
-                        session.status = "done"
-                        await routine.save()
-                        increment_routine_completion()  # Increment routine completion counter
-                    return day
+    day = find_day(routine.days, weekday_index(day_of_week))
+    session = next((session for session in day.sessions if session.time == time), None) if day else None
+    if session:
+        # Check if current time is within deadline (1 hour after session time)
+        if not is_within_deadline_utc7(session.minute_of_day):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot mark session as done. Deadline has passed (1 hour after session time). Current session time: {time}"
+            )
+
+        if session.status != "done":
+            session.status = "done"
+            await routine.save()
+            await routine_cache.invalidate(user_id)
+            await refresh_partner_snapshot(user_id, event="session_done")
+            increment_routine_completion()  # Increment routine completion counter
+        return day
 
     raise HTTPException(status_code=404, detail=f"Session not found - Day: {day_of_week}, Time: {time}")
 
@@ -239,68 +164,54 @@ def serialize_day(day: Day) -> dict:
         ]
     }
 @router.get("/today", response_model=DayResponseSchema)
-async def get_today_day(token: str = Depends(JWTBearer())):
-    payload = decode_jwt(token)
-    user_id = payload.get("sub")
-
-    try:
-        user_id = ObjectId(user_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid user_id format")
+async def get_today_day(principal: Principal = Depends(get_principal)):
+    user_id = principal.user_id
 
-    routine = await Routine.find_one(Routine.user_id == user_id)
+    routine = await get_routine_by_user_id(user_id)
     if not routine:
         raise HTTPException(status_code=404, detail="Routine not found")
 
-    today_name = datetime.now().strftime("%A").lower()
-
-    for day in routine.days:
-        if day.day_of_week.lower() == today_name:
-            today_data = serialize_day(day)
-            return DayResponseSchema(
-                routine_name=routine.routine_name,
-                push_token=routine.push_token,
-                today=DaySchema.model_validate(today_data)
-            )
+    day = find_day(routine.days, datetime.now().weekday())
+    if day:
+        today_data = serialize_day(day)
+        return DayResponseSchema(
+            routine_name=routine.routine_name,
+            push_token=routine.push_token,
+            today=DaySchema.model_validate(today_data)
+        )
 
     raise HTTPException(status_code=404, detail="Today's routine not found")
 
 @router.patch("/", response_model=RoutineSchema)
 async def patch_routine(
     data: RoutineUpdateSchema = Body(...),
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
-    payload = decode_jwt(token)
-    user_id = payload.get("sub")
-
-    try:
-        user_id = ObjectId(user_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    user_id = principal.user_id
 
     routine = await Routine.find_one(Routine.user_id == user_id)
     if not routine:
         raise HTTPException(status_code=404, detail="Routine not found")
 
-    update_data = data.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(routine, key, value)
+    # Assign the parsed values so days stay Day models for the schedule sync
+    for key in data.model_fields_set:
+        setattr(routine, key, getattr(data, key))
+    if data.days is not None:
+        # Derived fields sent by the client are not trusted
+        routine.days = [day_from_input(day) for day in data.days]
 
     await routine.save()
+    await routine_cache.invalidate(user_id)
+    await refresh_partner_snapshot(user_id, event="routine")
+    await sync_routine_schedule(routine)
     return routine
 
 @router.patch("/update-push-token", response_description="Update push token" )
 async def update_push_token(
     data : RoutineUpdatePushToken = Body(...),
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
-    payload = decode_jwt(token)
-    user_id = payload.get("sub")
-
-    try:
-        user_id = ObjectId(user_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    user_id = principal.user_id
 
     # Tìm routine của user theo user_id
     routine = await Routine.find_one(Routine.user_id == user_id)
@@ -308,10 +219,12 @@ async def update_push_token(
         raise HTTPException(status_code=404, detail="Routine not found")
 
     # Cập nhật giá trị push_token
-    print(data)
     routine.push_token = data.push_token
     # Lưu lại thay đổi vào cơ sở dữ liệu
     await routine.save()
+    await routine_cache.invalidate(user_id)
+    await refresh_partner_snapshot(user_id, event="routine")
+    await sync_schedule_push_token(routine.id, routine.push_token)
     await update_push_token_user(user_id, data.push_token)
 
     # Trả về phản hồi thành công với status code 200
@@ -321,15 +234,9 @@ async def update_push_token(
 @router.patch("/update-routine-name")
 async def update_routine_name(
     data: RoutineNameUpdate = Body(...),
-    token: str = Depends(JWTBearer())
+    principal: Principal = Depends(get_principal)
 ):
-    payload = decode_jwt(token)
-    user_id = payload.get("sub")
-
-    try:
-        user_id = ObjectId(user_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid user_id format")
+    user_id = principal.user_id
 
     routine = await Routine.find_one(Routine.user_id == user_id)
     if not routine:
@@ -337,15 +244,15 @@ async def update_routine_name(
 
     routine.routine_name = data.routine_name
     await routine.save()
+    await routine_cache.invalidate(user_id)
+    await refresh_partner_snapshot(user_id, event="routine")
 
     return {"status": 200, "message": "Push token updated successfully"}
 
 
 @router.get("/routine-in-time")
-async def get_routine_in_time(token: str = Depends(JWTBearer())):
-    payload = decode_jwt(token)
-    user_id = payload.get("sub")
-    user_id = ObjectId(user_id)
+async def get_routine_in_time(principal: Principal = Depends(get_principal)):
+    user_id = principal.user_id
     routine = await Routine.find_one(Routine.user_id == user_id)
     if not routine:
         raise HTTPException(status_code=404, detail="Routine not found")
@@ -2,7 +2,7 @@ from fastapi.security import HTTPBasicCredentials
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, Any, List, Dict
 from beanie import PydanticObjectId
-from datetime import datetime
+from datetime import date, datetime
 
 from schemas.routine import DaySchema
 
@@ -37,6 +37,25 @@ class UserBasicInfo(BaseModel):
     streak: Optional[int] = 0
 
 
+class PartnerView(BaseModel):
+    """Projection of the partner fields shown in couple responses."""
+    id: PydanticObjectId = Field(alias="_id")
+    fullname: Optional[str] = None
+    email: str
+    avatar: Optional[str] = None
+    streak: Optional[int] = 0
+
+
+class PartnerTrackerView(BaseModel):
+    """Projection of a partner's tracker, without routine_of_day."""
+    id: PydanticObjectId = Field(alias="_id")
+    user_id: PydanticObjectId
+    img_url: Optional[str] = None
+    date: date
+    class_summary: Optional[Dict[str, Any]] = None
+    timeTracking: Optional[str] = None
+
+
 class TodayTrackerSchema(BaseModel):
     id: str
     user_id: str
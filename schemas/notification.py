@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class PushTicket(BaseModel):
+    push_token: str
+    status: str
+    id: Optional[str] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "push_token": "ExponentPushToken[4nydRdM8BJ582YQ40-PiLm]",
+                "status": "ok",
+                "id": "XXXXXXXX-XXXX-XXXX-XXXX-XXXXXXXXXXXX"
+            }
+        }
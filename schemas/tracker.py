@@ -1,8 +1,9 @@
 from typing import List
 
 from beanie import PydanticObjectId
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
+from datetime import date
 
 class DayStatus(BaseModel):
     date: str
@@ -13,4 +14,15 @@ class TrackerSummary(BaseModel):
     id: str
     date: str
     time: Optional[str]
-    img: Optional[str]
\ No newline at end of file
+    img: Optional[str]
+
+class TrackerDate(BaseModel):
+    date: date
+
+
+class TrackerSummaryView(BaseModel):
+    """Projection of the tracker fields listed by date range, without routine_of_day."""
+    id: PydanticObjectId = Field(alias="_id")
+    date: date
+    timeTracking: Optional[str] = None
+    img_url: Optional[str] = None
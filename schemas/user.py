@@ -1,6 +1,7 @@
 from fastapi.security import HTTPBasicCredentials
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, Any
+from beanie import PydanticObjectId
 
 from schemas.routine import RoutineSchema
 
@@ -59,6 +60,7 @@ class UserData(BaseModel):
     role: Optional[str]
     avatar: Optional[str]
     streak: Optional[int]
+    longest_streak: Optional[int] = 0
     push_token: Optional[str]
     class Config:
         json_schema_extra = {
@@ -70,6 +72,7 @@ class UserData(BaseModel):
                 "role": "baseUser",
                 "avatar": "https://i.ibb.co/cN0nmSj/Screenshot-2023-06-23-at-01-11-12.png",
                 "streak": 0,
+                "longest_streak": 0,
                 "push_token": "1234567890"
             }
         }
@@ -92,4 +95,21 @@ class UserSignUp(BaseModel):
                 "gender": "male",
                 "avatar": "https://i.ibb.co/cN0nmSj/Screenshot-2023-06-23-at-01-11-12.png",
             }
-        }
\ No newline at end of file
+        }
+
+class UserId(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+
+
+class UserProfile(BaseModel):
+    """Projection of the profile fields of a user, without the password hash."""
+    id: Optional[PydanticObjectId] = Field(default=None, alias="_id")
+    fullname: Optional[str] = None
+    email: EmailStr
+    phone: Optional[str] = None
+    gender: Optional[str] = None
+    role: Optional[str] = None
+    avatar: Optional[str] = None
+    streak: Optional[int] = 0
+    longest_streak: Optional[int] = 0
+    push_token: Optional[str] = None
@@ -4,13 +4,14 @@ from service.send_notification_service import send_reminder_email, send_reminder
 from datetime import datetime
 import logging
 
-from models.couple import Couple
+from models.couple import Couple, pair_key
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from pymongo.errors import DuplicateKeyError
 from models.user import User
-from models.routine import Routine
+from models.routine import Routine, find_day
 from models.tracker import Tracker
 from models.request import Request, StatusEnum
-from routes.routine import serialize_day
-from schemas.routine import DaySchema, DayResponseSchema
+from service.snapshot_service import format_partner_data, get_partner_snapshot
 
 # Khởi tạo logger
 logger = logging.getLogger(__name__)
@@ -36,122 +37,72 @@ async def create_couple(user_1_id: PydanticObjectId, user_2_id: PydanticObjectId
         user_1=user_1_id,
         user_2=user_2_id
     )
-    await couple.create()
+    try:
+        await couple.create()
+    except DuplicateKeyError:
+        # Created concurrently by another accept
+        return await get_couple_by_users(user_1_id, user_2_id)
     return couple
 
 
-async def get_couple_by_users(user_1_id: PydanticObjectId, user_2_id: PydanticObjectId) -> Optional[Couple]:
+async def upsert_couple(
+    user_1_id: PydanticObjectId,
+    user_2_id: PydanticObjectId,
+    session: Optional[AsyncIOMotorClientSession] = None
+) -> None:
     """
-    Get a couple by its user IDs
-    
+    Create the couple of two users unless it exists, in a single write
+
     Args:
         user_1_id: ID of the first user
         user_2_id: ID of the second user
-        
-    Returns:
-        The couple document or None if not found
-    """
-    # Check both user order possibilities
-    couple = await Couple.find_one(
-        {"$or": [
-            {"user_1": user_1_id, "user_2": user_2_id},
-            {"user_1": user_2_id, "user_2": user_1_id}
-        ]}
+        session: Session of the running transaction, if any
+    """
+    couple = Couple(user_1=user_1_id, user_2=user_2_id)
+    document = couple.model_dump(exclude={"id", "revision_id"})
+    # Stored the way Beanie stores them
+    document.update(user_1=user_1_id, user_2=user_2_id)
+    await Couple.get_motor_collection().update_one(
+        {"pair_key": couple.pair_key}, {"$setOnInsert": document}, upsert=True, session=session
     )
-    return couple
 
 
-async def _get_partner_tracker(partner_id: PydanticObjectId) -> Optional[Tracker]:
+async def get_couple_by_users(user_1_id: PydanticObjectId, user_2_id: PydanticObjectId) -> Optional[Couple]:
     """
-    Get today's tracker for a user
+    Get a couple by its user IDs
     
     Args:
-        partner_id: ID of the user
+        user_1_id: ID of the first user
+        user_2_id: ID of the second user
         
     Returns:
-        Today's tracker or None if not found
+        The couple document or None if not found
     """
-    today = datetime.now().date()
-    return await Tracker.find_one(
-        {"user_id": partner_id, "date": today},
-        sort=[("timeTracking", -1)]  # Get the latest tracker for today
-    )
+    # The pair key is the same for both user orders
+    couple = await Couple.find_one(Couple.pair_key == pair_key(user_1_id, user_2_id))
+    return couple
 
 
-async def _get_partner_today_routine(partner_id: PydanticObjectId) -> Optional[DaySchema]:
+async def _get_couple_dashboard(couple: Couple, partner_id: PydanticObjectId) -> Optional[Dict[str, Any]]:
     """
-    Get today's routine for a user
+    Build the couple response from the partner's snapshot
     
     Args:
-        partner_id: ID of the user
+        couple: The couple document
+        partner_id: ID of the partner to show
         
     Returns:
-        Today's routine as DaySchema or None if not found
+        Detailed couple information or None if the partner does not exist
     """
-    today_name = datetime.now().strftime("%A")
-    partner_routine = await Routine.find_one(Routine.user_id == partner_id)
-    
-    if not partner_routine:
+    snapshot = await get_partner_snapshot(partner_id)
+    if not snapshot:
         return None
-        
-    for day in partner_routine.days:
-        if day.day_of_week.lower() == today_name.lower():
-            today_data = serialize_day(day)
-            return DayResponseSchema(
-                routine_name=partner_routine.routine_name,
-                push_token=partner_routine.push_token,
-                today=DaySchema.model_validate(today_data)
-            )
-    
-    return None
-
-
-def _format_tracker_response(tracker: Tracker) -> Dict[str, Any]:
-    """
-    Format tracker data for API response
     
-    Args:
-        tracker: Tracker object
-        
-    Returns:
-        Formatted tracker data ready for API response
-    """
     return {
-        "id": str(tracker.id),
-        "user_id": str(tracker.user_id),
-        "img_url": tracker.img_url,
-        "date": tracker.date.isoformat(),
-        "class_summary": tracker.class_summary,
-        "timeTracking": tracker.timeTracking
-    }
-
-
-async def _format_partner_data(partner: User, tracker: Optional[Tracker], today_routine: Optional[DaySchema]) -> Dict[str, Any]:
-    """
-    Format partner data for API response
-    
-    Args:
-        partner: Partner user object
-        tracker: Today's tracker (optional)
-        today_routine: Today's routine (optional)
-        
-    Returns:
-        Formatted partner data ready for API response
-    """
-    data = {
-        "id": str(partner.id),
-        "fullname": partner.fullname,
-        "email": partner.email,
-        "avatar": partner.avatar,
-        "streak": partner.streak,
-        "today_tracker": None,
-        "today_routine": today_routine
+        "id": str(couple.id),
+        "created_at": couple.created_at,
+        "partner": format_partner_data(snapshot)
     }
-    
-    if tracker:
-        data["today_tracker"] = _format_tracker_response(tracker)
-    
-    return data
 
 
 async def get_couple_by_id(couple_id: PydanticObjectId) -> Optional[Dict[str, Any]]:
@@ -169,22 +120,7 @@ async def get_couple_by_id(couple_id: PydanticObjectId) -> Optional[Dict[str, An
         return None
     
     # Determine who is the partner (using user_2 as partner for this endpoint)
-    partner = await User.get(couple.user_2)
-    if not partner:
-        return None
-    
-    # Get partner's data
-    partner_tracker = await _get_partner_tracker(partner.id)
-    partner_today_routine = await _get_partner_today_routine(partner.id)
-    
-    # Create response object
-    result = {
-        "id": str(couple.id),
-        "created_at": couple.created_at,
-        "partner": await _format_partner_data(partner, partner_tracker, partner_today_routine)
-    }
-    
-    return result
+    return await _get_couple_dashboard(couple, couple.user_2)
 
 
 async def get_couples_by_user(user_id: PydanticObjectId) -> Dict[str, Any]:
@@ -210,23 +146,7 @@ async def get_couples_by_user(user_id: PydanticObjectId) -> Dict[str, Any]:
     # Determine who is the partner
     partner_id = couple.user_2 if couple.user_1 == user_id else couple.user_1
     
-    # Get partner data
-    partner = await User.get(partner_id)
-    if not partner:
-        return {}
-    
-    # Get partner's data
-    partner_tracker = await _get_partner_tracker(partner.id)
-    partner_today_routine = await _get_partner_today_routine(partner.id)
-    
-    # Create response object
-    couple_data = {
-        "id": str(couple.id),
-        "created_at": couple.created_at,
-        "partner": await _format_partner_data(partner, partner_tracker, partner_today_routine)
-    }
-    
-    return couple_data
+    return await _get_couple_dashboard(couple, partner_id) or {}
 
 
 async def delete_couple_by_id(couple_id: PydanticObjectId) -> bool:
@@ -246,18 +166,19 @@ async def delete_couple_by_id(couple_id: PydanticObjectId) -> bool:
     
     # Delete any accepted requests between these users
     delete_result = await Request.find({
-        "$or": [
-            {"user_id": couple.user_1, "partner_id": couple.user_2},
-            {"user_id": couple.user_2, "partner_id": couple.user_1}
-        ],
+        "pair_key": couple.pair_key,
         "status": StatusEnum.accepted
     }).delete()
     
-    logger.info(f"Deleted {delete_result} accepted requests between users {couple.user_1} and {couple.user_2}")
+    logger.info(f"Deleted {delete_result.deleted_count} accepted requests between users {couple.user_1} and {couple.user_2}")
     
     # Delete the couple
-    await couple.delete()
-    logger.info(f"Deleted couple with ID: {couple_id} between users {couple.user_1} and {couple.user_2}")
+    result = await couple.delete()
+    if not result.deleted_count:
+        # Deleted concurrently by another request
+        logger.warning(f"Couple with ID: {couple_id} was already deleted")
+        return False
+    logger.info(f"Deleted {result.deleted_count} couple with ID: {couple_id} between users {couple.user_1} and {couple.user_2}")
     
     return True
 
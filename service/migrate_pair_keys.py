@@ -0,0 +1,75 @@
+import asyncio
+import os
+import sys
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo.errors import DuplicateKeyError
+
+from config.config import initiate_database
+from database.batching import process_in_batches
+from models.couple import Couple
+from models.request import Request, StatusEnum
+
+
+async def migrate_pair_keys(dry_run: bool = False, verbose: bool = True):
+    await initiate_database()
+
+    updated = {"couple": 0, "request": 0}
+    removed = {"couple": 0, "request": 0}
+
+    async def migrate_couple(couple: Couple):
+        # Loading the couple already derived pair_key, saving stores it
+        if dry_run:
+            updated["couple"] += 1
+            return
+        try:
+            await couple.save()
+            updated["couple"] += 1
+        except DuplicateKeyError:
+            # The pair already has a couple with a key, this one is a duplicate
+            if verbose:
+                print(f"⚠️ Removing duplicate couple {couple.id} ({couple.pair_key})")
+            await couple.delete()
+            removed["couple"] += 1
+
+    async def migrate_request(request: Request):
+        if dry_run:
+            updated["request"] += 1
+            return
+        try:
+            await request.save()
+            updated["request"] += 1
+            return
+        except DuplicateKeyError:
+            pass
+
+        existing = await Request.find_one(Request.pair_key == request.pair_key)
+        # Keep the accepted request of the pair, the pending one is redundant
+        redundant = request
+        if existing and existing.status == StatusEnum.pending and request.status == StatusEnum.accepted:
+            redundant = existing
+        if verbose:
+            print(f"⚠️ Removing duplicate request {redundant.id} ({redundant.pair_key})")
+        await redundant.delete()
+        removed["request"] += 1
+        if redundant is existing:
+            await request.save()
+            updated["request"] += 1
+
+    # Only documents that have not been backfilled yet
+    query = {"pair_key": {"$exists": False}}
+    scanned_couples = await process_in_batches(Couple, migrate_couple, "migrate_pair_keys_couple", query=query)
+    scanned_requests = await process_in_batches(Request, migrate_request, "migrate_pair_keys_request", query=query)
+
+    print("\n✅ Migration Summary")
+    print("────────────────────")
+    print(f"📄 Couples scanned: {scanned_couples}, updated: {updated['couple']}, duplicates removed: {removed['couple']}")
+    print(f"📄 Requests scanned: {scanned_requests}, updated: {updated['request']}, duplicates removed: {removed['request']}")
+    if dry_run:
+        print("⚠️ DRY RUN mode — no data was modified")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_pair_keys(dry_run=False, verbose=True))
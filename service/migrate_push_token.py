@@ -6,48 +6,36 @@ from typing import Optional
 # Add the project root directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from beanie import init_beanie
-from motor.motor_asyncio import AsyncIOMotorClient
-from config.config import Settings
+from config.config import initiate_database
+from database.batching import process_in_batches
 from models.user import User
 
 
 async def migrate_push_token(dry_run: bool = False, verbose: bool = True):
-    settings = Settings()
-    client = AsyncIOMotorClient(settings.DATABASE_URL)
+    await initiate_database()
 
-    # Initialize database connection with only the User model
-    await init_beanie(database=client.get_default_database(), document_models=[User])
-
-    # Find all users
-    users = await User.find_all().to_list()
     updated_users = 0
 
-    for user in users:
-        modified = False
-        
-        # Check if push_token is missing (None or doesn't exist)
-        if user.push_token is None:
-            user.push_token = ""  # Initialize with empty string
-            modified = True
-            
-            if verbose:
-                print(f"↪︎ Adding push_token field to user: {user.email}")
+    async def migrate(user: User):
+        nonlocal updated_users
+        # push_token is missing (None or doesn't exist)
+        user.push_token = ""  # Initialize with empty string
+        updated_users += 1
+
+        if verbose:
+            print(f"🛠 User `{user.email}` updated with push_token field")
 
-        if modified:
-            updated_users += 1
-            
+        if not dry_run:
+            await user.save()
             if verbose:
-                print(f"🛠 User `{user.email}` updated with push_token field")
+                print(f"✓ Changes saved for user {user.email}")
 
-            if not dry_run:
-                await user.save()
-                if verbose:
-                    print(f"✓ Changes saved for user {user.email}")
+    # Walk only the users without a push token, batch by batch
+    scanned = await process_in_batches(User, migrate, "migrate_push_token", query={"push_token": None})
 
     print("\n✅ Migration Summary")
     print("────────────────────")
-    print(f"📄 Users scanned: {len(users)}")
+    print(f"📄 Users scanned: {scanned}")
     print(f"🧩 Users updated: {updated_users}")
     if dry_run:
         print("⚠️ DRY RUN mode — no data was modified")
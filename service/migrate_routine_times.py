@@ -0,0 +1,49 @@
+import asyncio
+import os
+import sys
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import initiate_database
+from database.batching import process_in_batches
+from models.routine import Routine
+
+
+async def migrate_routine_times(dry_run: bool = False, verbose: bool = True):
+    await initiate_database()
+
+    updated_routines = 0
+    unparsed_sessions = 0
+
+    async def migrate(routine: Routine):
+        nonlocal updated_routines, unparsed_sessions
+        # Loading the routine already derived weekday and minute_of_day, saving stores them
+        for day in routine.days:
+            if day.weekday is None and verbose:
+                print(f"⚠️ Unknown day '{day.day_of_week}' in routine {routine.id}")
+            for session in day.sessions:
+                if session.minute_of_day is None:
+                    unparsed_sessions += 1
+                    if verbose:
+                        print(f"⚠️ Could not parse session time '{session.time}' in routine {routine.id}")
+
+        updated_routines += 1
+        if not dry_run:
+            await routine.save()
+
+    # Only routines that have not been backfilled yet
+    query = {"days": {"$elemMatch": {"weekday": {"$exists": False}}}}
+    scanned = await process_in_batches(Routine, migrate, "migrate_routine_times", query=query)
+
+    print("\n✅ Migration Summary")
+    print("────────────────────")
+    print(f"📄 Routines scanned: {scanned}")
+    print(f"🧩 Routines updated: {updated_routines}")
+    print(f"⚠️ Sessions with unparseable time: {unparsed_sessions}")
+    if dry_run:
+        print("⚠️ DRY RUN mode — no data was modified")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_routine_times(dry_run=False, verbose=True))
@@ -0,0 +1,26 @@
+import asyncio
+import os
+import sys
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import initiate_database
+from models.routine import Routine
+from service.schedule_service import rebuild_session_schedule
+
+
+async def migrate_session_schedule():
+    await initiate_database()
+
+    routines = await Routine.count()
+    entries = await rebuild_session_schedule()
+
+    print("\n✅ Migration Summary")
+    print("────────────────────")
+    print(f"📄 Routines scanned: {routines}")
+    print(f"🗓 Schedule entries written: {entries}")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_session_schedule())
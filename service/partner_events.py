@@ -0,0 +1,223 @@
+import asyncio
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from beanie import PydanticObjectId
+from redis.exceptions import RedisError
+
+from config.config import Settings
+from database.redis_client import get_redis
+from monitoring.fastapi_metrics import increment_partner_event_published, partner_event_streams
+
+logger = logging.getLogger(__name__)
+
+# Events kept per user for resuming, and how long an idle stream lives
+PARTNER_EVENTS_MAXLEN = 200
+PARTNER_EVENTS_TTL = 2 * 24 * 60 * 60
+# Events a slow subscriber may fall behind before it is dropped and has to resume
+SUBSCRIBER_QUEUE_SIZE = 100
+EVENT_ID_PATTERN = re.compile(r"^\d+-\d+$")
+
+
+def partner_events_key(user_id) -> str:
+    """Redis stream of the events about a user, read by their partner."""
+    return f"partner:events:{user_id}"
+
+
+def parse_event_id(event_id: str) -> Tuple[int, int]:
+    """Split a stream id such as "1718000000000-0" into comparable parts."""
+    milliseconds, _, sequence = event_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+async def publish_partner_event(user_id: PydanticObjectId, event_type: str, data: Dict[str, Any]) -> Optional[str]:
+    """
+    Append an event about a user to their stream.
+
+    Publishing never fails the write that triggered it; without REDIS_URL
+    it is a no-op.
+
+    Args:
+        user_id: ID of the user the event is about
+        event_type: Event name, such as "session_done", "tracker" or "streak"
+        data: JSON-serializable event payload
+
+    Returns:
+        The event id, or None if it was not published
+    """
+    if not Settings().REDIS_URL:
+        return None
+    key = partner_events_key(user_id)
+    try:
+        redis = get_redis()
+        event_id = await redis.xadd(
+            key, {"type": event_type, "data": json.dumps(data, default=str)},
+            maxlen=PARTNER_EVENTS_MAXLEN, approximate=True
+        )
+        await redis.expire(key, PARTNER_EVENTS_TTL)
+    except RedisError as e:
+        logger.warning(f"Could not publish {event_type} event of user {user_id}: {str(e)}")
+        return None
+    increment_partner_event_published(event_type)
+    return event_id
+
+
+class Subscription:
+    """Events of one stream for one connection, in id order and without duplicates."""
+
+    def __init__(self, key: str, last_id: str):
+        self.key = key
+        self.last_id = last_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.lagging = False
+        self.resync = False
+        # Live events held back while the backlog is being read
+        self._held: Optional[List[Tuple[str, Dict[str, str]]]] = None
+
+    def _put(self, event_id: str, fields: Dict[str, str]):
+        try:
+            self.queue.put_nowait((event_id, fields))
+        except asyncio.QueueFull:
+            self.lagging = True
+
+    def deliver(self, event_id: str, fields: Dict[str, str]):
+        """Queue a live event, or hold it until the backlog has been queued."""
+        if self._held is not None:
+            self._held.append((event_id, fields))
+        else:
+            self._put(event_id, fields)
+
+    def hold(self):
+        self._held = []
+
+    def release(self, backlog: List[Tuple[str, Dict[str, str]]] = ()):
+        """Queue the backlog, then the live events held meanwhile; accept drops the overlap."""
+        held, self._held = self._held or [], None
+        for event_id, fields in list(backlog) + held:
+            self._put(event_id, fields)
+
+    def accept(self, event_id: str) -> bool:
+        """Advance the cursor past an event, False if it was already sent."""
+        if parse_event_id(event_id) <= parse_event_id(self.last_id):
+            return False
+        self.last_id = event_id
+        return True
+
+
+class PartnerEventHub:
+    """
+    Fans the partner event streams out to the open connections of a process.
+
+    One task reads every stream with a subscriber through a single blocking
+    XREAD, so idle connections hold no Redis connection of their own.
+    """
+
+    def __init__(self, block_ms: int = 1000, retry_delay: float = 1.0):
+        self.block_ms = block_ms
+        self.retry_delay = retry_delay
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._cursors: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    async def subscribe(self, user_id: PydanticObjectId, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Start receiving the events about a user.
+
+        When resuming, the events after `last_event_id` are replayed. When not
+        resuming, or when the stream no longer holds every event after it,
+        the subscription is flagged `resync` and starts at the latest event:
+        the caller should send the full current state first.
+
+        Args:
+            user_id: ID of the user whose events are wanted
+            last_event_id: Last event id the client received, to resume after it
+
+        Returns:
+            The subscription
+        """
+        key = partner_events_key(user_id)
+        redis = get_redis()
+        if last_event_id and not EVENT_ID_PATTERN.match(last_event_id):
+            last_event_id = None
+        if key not in self._cursors:
+            self._cursors[key] = await self._latest_id(key)
+        # Registered before reading the backlog, so no event falls in between;
+        # live events are held until the backlog is queued ahead of them
+        subscription = Subscription(key, last_event_id or self._cursors[key])
+        if last_event_id:
+            subscription.hold()
+        self._subscriptions.setdefault(key, set()).add(subscription)
+        partner_event_streams.inc()
+        self._ensure_running()
+
+        subscription.resync = last_event_id is None
+        if not last_event_id:
+            return subscription
+        try:
+            oldest = await redis.xrange(key, count=1)
+            backlog = await redis.xrange(key, min=f"({last_event_id}", max="+", count=SUBSCRIBER_QUEUE_SIZE)
+            trimmed = bool(oldest) and parse_event_id(oldest[0][0]) > parse_event_id(last_event_id)
+            if trimmed or len(backlog) == SUBSCRIBER_QUEUE_SIZE:
+                subscription.resync = True
+                subscription.last_id = await self._latest_id(key)
+                backlog = []
+        except Exception:
+            self.unsubscribe(subscription)
+            raise
+        subscription.release(backlog)
+        return subscription
+
+    @staticmethod
+    async def _latest_id(key: str) -> str:
+        latest = await get_redis().xrevrange(key, count=1)
+        return latest[0][0] if latest else "0-0"
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.key)
+        if subscriptions is None or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        partner_event_streams.dec()
+        if not subscriptions:
+            del self._subscriptions[subscription.key]
+            del self._cursors[subscription.key]
+
+    def _ensure_running(self):
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            if not self._subscriptions:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            streams = dict(self._cursors)
+            try:
+                response = await get_redis().xread(streams, count=SUBSCRIBER_QUEUE_SIZE, block=self.block_ms)
+            except RedisError as e:
+                logger.warning(f"Partner event hub read failed: {str(e)}")
+                await asyncio.sleep(self.retry_delay)
+                continue
+            for key, events in response or []:
+                if key not in self._cursors:
+                    continue
+                for event_id, fields in events:
+                    for subscription in list(self._subscriptions.get(key, ())):
+                        subscription.deliver(event_id, fields)
+                self._cursors[key] = events[-1][0]
+
+
+def format_sse(event_id: Optional[str], event_type: str, data: str) -> str:
+    """Format one server-sent event."""
+    lines = [f"id: {event_id}"] if event_id else []
+    lines.append(f"event: {event_type}")
+    lines.extend(f"data: {line}" for line in data.splitlines() or [""])
+    return "\n".join(lines) + "\n\n"
+
+
+partner_event_hub = PartnerEventHub()
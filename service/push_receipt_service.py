@@ -0,0 +1,74 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from beanie import PydanticObjectId
+
+from database.celery_worker import celery_app, run_async
+from database.redis_client import run_exclusive
+from models.notification import PushTicketRecord
+from monitoring.fastapi_metrics import increment_push_delivered, increment_push_failed
+from service.push_service import DEVICE_NOT_REGISTERED, prune_push_tokens, push_client
+
+logger = logging.getLogger(__name__)
+
+# Expo keeps receipts for 24 hours and recommends waiting before fetching them
+RECEIPT_DELAY = timedelta(minutes=15)
+RECEIPT_RETENTION = timedelta(hours=24)
+
+
+async def real_process_push_receipts(batch_size=1000):
+    """
+    Fetch receipts for recorded push tickets, count outcomes and prune dead tokens.
+
+    Tickets whose receipt is not available yet are kept for the next run
+    until they are older than Expo's receipt retention.
+
+    Args:
+        batch_size (int): Number of tickets per receipt request
+    """
+    now = datetime.now()
+    expired = await PushTicketRecord.find(PushTicketRecord.created_at < now - RECEIPT_RETENTION).delete()
+    logger.info(f"Processing push receipts ({expired.deleted_count if expired else 0} expired tickets dropped)")
+
+    delivered = failed = 0
+    last_id: Optional[PydanticObjectId] = None
+    while True:
+        query = [PushTicketRecord.created_at <= now - RECEIPT_DELAY]
+        if last_id is not None:
+            query.append(PushTicketRecord.id > last_id)
+        records = await PushTicketRecord.find(*query).sort("_id").limit(batch_size).to_list()
+        if not records:
+            break
+        last_id = records[-1].id
+
+        receipts = await push_client.get_receipts([record.ticket_id for record in records])
+
+        processed_ids = []
+        dead_tokens = []
+        for record in records:
+            receipt = receipts.get(record.ticket_id)
+            if receipt is None:
+                continue
+            processed_ids.append(record.id)
+            if receipt.get("status") == "ok":
+                delivered += 1
+                continue
+
+            failed += 1
+            error = (receipt.get("details") or {}).get("error")
+            increment_push_failed(error)
+            if error == DEVICE_NOT_REGISTERED:
+                dead_tokens.append(record.push_token)
+
+        await prune_push_tokens(dead_tokens)
+        if processed_ids:
+            await PushTicketRecord.find({"_id": {"$in": processed_ids}}).delete()
+
+    increment_push_delivered(delivered)
+    logger.info(f"Push receipts processed: {delivered} delivered, {failed} failed")
+
+
+@celery_app.task(bind=True)
+def process_push_receipts(self):
+    run_async(run_exclusive("process_push_receipts", real_process_push_receipts, ttl=900))
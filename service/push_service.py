@@ -0,0 +1,246 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import httpx
+
+from config.config import Settings
+from database.cache import routine_cache, user_cache
+from models.notification import PushTicketRecord
+from models.routine import Routine
+from models.schedule import SessionSchedule
+from models.user import User
+from monitoring.fastapi_metrics import increment_push_failed, increment_push_tokens_pruned
+from schemas.notification import PushTicket
+
+logger = logging.getLogger(__name__)
+
+EXPO_PUSH_URL = "https://exp.host/--/api/v2/push/send"
+EXPO_BATCH_SIZE = 100  # Expo accepts at most 100 messages per request
+EXPO_RECEIPT_BATCH_SIZE = 1000  # Expo accepts at most 1000 receipt ids per request
+DEVICE_NOT_REGISTERED = "DeviceNotRegistered"
+
+
+def build_push_message(push_token: str, title: str, body: str, data: Optional[Dict] = None) -> Dict:
+    """
+    Build an Expo push message.
+
+    Args:
+        push_token: The device push notification token
+        title: The notification title
+        body: The notification body text
+        data: Optional additional data for the notification
+
+    Returns:
+        Dict: The message in Expo's format
+    """
+    message = {
+        "to": push_token,
+        "sound": "default",
+        "title": title,
+        "body": body,
+        "badge": 1,
+    }
+    if data:
+        message["data"] = data
+    return message
+
+
+class ExpoPushClient:
+    """
+    Sends push notifications through the Expo push API.
+
+    One HTTP client is kept open and reused for every send; messages are
+    split into batches of 100 and at most `max_concurrency` batches are in
+    flight at once.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        settings = Settings()
+        self.url = url or settings.push_notification_url or EXPO_PUSH_URL
+        self.receipts_url = self.url.replace("/push/send", "/push/getReceipts")
+        self.max_concurrency = max_concurrency or settings.push_notification_concurrency or 4
+        self.timeout = timeout
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # The connection pool is bound to the event loop it was opened on
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                transport=self.transport,
+                headers={"Accept": "application/json", "Accept-Encoding": "gzip, deflate"},
+            )
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def send(self, messages: List[Dict]) -> List[PushTicket]:
+        """
+        Send messages in batches and return one ticket per message.
+
+        Args:
+            messages: Messages built with build_push_message
+
+        Returns:
+            List[PushTicket]: Tickets in the same order as the messages
+        """
+        messages = [message for message in messages if message.get("to")]
+        if not messages:
+            return []
+
+        client = self._get_client()
+        chunks = [messages[i:i + EXPO_BATCH_SIZE] for i in range(0, len(messages), EXPO_BATCH_SIZE)]
+        results = await asyncio.gather(*[self._send_chunk(client, chunk) for chunk in chunks])
+        return [ticket for tickets in results for ticket in tickets]
+
+    async def _send_chunk(self, client: httpx.AsyncClient, chunk: List[Dict]) -> List[PushTicket]:
+        async with self._semaphore:
+            try:
+                response = await client.post(self.url, json=chunk)
+            except httpx.HTTPError as e:
+                logger.error(f"Error sending push notification batch: {str(e)}")
+                return self._failed(chunk, str(e))
+
+        if response.status_code != 200:
+            logger.error(f"Failed to send push notification batch: {response.text}")
+            return self._failed(chunk, response.text)
+
+        data = response.json().get("data") or []
+        if len(data) != len(chunk):
+            logger.error(f"Expo returned {len(data)} tickets for {len(chunk)} messages")
+            return self._failed(chunk, "Ticket count mismatch")
+
+        tickets = []
+        for message, ticket in zip(chunk, data):
+            details = ticket.get("details") or {}
+            tickets.append(PushTicket(
+                push_token=message["to"],
+                status=ticket.get("status", "error"),
+                id=ticket.get("id"),
+                message=ticket.get("message"),
+                error=details.get("error"),
+            ))
+            if ticket.get("status") != "ok":
+                logger.warning(f"Push notification to {message['to']} failed: {ticket.get('message')}")
+        return tickets
+
+    async def get_receipts(self, ticket_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch push receipts for the given ticket ids.
+
+        Args:
+            ticket_ids: Ids of tickets returned by send
+
+        Returns:
+            Dict mapping ticket id to receipt; ids without a receipt yet are missing
+        """
+        client = self._get_client()
+        receipts = {}
+        for i in range(0, len(ticket_ids), EXPO_RECEIPT_BATCH_SIZE):
+            chunk = ticket_ids[i:i + EXPO_RECEIPT_BATCH_SIZE]
+            async with self._semaphore:
+                try:
+                    response = await client.post(self.receipts_url, json={"ids": chunk})
+                except httpx.HTTPError as e:
+                    logger.error(f"Error fetching push receipts: {str(e)}")
+                    continue
+            if response.status_code != 200:
+                logger.error(f"Failed to fetch push receipts: {response.text}")
+                continue
+            receipts.update(response.json().get("data") or {})
+        return receipts
+
+    @staticmethod
+    def _failed(chunk: List[Dict], message: str) -> List[PushTicket]:
+        return [PushTicket(push_token=item["to"], status="error", message=message) for item in chunk]
+
+    async def aclose(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+push_client = ExpoPushClient()
+
+
+async def prune_push_tokens(push_tokens: List[str]) -> int:
+    """
+    Remove push tokens of uninstalled apps from users, routines and the reminder schedule.
+
+    Args:
+        push_tokens: Tokens Expo reported as DeviceNotRegistered
+
+    Returns:
+        int: Number of user and routine documents updated
+    """
+    tokens = list(set(push_tokens))
+    if not tokens:
+        return 0
+
+    unset = {"$set": {"push_token": None}}
+    users, routines, _ = await asyncio.gather(
+        User.get_motor_collection().update_many({"push_token": {"$in": tokens}}, unset),
+        Routine.get_motor_collection().update_many({"push_token": {"$in": tokens}}, unset),
+        SessionSchedule.get_motor_collection().update_many({"push_token": {"$in": tokens}}, unset),
+    )
+    pruned = users.modified_count + routines.modified_count
+    if users.modified_count:
+        await user_cache.invalidate_all()
+    if routines.modified_count:
+        await routine_cache.invalidate_all()
+    increment_push_tokens_pruned(pruned)
+    logger.info(f"Pruned {len(tokens)} dead push tokens from {pruned} users and routines")
+    return pruned
+
+
+async def record_push_tickets(tickets: List[PushTicket]):
+    """
+    Keep accepted tickets for receipt polling and handle rejected ones right away.
+
+    Args:
+        tickets: Tickets returned by ExpoPushClient.send
+    """
+    accepted = [
+        PushTicketRecord(ticket_id=ticket.id, push_token=ticket.push_token)
+        for ticket in tickets if ticket.status == "ok" and ticket.id
+    ]
+    if accepted:
+        await PushTicketRecord.insert_many(accepted)
+
+    dead_tokens = []
+    for ticket in tickets:
+        if ticket.status == "ok":
+            continue
+        increment_push_failed(ticket.error)
+        if ticket.error == DEVICE_NOT_REGISTERED:
+            dead_tokens.append(ticket.push_token)
+    await prune_push_tokens(dead_tokens)
+
+
+async def send_push_messages(messages: List[Dict]) -> List[PushTicket]:
+    """
+    Send messages through the shared client and record their tickets.
+
+    Args:
+        messages: Messages built with build_push_message
+
+    Returns:
+        List[PushTicket]: One ticket per message with a push token
+    """
+    tickets = await push_client.send(messages)
+    try:
+        await record_push_tickets(tickets)
+    except Exception as e:
+        logger.error(f"Error recording push tickets: {str(e)}")
+    return tickets
@@ -1,15 +1,24 @@
+from models.couple import pair_key
 from models.request import Request, StatusEnum
+from pymongo.errors import DuplicateKeyError
 from models.user import User
 from datetime import datetime
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, List, Optional, Tuple, Type, TypeVar, Union, Any
 from fastapi import HTTPException
 from beanie import PydanticObjectId
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from database.pagination import after_cursor, encode_cursor
+from database.transactions import run_in_transaction
+from schemas.request import ReceivedRequestSchema, SentRequestSchema
 from service.send_notification_service import send_request_friend_notification, send_email_request_friend
+from service.user_service import get_user_profile
 import logging
 
 # Khởi tạo logger
 logger = logging.getLogger(__name__)
 
+RequestPage = TypeVar("RequestPage", ReceivedRequestSchema, SentRequestSchema)
+
 async def check_can_create_request(user_id: PydanticObjectId, partner_id: PydanticObjectId) -> bool:
     """
     Check if a request can be created between two users.
@@ -22,10 +31,7 @@ async def check_can_create_request(user_id: PydanticObjectId, partner_id: Pydant
         bool: True if a request can be created, False otherwise
     """
     existing_request = await Request.find_one({
-        "$or": [
-            {"user_id": user_id, "partner_id": partner_id},
-            {"user_id": partner_id, "partner_id": user_id}
-        ],
+        "pair_key": pair_key(user_id, partner_id),
         "status": {"$in": [StatusEnum.pending, StatusEnum.accepted]}
     })
     return existing_request is None
@@ -42,11 +48,14 @@ async def create_send_request(user_id: PydanticObjectId, partner_id: PydanticObj
         Request: The created request object
     
     Raises:
-        HTTPException: If there's an error creating the request
+        HTTPException: 409 if the pair already has a request, 500 on other errors
     """
     try:
         request = Request(user_id=user_id, partner_id=partner_id)
-        return await request.save()
+        return await request.insert()
+    except DuplicateKeyError:
+        # A concurrent request between the same users got in first
+        raise HTTPException(status_code=409, detail="Friend request already exists between these users")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create request: {str(e)}")
 
@@ -65,7 +74,7 @@ async def send_request_friend(request: Request, user_exists: User) -> Dict[str,
         HTTPException: If the current user can't be found or notification fails
     """
     try:
-        current_user = await User.find_one(User.id == request.user_id)
+        current_user = await get_user_profile(request.user_id)
         if not current_user:
             raise HTTPException(status_code=404, detail="Current user not found")
             
@@ -83,94 +92,103 @@ async def send_request_friend(request: Request, user_exists: User) -> Dict[str,
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send request: {str(e)}")
 
-async def get_list_request_received(user_id: PydanticObjectId) -> List[Dict[str, Any]]:
+# Largest page the request listings return
+MAX_REQUEST_PAGE_SIZE = 100
+
+
+async def _list_pending_requests(
+    user_field: str,
+    other_field: str,
+    info_field: str,
+    schema: Type[RequestPage],
+    user_id: PydanticObjectId,
+    limit: int,
+    after: Dict[str, Any]
+) -> Tuple[List[RequestPage], Optional[str]]:
+    """
+    Read one page of a user's pending requests with the other user's info, in one aggregation.
+
+    The page starts after the `after` filter, built from the previous page's cursor.
+    """
+    limit = max(1, min(limit, MAX_REQUEST_PAGE_SIZE))
+    pipeline = [
+        {"$match": {user_field: user_id, "status": StatusEnum.pending, **after}},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        # One extra document tells whether there is a next page
+        {"$limit": limit + 1},
+        {"$lookup": {"from": User.get_motor_collection().name, "localField": other_field,
+                     "foreignField": "_id", "as": info_field}},
+        {"$unwind": {"path": f"${info_field}", "preserveNullAndEmptyArrays": True}},
+        {"$project": {
+            "_id": 0, "id": "$_id", "user_id": 1, "partner_id": 1, "status": 1, "created_at": 1,
+            f"{info_field}.fullname": 1, f"{info_field}.email": 1, f"{info_field}.avatar": 1
+        }}
+    ]
+    rows = await Request.get_motor_collection().aggregate(pipeline).to_list(None)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return [schema.model_validate(row) for row in rows], next_cursor
+
+
+async def get_list_request_received(
+    user_id: PydanticObjectId, limit: int = 20, cursor: Optional[str] = None
+) -> Tuple[List[ReceivedRequestSchema], Optional[str]]:
     """
-    Get a list of pending friend requests received by a user.
+    Get a page of pending friend requests received by a user, newest first.
     Includes information about the sender (user_id).
     
     Args:
         user_id: The ID of the user
+        limit: Maximum number of requests to return
+        cursor: Cursor returned with the previous page, None for the first page
     
     Returns:
-        List[Dict]: List of pending requests with sender information
+        Tuple of the pending requests with sender information and the next page's cursor, None on the last page
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
     """
     try:
-        # Lấy tất cả lời mời nhận được
-        requests = await Request.find(Request.partner_id == user_id, Request.status == StatusEnum.pending).to_list()
-        
-        # Tạo danh sách ID của người gửi để query một lần
-        sender_ids = [request.user_id for request in requests]
-        
-        # Lấy thông tin tất cả người gửi trong một lần query
-        senders = await User.find({"_id": {"$in": sender_ids}}).to_list()
-        
-        # Tạo map để dễ dàng truy cập
-        sender_map = {str(sender.id): sender for sender in senders}
-        
-        # Tạo kết quả
-        result = []
-        for request in requests:
-            request_dict = request.dict()
-            sender_id = str(request.user_id)
-            
-            # Thêm thông tin người gửi nếu có
-            if sender_id in sender_map:
-                sender = sender_map[sender_id]
-                request_dict["sender_info"] = {
-                    "fullname": sender.fullname,
-                    "email": sender.email,
-                    "avatar": sender.avatar
-                }
-            
-            result.append(request_dict)
-            
-        return result
+        after = after_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await _list_pending_requests(
+            "partner_id", "user_id", "sender_info", ReceivedRequestSchema, user_id, limit, after
+        )
     except Exception as e:
         logger.error(f"Error fetching received requests: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch received requests: {str(e)}")
 
-async def get_sent_request(user_id: PydanticObjectId) -> List[Dict[str, Any]]:
+async def get_sent_request(
+    user_id: PydanticObjectId, limit: int = 20, cursor: Optional[str] = None
+) -> Tuple[List[SentRequestSchema], Optional[str]]:
     """
-    Get a list of pending friend requests sent by a user.
+    Get a page of pending friend requests sent by a user, newest first.
     Includes information about the receiver (partner_id).
     
     Args:
         user_id: The ID of the user
+        limit: Maximum number of requests to return
+        cursor: Cursor returned with the previous page, None for the first page
     
     Returns:
-        List[Dict]: List of pending requests with receiver information
+        Tuple of the pending requests with receiver information and the next page's cursor, None on the last page
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
     """
     try:
-        # Lấy tất cả lời mời đã gửi
-        requests = await Request.find(Request.user_id == user_id, Request.status == StatusEnum.pending).to_list()
-        
-        # Tạo danh sách ID của người nhận để query một lần
-        receiver_ids = [request.partner_id for request in requests]
-        
-        # Lấy thông tin tất cả người nhận trong một lần query
-        receivers = await User.find({"_id": {"$in": receiver_ids}}).to_list()
-        
-        # Tạo map để dễ dàng truy cập
-        receiver_map = {str(receiver.id): receiver for receiver in receivers}
-        
-        # Tạo kết quả
-        result = []
-        for request in requests:
-            request_dict = request.dict()
-            receiver_id = str(request.partner_id)
-            
-            # Thêm thông tin người nhận nếu có
-            if receiver_id in receiver_map:
-                receiver = receiver_map[receiver_id]
-                request_dict["receiver_info"] = {
-                    "fullname": receiver.fullname,
-                    "email": receiver.email,
-                    "avatar": receiver.avatar
-                }
-            
-            result.append(request_dict)
-            
-        return result
+        after = after_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await _list_pending_requests(
+            "user_id", "partner_id", "receiver_info", SentRequestSchema, user_id, limit, after
+        )
     except Exception as e:
         logger.error(f"Error fetching sent requests: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch sent requests: {str(e)}")
@@ -178,6 +196,11 @@ async def get_sent_request(user_id: PydanticObjectId) -> List[Dict[str, Any]]:
 async def accept_request(request_id: PydanticObjectId, user_id: PydanticObjectId) -> Request:
     """
     Accept a friend request and create a couple relationship.
+
+    Marking the request accepted, creating the couple and deleting the other
+    pending requests of the pair run in one transaction on a replica set.
+    Elsewhere they run in order, and the request is put back to pending if
+    the couple cannot be created.
     
     Args:
         request_id: The ID of the request to accept
@@ -198,24 +221,46 @@ async def accept_request(request_id: PydanticObjectId, user_id: PydanticObjectId
         
     if request.status != StatusEnum.pending:
         raise HTTPException(status_code=400, detail=f"Request is already {request.status}")
-    
-    # Chuyển trạng thái của request hiện tại thành accepted
+
+    # Import here to avoid circular imports
+    from service.couple_service import upsert_couple
+
+    collection = Request.get_motor_collection()
+
+    async def accept(session):
+        # Conditional on the status, so a concurrent accept or cancel wins cleanly
+        result = await collection.update_one(
+            {"_id": request.id, "status": StatusEnum.pending},
+            {"$set": {"status": StatusEnum.accepted}},
+            session=session
+        )
+        if result.matched_count == 0:
+            raise HTTPException(status_code=409, detail="Request was changed by another action")
+
+        try:
+            await upsert_couple(request.user_id, request.partner_id, session=session)
+        except Exception as e:
+            if session is None:
+                # No transaction to abort, undo the status change instead
+                await collection.update_one(
+                    {"_id": request.id, "status": StatusEnum.accepted},
+                    {"$set": {"status": StatusEnum.pending}}
+                )
+            logger.error(f"Failed to create couple: {str(e)}")
+            raise HTTPException(status_code=500, detail="Failed to create couple")
+
+        await cleanup_other_requests(request.user_id, request.partner_id, request.id, session=session)
+
+    await run_in_transaction(collection.database, accept)
     request.status = StatusEnum.accepted
-    await request.save()
-    
-    # Create a couple relationship between the users
-    try:
-        # Import here to avoid circular imports
-        from service.couple_service import create_couple
-        await create_couple(request.user_id, request.partner_id)
-    except Exception as e:
-        # Log the error but don't fail the request acceptance
-        logger.error(f"Failed to create couple: {str(e)}")
-    
-    # Trả về request để API có thể phản hồi nhanh
     return request
 
-async def cleanup_other_requests(user_id: PydanticObjectId, partner_id: PydanticObjectId, accepted_request_id: PydanticObjectId) -> int:
+async def cleanup_other_requests(
+    user_id: PydanticObjectId,
+    partner_id: PydanticObjectId,
+    accepted_request_id: PydanticObjectId,
+    session: Optional[AsyncIOMotorClientSession] = None
+) -> int:
     """
     Xóa các lời mời kết bạn khác giữa hai người dùng sau khi một lời mời đã được chấp nhận.
     
@@ -223,30 +268,18 @@ async def cleanup_other_requests(user_id: PydanticObjectId, partner_id: Pydantic
         user_id: ID của người dùng thứ nhất
         partner_id: ID của người dùng thứ hai
         accepted_request_id: ID của lời mời đã được chấp nhận (để loại trừ khỏi việc xóa)
+        session: Session của transaction đang chạy, nếu có
         
     Returns:
         int: Số lượng lời mời đã bị xóa
     """
-    # Tìm các lời mời kết bạn khác giữa hai người dùng
-    other_requests = await Request.find({
-        "$and": [
-            {
-                "$or": [
-                    {"user_id": user_id, "partner_id": partner_id},
-                    {"user_id": partner_id, "partner_id": user_id}
-                ]
-            },
-            {"_id": {"$ne": accepted_request_id}},
-            {"status": StatusEnum.pending}
-        ]
-    }).to_list()
-    
-    # Đếm số lượng lời mời cần xóa
-    count = len(other_requests)
-    
-    # Xóa các lời mời này
-    for other_request in other_requests:
-        await other_request.delete()
+    # Xóa các lời mời khác giữa hai người dùng trong một lệnh
+    result = await Request.get_motor_collection().delete_many({
+        "pair_key": pair_key(user_id, partner_id),
+        "_id": {"$ne": accepted_request_id},
+        "status": StatusEnum.pending
+    }, session=session)
+    count = result.deleted_count
     
     # Log kết quả
     logger.info(f"Deleted {count} redundant friend requests between users {user_id} and {partner_id}")
@@ -1,16 +1,32 @@
-import asyncio
-import httpx
 import logging
-from datetime import datetime, timedelta
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+from celery import chord
+from pymongo import UpdateMany
 from beanie import PydanticObjectId
-from database.database import add_routine
-from models.routine import Day, Routine, Session, Step
-from database.celery_worker import celery_app
-from config.config import initiate_database
+from database.database import add_routine, get_or_create_checkpoint
+from models.routine import Day, Routine, Session, Step, StatusEnum, WEEKDAYS, find_day, minute_of_day
+from models.schedule import SessionSchedule
+from models.job import JobCheckpoint
+from config.config import Settings
+from monitoring.fastapi_metrics import record_background_job_duration, record_background_job_batch_duration
+from service.schedule_service import due_sessions_query, get_due_sessions, get_overdue_sessions, \
+    overdue_sessions_query, split_schedule_shards, sync_routine_schedule
+from service.push_service import build_push_message, send_push_messages
+from database.celery_worker import celery_app, run_async
+from database.redis_client import run_exclusive
+from database.cache import routine_cache
+from service.snapshot_service import expire_partner_snapshots, refresh_partner_snapshot
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CRON_NOTIFICATION_JOB = "cron_notification"
+MARK_NOT_DONE_JOB = "mark_not_done"
+RESET_SESSIONS_JOB = "reset_sessions_status"
+
 async def create_routine_for_new_user(user_id: PydanticObjectId):
     logger.info(f"Creating routine for new user: {user_id}")
     
@@ -60,150 +76,318 @@ async def create_routine_for_new_user(user_id: PydanticObjectId):
     )
 
     new_routine = await add_routine(routine)
+    await sync_routine_schedule(new_routine)
     logger.info(f"New routine created: {new_routine.id}")
     return new_routine
 
-async def get_routine_by_user_id(user_id: PydanticObjectId):
-    return await Routine.find_one(Routine.user_id == user_id)
+async def get_routine_by_user_id(user_id: PydanticObjectId) -> Optional[Routine]:
+    """
+    Get a user's routine for reading, through the routine cache.
+
+    Callers that modify and save the routine must load it from MongoDB instead.
+    """
+    return await routine_cache.get(
+        user_id, lambda: Routine.find_one(Routine.user_id == PydanticObjectId(user_id))
+    )
+
+async def routine_exists(user_id: PydanticObjectId) -> bool:
+    """Check whether a user has a routine without loading it."""
+    # Projecting only user_id lets the user_id index answer without fetching the document
+    routine = await Routine.get_motor_collection().find_one(
+        {"user_id": user_id}, {"_id": 0, "user_id": 1}
+    )
+    return routine is not None
 
 async def send_push_notification(push_token: str, title: str, subtitle: str, body: str):
     logger.info(f"Sending push notification to {push_token}")
-    message = {
-        "to": push_token,
-        "sound": "default",
-        "title": title,
-        "body": body,
-        "badge": 1,
-    }
-    url = "https://exp.host/--/api/v2/push/send"
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=message)
-        if response.status_code == 200:
-            logger.info(f"Notification sent successfully to {push_token}")
-        else:
-            logger.error(f"Failed to send notification to {push_token}: {response.text}")
-
-async def check_and_send_routine_notifications(user_routine: Routine):
-    current_day = datetime.now().strftime('%A')
-    current_time = datetime.now().strftime('%I:%M %p').strip()
-    if not user_routine.push_token:
+    tickets = await send_push_messages([build_push_message(push_token, title, body)])
+    if tickets and tickets[0].status == "ok":
+        logger.info(f"Notification sent successfully to {push_token}")
+
+async def send_due_reminders(entries: List[SessionSchedule]):
+    title = "Time for skincare"
+    messages = [
+        build_push_message(
+            entry.push_token,
+            title,
+            f"You have {entry.steps_count} steps in your skincare routine at {entry.time.strip()}."
+        )
+        for entry in entries
+    ]
+    tickets = await send_push_messages(messages)
+    sent = sum(1 for ticket in tickets if ticket.status == "ok")
+    logger.info(f"Sent {sent}/{len(messages)} routine reminders")
+    return sent
+
+def summarize_shard_results(job: str, results: List[Dict], started_at: float) -> Dict:
+    """
+    Aggregate the results of a job's shards and record the job duration.
+
+    Args:
+        job: Job name
+        results: One result dict per shard, each with a "duration" in seconds
+        started_at: Wall clock time (time.time()) the job was dispatched at
+
+    Returns:
+        Dict: Totals over all shards plus the per-shard durations
+    """
+    summary = {"job": job, "shards": len(results), "durations": []}
+    for result in results:
+        summary["durations"].append(round(result["duration"], 3))
+        for key, value in result.items():
+            if key not in ("duration", "lower", "upper"):
+                summary[key] = summary.get(key, 0) + value
+
+    duration = time.time() - started_at
+    record_background_job_duration(job, duration)
+    logger.info(f"{job} finished in {duration:.2f}s over {len(results)} shards: {summary}")
+    return summary
+
+def dispatch_shards(shard_task, args: tuple, shards: List[Tuple[Optional[str], Optional[str]]], callback):
+    """Run one shard task per routine_id range in parallel, then the callback with all results."""
+    chord(shard_task.s(*args, lower, upper) for lower, upper in shards)(callback)
+
+async def real_mark_not_done():
+    """
+    Mark today's sessions as 'not_done' once their deadline has passed.
+
+    Only schedule entries whose deadline fell since the previous run are
+    read. Large windows are split into routine_id shards processed in
+    parallel by the workers; the checkpoint moves forward once every shard
+    has finished.
+    """
+    started_at = time.time()
+    now = datetime.now()
+    now_minute = minute_of_day(now)
+
+    checkpoint = await get_or_create_checkpoint(MARK_NOT_DONE_JOB, now.date())
+    after_minute = checkpoint.last_minute
+    settings = Settings()
+    shards = await split_schedule_shards(
+        overdue_sessions_query(now.weekday(), after_minute, now_minute),
+        settings.cron_shard_size, settings.cron_max_shards
+    )
+
+    args = (now.weekday(), after_minute, now_minute)
+    if len(shards) > 1:
+        dispatch_shards(
+            mark_not_done_shard, args, shards,
+            mark_not_done_completed.s(now.date().isoformat(), now_minute, started_at)
+        )
+        logger.info(f"mark_not_done dispatched to {len(shards)} shards")
         return
-    for day in user_routine.days:
-        if day.day_of_week == current_day:
-            for session in day.sessions:
-                if session.time.strip() == current_time:
-                    title = "Time for skincare"
-                    body = f"You have {len(session.steps)} steps in your skincare routine at {session.time.strip()}."
-                    await send_push_notification(user_routine.push_token, title, "", body)
-
-async def real_mark_not_done(batch_size=100):
-    # Initialize database connection first
-    await initiate_database()
-    
-    logger.info("Marking sessions as 'not_done' if applicable...")
-    skip = 0
-    while True:
-        routines = await Routine.find_all().skip(skip).limit(batch_size).to_list()
-        if not routines:
-            break
-        tasks = [process_routine(routine) for routine in routines]
-        await asyncio.gather(*tasks)
-        skip += batch_size
-    logger.info("Marking process completed.")
+
+    results = [await real_mark_not_done_shard(*args)] if shards else []
+    await complete_mark_not_done(results, now.date(), now_minute, started_at)
+
+async def real_mark_not_done_shard(
+    weekday: int, after_minute: Optional[int], until_minute: int,
+    lower: Optional[str] = None, upper: Optional[str] = None
+) -> Dict:
+    """
+    Mark the overdue sessions of one routine_id range as 'not_done'.
+
+    The matching sessions are updated in place with array filters, one
+    update per session time.
+    """
+    started = time.monotonic()
+    overdue = await get_overdue_sessions(weekday, after_minute, until_minute, lower, upper)
+
+    routine_ids_by_time = defaultdict(set)
+    for entry in overdue:
+        routine_ids_by_time[entry.time].add(entry.routine_id)
+
+    modified = 0
+    if routine_ids_by_time:
+        operations = [
+            UpdateMany(
+                {"_id": {"$in": list(routine_ids)}},
+                {"$set": {"days.$[day].sessions.$[session].status": StatusEnum.not_done.value}},
+                array_filters=[
+                    {"day.day_of_week": {"$regex": f"^{WEEKDAYS[weekday]}$", "$options": "i"}},
+                    {"session.time": session_time, "session.status": StatusEnum.pending.value}
+                ]
+            )
+            for session_time, routine_ids in routine_ids_by_time.items()
+        ]
+        result = await Routine.get_motor_collection().bulk_write(operations, ordered=False)
+        modified = result.modified_count
+        if modified:
+            user_ids = [entry.user_id for entry in overdue]
+            await routine_cache.invalidate_many(user_ids)
+            await expire_partner_snapshots(user_ids)
+
+    duration = time.monotonic() - started
+    record_background_job_batch_duration(MARK_NOT_DONE_JOB, duration)
+    return {"lower": lower, "upper": upper, "overdue": len(overdue), "modified": modified, "duration": duration}
+
+async def complete_mark_not_done(results: List[Dict], run_date: date, until_minute: int, started_at: float):
+    """Move the mark_not_done checkpoint forward once all shards are done."""
+    summary = summarize_shard_results(MARK_NOT_DONE_JOB, results, started_at)
+    # $max keeps the checkpoint from moving back if an older run finishes last
+    await JobCheckpoint.find(
+        JobCheckpoint.job == MARK_NOT_DONE_JOB, JobCheckpoint.run_date == run_date
+    ).update({
+        "$max": {"last_minute": until_minute},
+        "$inc": {"processed": summary.get("modified", 0)},
+        "$set": {"updated_at": datetime.now()}
+    })
 
 
 async def process_routine(routine: Routine):
-    current_day = datetime.now().strftime('%A').lower()
-    current_time = datetime.now().strftime('%I:%M %p').strip()
+    now = datetime.now()
+    current_minute = minute_of_day(now)
 
-    logger.info(f"Processing routine for today: {current_day}, current time: {current_time}")
+    logger.info(f"Processing routine for today: {now.strftime('%A')}, current minute: {current_minute}")
 
-    for day in routine.days:
-        if day.day_of_week.lower() == current_day:
-            logger.info(f"Found routine for today: {current_day}")
+    day = find_day(routine.days, now.weekday())
+    if day:
+        logger.info(f"Found routine for today: {day.day_of_week}")
 
-            for session in day.sessions:
-                if not session.steps:
-                    session.status = 'not_done'
-                    logger.info(f"Session has no steps, marked as 'not_done' for routine {routine.id}")
-                    continue
+        for session in day.sessions:
+            if not session.steps:
+                session.status = 'not_done'
+                logger.info(f"Session has no steps, marked as 'not_done' for routine {routine.id}")
+                continue
 
-                session_time = datetime.strptime(session.time.strip(), '%I:%M %p')
-                current_time_obj = datetime.strptime(current_time, '%I:%M %p')
+            if session.minute_of_day is None:
+                continue
 
-                if session_time < (current_time_obj - timedelta(hours=1)) and session.status == 'pending':
-                    logger.info(f"Session {session_time} is more than 1 hour old and still pending, marking as 'not_done'")
-                    session.status = 'not_done'
+            if session.minute_of_day < current_minute - 60 and session.status == 'pending':
+                logger.info(f"Session {session.time} is more than 1 hour old and still pending, marking as 'not_done'")
+                session.status = 'not_done'
 
-            if any(session.status == 'not_done' for session in day.sessions):
-                await routine.update({"$set": {"days": routine.days}})
-                logger.info(f"Routine {routine.id} updated with new session status.")
-            break
+        if any(session.status == 'not_done' for session in day.sessions):
+            await routine.update({"$set": {"days": routine.days}})
+            await routine_cache.invalidate(routine.user_id)
+            await refresh_partner_snapshot(routine.user_id, event="routine")
+            logger.info(f"Routine {routine.id} updated with new session status.")
 
-async def real_reset_sessions_status(batch_size=100):
-    # Initialize database connection first
-    await initiate_database()
-    
-    current_time = datetime.now()
-    if current_time.hour == 0 and current_time.minute == 0:
-        logger.info("Resetting all session statuses to 'pending'...")
-        skip = 0
+async def real_reset_sessions_status(chunk_size: Optional[int] = None):
+    """
+    Reset every session status to 'pending' for the new day.
+
+    The reset is a single server-side update with array filters, or one
+    update per `_id` range of `chunk_size` routines for very large
+    collections. It runs at most once per calendar date and resumes from
+    its last completed range if interrupted.
+
+    Args:
+        chunk_size (int): Number of routines per update, None for a single update
+    """
+    started = time.monotonic()
+    today = datetime.now().date()
+    checkpoint = await get_or_create_checkpoint(RESET_SESSIONS_JOB, today)
+    if checkpoint.completed:
+        logger.info("Session statuses were already reset today, skipping")
+        return
+
+    logger.info("Resetting all session statuses to 'pending'...")
+    collection = Routine.get_motor_collection()
+    query = {"days.sessions.status": {"$in": [StatusEnum.done.value, StatusEnum.not_done.value]}}
+    update = {"$set": {"days.$[].sessions.$[session].status": StatusEnum.pending.value}}
+    array_filters = [{"session.status": {"$ne": StatusEnum.pending.value}}]
+
+    if chunk_size is None:
+        result = await collection.update_many(query, update, array_filters=array_filters)
+        checkpoint.processed = result.modified_count
+    else:
         while True:
-            routines = await Routine.find_all().skip(skip).limit(batch_size).to_list()
-            if not routines:
+            id_range = {"$gt": checkpoint.last_id} if checkpoint.last_id else {}
+            boundary = await collection.find(
+                {"_id": id_range} if id_range else {}, {"_id": 1}
+            ).sort("_id", 1).skip(chunk_size - 1).limit(1).to_list(1)
+            if boundary:
+                id_range["$lte"] = boundary[0]["_id"]
+
+            result = await collection.update_many(
+                {**query, "_id": id_range} if id_range else query, update, array_filters=array_filters
+            )
+            checkpoint.processed += result.modified_count
+            if not boundary:
                 break
-            tasks = [update_routine_sessions(routine) for routine in routines]
-            await asyncio.gather(*tasks)
-            skip += batch_size
-        logger.info("Session statuses reset completed.")
-    else:
-        logger.info("Not the right time for session reset.")
+            checkpoint.last_id = boundary[0]["_id"]
+            checkpoint.updated_at = datetime.now()
+            await checkpoint.save()
 
+    checkpoint.completed = True
+    checkpoint.updated_at = datetime.now()
+    await checkpoint.save()
+    await routine_cache.invalidate_all()
+    await expire_partner_snapshots()
 
-async def update_routine_sessions(routine: Routine):
-    for day in routine.days:
-        for session in day.sessions:
-            session.status = "pending"
-    await routine.update({"$set": {"days": routine.days}})
-    logger.info(f"Routine {routine.id} session statuses reset to 'pending'.")
+    # Let the next mark_not_done run re-check the whole day against the reset statuses
+    await JobCheckpoint.find(
+        JobCheckpoint.job == MARK_NOT_DONE_JOB, JobCheckpoint.run_date == today
+    ).delete()
 
-async def real_cron_notification(batch_size=100):
-    # Initialize database connection first
-    await initiate_database()
-    
-    logger.info("Cron job is running...")
-    skip = 0
-    while True:
-        routines = await Routine.find_all().skip(skip).limit(batch_size).to_list()
-        if not routines:
-            break
-        tasks = [check_and_send_routine_notifications(routine) for routine in routines]
-        await asyncio.gather(*tasks)
-        skip += batch_size
+    duration = time.monotonic() - started
+    record_background_job_duration(RESET_SESSIONS_JOB, duration)
+    logger.info(f"Session statuses reset in {checkpoint.processed} routines in {duration:.2f}s")
+
+
+async def real_cron_notification():
+    """
+    Send the reminders due this minute.
+
+    When many reminders are due they are split into routine_id shards sent
+    in parallel by the workers, and a chord callback aggregates the results.
+    """
+    started_at = time.time()
+    now = datetime.now()
+    args = (now.weekday(), minute_of_day(now))
+    settings = Settings()
+    shards = await split_schedule_shards(
+        due_sessions_query(*args), settings.cron_shard_size, settings.cron_max_shards
+    )
+    logger.info(f"Cron job is running at {now.strftime('%A %I:%M %p')}, {len(shards)} shards")
+
+    if len(shards) > 1:
+        dispatch_shards(
+            cron_notification_shard, args, shards,
+            summarize_shards.s(CRON_NOTIFICATION_JOB, started_at)
+        )
+        return
+
+    results = [await real_cron_notification_shard(*args)] if shards else []
+    summarize_shard_results(CRON_NOTIFICATION_JOB, results, started_at)
+
+async def real_cron_notification_shard(
+    weekday: int, minute: int, lower: Optional[str] = None, upper: Optional[str] = None
+) -> Dict:
+    """Send the due reminders of one routine_id range."""
+    started = time.monotonic()
+    due = await get_due_sessions(weekday, minute, lower, upper)
+    sent = await send_due_reminders(due)
+
+    duration = time.monotonic() - started
+    record_background_job_batch_duration(CRON_NOTIFICATION_JOB, duration)
+    return {"lower": lower, "upper": upper, "due": len(due), "sent": sent, "duration": duration}
 
 @celery_app.task(bind=True)
 def cron_notification(self):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(real_cron_notification())
-    finally:
-        loop.close()
+    run_async(run_exclusive(CRON_NOTIFICATION_JOB, real_cron_notification, ttl=300))
+
+@celery_app.task(bind=True)
+def cron_notification_shard(self, weekday, minute, lower=None, upper=None):
+    return run_async(real_cron_notification_shard(weekday, minute, lower, upper))
+
+@celery_app.task(bind=True)
+def summarize_shards(self, results, job, started_at):
+    return summarize_shard_results(job, results, started_at)
 
 @celery_app.task(bind=True)
 def mark_not_done(self):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(real_mark_not_done())
-    finally:
-        loop.close()
+    run_async(run_exclusive(MARK_NOT_DONE_JOB, real_mark_not_done, ttl=300))
+
+@celery_app.task(bind=True)
+def mark_not_done_shard(self, weekday, after_minute, until_minute, lower=None, upper=None):
+    return run_async(real_mark_not_done_shard(weekday, after_minute, until_minute, lower, upper))
+
+@celery_app.task(bind=True)
+def mark_not_done_completed(self, results, run_date, until_minute, started_at):
+    run_async(complete_mark_not_done(results, date.fromisoformat(run_date), until_minute, started_at))
 
 @celery_app.task(bind=True)
 def reset_sessions_status(self):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(real_reset_sessions_status())
-    finally:
-        loop.close()
\ No newline at end of file
+    run_async(run_exclusive(RESET_SESSIONS_JOB, real_reset_sessions_status, ttl=3600))
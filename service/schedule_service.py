@@ -0,0 +1,201 @@
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+
+from database.batching import process_in_batches
+from models.routine import Routine
+from models.schedule import SessionSchedule
+
+logger = logging.getLogger(__name__)
+
+# A pending session counts as missed once it is more than an hour old
+MISSED_AFTER_MINUTES = 61
+
+
+def build_schedule_entries(routine: Routine) -> List[SessionSchedule]:
+    """
+    Flatten a routine into one schedule entry per session.
+
+    Args:
+        routine: The routine to flatten
+
+    Returns:
+        List of schedule entries keyed by weekday and minute of day
+    """
+    entries = []
+    for day in routine.days:
+        weekday = day.weekday
+        if weekday is None:
+            logger.warning(f"Unknown day '{day.day_of_week}' in routine {routine.id}")
+            continue
+
+        for session in day.sessions:
+            minute_of_day = session.minute_of_day
+            if minute_of_day is None:
+                logger.warning(f"Could not parse session time '{session.time}' in routine {routine.id}")
+                continue
+
+            entries.append(SessionSchedule(
+                routine_id=routine.id,
+                user_id=routine.user_id,
+                push_token=routine.push_token,
+                weekday=weekday,
+                minute_of_day=minute_of_day,
+                time=session.time,
+                steps_count=len(session.steps),
+                # Sessions without steps cannot be done; they are missed at the same deadline,
+                # which stays after the checkpoint when they are added later in the day
+                deadline_minute=minute_of_day + MISSED_AFTER_MINUTES
+            ))
+    return entries
+
+
+async def sync_routine_schedule(routine: Routine) -> int:
+    """
+    Replace the schedule entries of a routine after it was written.
+
+    Args:
+        routine: The saved routine
+
+    Returns:
+        int: Number of schedule entries written
+    """
+    await SessionSchedule.find(SessionSchedule.routine_id == routine.id).delete()
+    entries = build_schedule_entries(routine)
+    if entries:
+        await SessionSchedule.insert_many(entries)
+    return len(entries)
+
+
+async def sync_schedule_push_token(routine_id: PydanticObjectId, push_token: Optional[str]):
+    """Propagate a routine's push token to its schedule entries."""
+    await SessionSchedule.find(SessionSchedule.routine_id == routine_id).update(
+        {"$set": {"push_token": push_token}}
+    )
+
+
+def routine_id_range(lower: Optional[str] = None, upper: Optional[str] = None) -> Dict:
+    """Filter on routine_id in [lower, upper), either bound may be open."""
+    bounds = {}
+    if lower:
+        bounds["$gte"] = PydanticObjectId(lower)
+    if upper:
+        bounds["$lt"] = PydanticObjectId(upper)
+    return {"routine_id": bounds} if bounds else {}
+
+
+def due_sessions_query(weekday: int, minute_of_day: int) -> Dict:
+    """Query for the schedule entries due at a given minute that can receive a reminder."""
+    return {
+        "weekday": weekday,
+        "minute_of_day": minute_of_day,
+        "push_token": {"$nin": [None, ""]}
+    }
+
+
+def overdue_sessions_query(weekday: int, after_minute: Optional[int], until_minute: int) -> Dict:
+    """Query for the schedule entries whose deadline is in (after_minute, until_minute]."""
+    deadline = {"$lte": until_minute}
+    if after_minute is not None:
+        deadline["$gt"] = after_minute
+    return {"weekday": weekday, "deadline_minute": deadline}
+
+
+async def get_due_sessions(
+    weekday: int, minute_of_day: int, lower: Optional[str] = None, upper: Optional[str] = None
+) -> List[SessionSchedule]:
+    """
+    Get the schedule entries due at a given minute that can receive a reminder.
+
+    Args:
+        weekday: Weekday number, Monday is 0
+        minute_of_day: Minute of the day, 0 to 1439
+        lower: Optional inclusive lower routine_id bound of a shard
+        upper: Optional exclusive upper routine_id bound of a shard
+
+    Returns:
+        List of due schedule entries with a push token
+    """
+    return await SessionSchedule.find(
+        due_sessions_query(weekday, minute_of_day), routine_id_range(lower, upper)
+    ).to_list()
+
+
+async def get_overdue_sessions(
+    weekday: int, after_minute: Optional[int], until_minute: int,
+    lower: Optional[str] = None, upper: Optional[str] = None
+) -> List[SessionSchedule]:
+    """
+    Get the schedule entries whose deadline passed in a window of the day.
+
+    Args:
+        weekday: Weekday number, Monday is 0
+        after_minute: Deadlines up to this minute were already handled, None for the whole day
+        until_minute: Current minute of the day
+        lower: Optional inclusive lower routine_id bound of a shard
+        upper: Optional exclusive upper routine_id bound of a shard
+
+    Returns:
+        List of schedule entries with a deadline in (after_minute, until_minute]
+    """
+    return await SessionSchedule.find(
+        overdue_sessions_query(weekday, after_minute, until_minute), routine_id_range(lower, upper)
+    ).to_list()
+
+
+async def split_schedule_shards(
+    query: Dict, shard_size: int, max_shards: int
+) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Split the schedule entries matching a query into routine_id ranges.
+
+    Ranges are balanced with $bucketAuto, so each shard gets about the same
+    number of entries, and all entries of a routine land in the same shard.
+
+    Args:
+        query: Filter on the schedule entries
+        shard_size: Target number of entries per shard
+        max_shards: Upper bound on the number of shards
+
+    Returns:
+        List of (lower, upper) routine_id bounds as strings, open ends are None;
+        empty when nothing matches
+    """
+    count = await SessionSchedule.find(query).count()
+    if count == 0:
+        return []
+
+    shard_count = min(max_shards, math.ceil(count / shard_size))
+    if shard_count <= 1:
+        return [(None, None)]
+
+    buckets = await SessionSchedule.get_motor_collection().aggregate([
+        {"$match": query},
+        {"$bucketAuto": {"groupBy": "$routine_id", "buckets": shard_count}}
+    ]).to_list(None)
+    lowers = [str(bucket["_id"]["min"]) for bucket in buckets]
+    # The first shard is open below and the last open above, so no entry falls between shards
+    return [
+        (lower if i > 0 else None, lowers[i + 1] if i + 1 < len(lowers) else None)
+        for i, lower in enumerate(lowers)
+    ]
+
+
+async def rebuild_session_schedule() -> int:
+    """
+    Rebuild the whole schedule from the routine collection.
+
+    Returns:
+        int: Number of schedule entries written
+    """
+    total = 0
+
+    async def sync(routine: Routine):
+        nonlocal total
+        total += await sync_routine_schedule(routine)
+
+    await process_in_batches(Routine, sync, "rebuild_session_schedule")
+    logger.info(f"Session schedule rebuilt with {total} entries")
+    return total
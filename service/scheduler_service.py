@@ -0,0 +1,114 @@
+import logging
+from datetime import datetime
+from typing import Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from redis.exceptions import RedisError
+
+from database.redis_client import acquire_lock, extend_lock, get_redis, release_lock
+from monitoring.fastapi_metrics import increment_scheduler_job_enqueued, increment_scheduler_job_skipped
+from service.push_receipt_service import process_push_receipts
+from service.routine_service import cron_notification, mark_not_done, reset_sessions_status
+from service.tracker_service import update_all_users_streaks
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = "scheduler:leader"
+LEADER_TTL = 30  # A dead leader is replaced within this many seconds
+LEADER_REFRESH_SECONDS = 10
+FIRED_TTL = 120
+
+SCHEDULED_JOBS = [
+    ("cron_notification", cron_notification, CronTrigger(second=0)),
+    ("mark_not_done", mark_not_done, CronTrigger(second=10)),
+    ("reset_sessions_status", reset_sessions_status, CronTrigger(hour=0, minute=0)),
+    ("update_all_users_streaks", update_all_users_streaks, CronTrigger(hour=0, minute=0)),
+    ("process_push_receipts", process_push_receipts, CronTrigger(minute="*/15")),
+]
+
+
+class SchedulerLeader:
+    """
+    Redis lease deciding which API process enqueues scheduled jobs.
+
+    Every process runs the scheduler, but only the holder of the lease
+    enqueues; the lease is renewed every LEADER_REFRESH_SECONDS and taken
+    over by another process once it expires.
+    """
+
+    def __init__(self, key: str = LEADER_KEY, ttl: int = LEADER_TTL):
+        self.key = key
+        self.ttl = ttl
+        self.token: Optional[str] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.token is not None
+
+    async def refresh(self) -> bool:
+        """Renew the lease if held, otherwise try to take it."""
+        try:
+            if self.token and await extend_lock(self.key, self.token, self.ttl):
+                return True
+            if self.token:
+                logger.warning("Scheduler leadership lost")
+            self.token = await acquire_lock(self.key, self.ttl)
+            if self.token:
+                logger.info("This process is now the scheduler leader")
+        except RedisError as e:
+            # Without Redis nobody can prove leadership, so stop enqueueing
+            logger.error(f"Error refreshing scheduler leadership: {str(e)}")
+            self.token = None
+        return self.is_leader
+
+    async def release(self):
+        if not self.token:
+            return
+        try:
+            await release_lock(self.key, self.token)
+        except RedisError as e:
+            logger.error(f"Error releasing scheduler leadership: {str(e)}")
+        self.token = None
+
+
+leader = SchedulerLeader()
+
+
+async def enqueue_job(job: str, task):
+    """
+    Enqueue a scheduled job if this process is the leader.
+
+    A per-minute fire key makes sure a job is enqueued once per slot even
+    while leadership changes hands.
+    """
+    if not leader.is_leader:
+        return
+
+    fire_key = f"scheduler:fired:{job}:{datetime.now().strftime('%Y%m%d%H%M')}"
+    try:
+        first = await get_redis().set(fire_key, leader.token, nx=True, ex=FIRED_TTL)
+    except RedisError as e:
+        logger.error(f"Error enqueueing {job}: {str(e)}")
+        return
+
+    if not first:
+        logger.info(f"{job} was already enqueued for this slot, skipping")
+        increment_scheduler_job_skipped(job, "duplicate")
+        return
+
+    task.delay()
+    increment_scheduler_job_enqueued(job)
+
+
+def start_scheduler() -> AsyncIOScheduler:
+    scheduler = AsyncIOScheduler()
+    for job, task, trigger in SCHEDULED_JOBS:
+        scheduler.add_job(enqueue_job, trigger, args=[job, task], id=job)
+    scheduler.add_job(
+        leader.refresh, IntervalTrigger(seconds=LEADER_REFRESH_SECONDS),
+        id="scheduler_leader", next_run_time=datetime.now()
+    )
+    scheduler.start()
+    return scheduler
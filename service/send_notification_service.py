@@ -3,10 +3,10 @@ import ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from fastapi import HTTPException
-import httpx
 import logging
 import asyncio
 from config.config import Settings
+from service.push_service import build_push_message, send_push_messages
 from typing import Dict, Union, Optional
 
 logger = logging.getLogger(__name__)
@@ -106,32 +106,11 @@ async def push_notification(push_token: str, title: str, body: str, data: Option
         logger.warning("Cannot send push notification: No push token provided")
         return False
         
-    message = {
-        "to": push_token,
-        "sound": "default",
-        "title": title,
-        "body": body,
-        "badge": 1,
-    }
-    
-    # Add additional data if provided
-    if data:
-        message["data"] = data
-        
-    url = "https://exp.host/--/api/v2/push/send"
-    
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, json=message)
-            if response.status_code == 200:
-                logger.info(f"Notification sent successfully to {push_token}")
-                return True
-            else:
-                logger.error(f"Failed to send notification to {push_token}: {response.text}")
-                return False
-    except Exception as e:
-        logger.error(f"Error sending push notification: {str(e)}")
-        return False
+    tickets = await send_push_messages([build_push_message(push_token, title, body, data)])
+    if tickets and tickets[0].status == "ok":
+        logger.info(f"Notification sent successfully to {push_token}")
+        return True
+    return False
 
 async def send_request_friend_notification(user_current, user_partner) -> Dict[str, Union[int, str]]:
     """
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from beanie import PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from models.routine import WEEKDAYS, Day, Routine
+from models.snapshot import PartnerSnapshot
+from models.tracker import Tracker
+from models.user import User
+from service.partner_events import publish_partner_event
+from schemas.couple import PartnerTrackerView
+from schemas.user import UserProfile
+
+logger = logging.getLogger(__name__)
+
+# A snapshot missed by a write path is rebuilt on read after this long
+SNAPSHOT_MAX_AGE = timedelta(minutes=10)
+
+# Fields of a Day in the DayResponseSchema shape, without the derived weekday and minute fields
+TODAY_DAY_FIELDS = {
+    "day_of_week": True,
+    "sessions": {"__all__": {"time": True, "status": True, "steps": True}}
+}
+
+
+async def get_today_tracker(user_id: PydanticObjectId) -> Optional[PartnerTrackerView]:
+    """
+    Get today's tracker for a user
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        Today's tracker or None if not found
+    """
+    today = datetime.now().date()
+    return await Tracker.find_one(
+        {"user_id": user_id, "date": today},
+        sort=[("timeTracking", -1)],  # Get the latest tracker for today
+        projection_model=PartnerTrackerView
+    )
+
+
+async def get_today_routine(user_id: PydanticObjectId) -> Optional[Dict[str, Any]]:
+    """
+    Get today's routine for a user
+
+    Only today's day is read, with an $elemMatch projection on the weekday,
+    or on the day name for days not backfilled with a weekday yet.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        Today's routine in the DayResponseSchema shape or None if not found
+    """
+    weekday = datetime.now().weekday()
+    today = {"$or": [
+        {"weekday": weekday},
+        {"weekday": None, "day_of_week": {"$regex": f"^{WEEKDAYS[weekday]}$", "$options": "i"}}
+    ]}
+    routine = await Routine.get_motor_collection().find_one(
+        {"user_id": user_id},
+        {"routine_name": 1, "push_token": 1, "days": {"$elemMatch": today}}
+    )
+    if not routine or not routine.get("days"):
+        return None
+
+    day = Day.model_validate(routine["days"][0])
+    return {
+        "routine_name": routine["routine_name"],
+        "push_token": routine.get("push_token"),
+        "today": day.model_dump(mode="json", include=TODAY_DAY_FIELDS)
+    }
+
+
+def format_tracker(tracker: PartnerTrackerView) -> Dict[str, Any]:
+    """
+    Format tracker data for API response
+
+    Args:
+        tracker: Projected tracker
+
+    Returns:
+        Formatted tracker data ready for API response
+    """
+    return {
+        "id": str(tracker.id),
+        "user_id": str(tracker.user_id),
+        "img_url": tracker.img_url,
+        "date": tracker.date.isoformat(),
+        "class_summary": tracker.class_summary,
+        "timeTracking": tracker.timeTracking
+    }
+
+
+def format_partner_data(snapshot: PartnerSnapshot) -> Dict[str, Any]:
+    """
+    Format a partner snapshot for API response
+
+    Args:
+        snapshot: The partner's snapshot
+
+    Returns:
+        Formatted partner data ready for API response
+    """
+    return {
+        "id": str(snapshot.user_id),
+        "fullname": snapshot.fullname,
+        "email": snapshot.email,
+        "avatar": snapshot.avatar,
+        "streak": snapshot.streak,
+        "today_tracker": snapshot.today_tracker,
+        "today_routine": snapshot.today_routine
+    }
+
+
+async def refresh_partner_snapshot(user_id: PydanticObjectId, event: Optional[str] = None) -> Optional[PartnerSnapshot]:
+    """
+    Rebuild a user's partner snapshot from the profile, today's tracker and today's routine.
+
+    Called after every write to any of them. When two refreshes race, the
+    one that started last wins.
+
+    Args:
+        user_id: ID of the user
+        event: Partner event to publish with the new snapshot, such as "session_done"
+
+    Returns:
+        The new snapshot, or None if the user does not exist
+    """
+    user_id = PydanticObjectId(user_id)
+    built_at = datetime.now()
+    profile, tracker, today_routine = await asyncio.gather(
+        User.find_one({"_id": user_id}, projection_model=UserProfile),
+        get_today_tracker(user_id),
+        get_today_routine(user_id)
+    )
+    if profile is None:
+        await PartnerSnapshot.find(PartnerSnapshot.user_id == user_id).delete()
+        return None
+
+    snapshot = PartnerSnapshot(
+        user_id=user_id,
+        day=built_at.date(),
+        fullname=profile.fullname,
+        email=profile.email,
+        avatar=profile.avatar,
+        streak=profile.streak,
+        today_tracker=format_tracker(tracker) if tracker else None,
+        today_routine=today_routine,
+        built_at=built_at
+    )
+    document = snapshot.model_dump(exclude={"id", "revision_id"})
+    # Stored the way Beanie stores them: an ObjectId and a midnight datetime
+    document.update(user_id=user_id, day=datetime.combine(snapshot.day, datetime.min.time()))
+    try:
+        # Only replace a snapshot built before this one
+        await PartnerSnapshot.get_motor_collection().replace_one(
+            {"user_id": user_id, "built_at": {"$lt": built_at}}, document, upsert=True
+        )
+    except DuplicateKeyError:
+        # A newer snapshot was written meanwhile
+        pass
+
+    if event:
+        await publish_partner_event(user_id, event, format_partner_data(snapshot))
+    return snapshot
+
+
+async def expire_partner_snapshots(user_ids: Optional[Iterable[PydanticObjectId]] = None) -> int:
+    """
+    Drop snapshots after a bulk write, so they are rebuilt on their next read.
+
+    Args:
+        user_ids: Users whose data changed, None for everyone
+
+    Returns:
+        int: Number of snapshots dropped
+    """
+    query = {} if user_ids is None else {"user_id": {"$in": list(set(user_ids))}}
+    result = await PartnerSnapshot.get_motor_collection().delete_many(query)
+    return result.deleted_count
+
+
+async def get_partner_snapshot(user_id: PydanticObjectId) -> Optional[PartnerSnapshot]:
+    """
+    Get a user's partner snapshot, rebuilding it when missing or stale.
+
+    A snapshot is stale once the day changed, or after SNAPSHOT_MAX_AGE in
+    case a write path did not refresh it.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        The snapshot, or None if the user does not exist
+    """
+    snapshot = await PartnerSnapshot.find_one(PartnerSnapshot.user_id == user_id)
+    now = datetime.now()
+    if snapshot is None or snapshot.day != now.date() or now - snapshot.built_at > SNAPSHOT_MAX_AGE:
+        return await refresh_partner_snapshot(user_id)
+    return snapshot
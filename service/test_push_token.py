@@ -6,18 +6,12 @@ from typing import Optional
 # Add the project root directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from beanie import init_beanie
-from motor.motor_asyncio import AsyncIOMotorClient
-from config.config import Settings
+from config.config import initiate_database
 from models.user import User
 
 
 async def test_push_token():
-    settings = Settings()
-    client = AsyncIOMotorClient(settings.DATABASE_URL)
-
-    # Initialize database connection with only the User model
-    await init_beanie(database=client.get_default_database(), document_models=[User])
+    await initiate_database()
 
     # Find first user
     users = await User.find_all().limit(1).to_list()
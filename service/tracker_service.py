@@ -1,45 +1,50 @@
 from beanie import PydanticObjectId
 from bson import ObjectId
+from typing import Dict, List, Optional, Tuple
+import logging
 
-from database.database import add_tracker
+from database.database import add_tracker, get_or_create_checkpoint
+from database.batching import process_in_batches
 from models.tracker import Tracker, ClassEnum
-from datetime import datetime
+from datetime import datetime, date, time
 import os
 import uuid
-from config.jwt_handler import decode_jwt
 from fastapi import Depends 
-from models.routine import Day, Routine
+from models.routine import Day, Routine, find_day
 from schemas.routine import DaySchema
+from schemas.tracker import TrackerDate
+from schemas.user import UserId
 from routes.media import upload_scan_image_to_cloudinary
-from routes.routine import serialize_day
+from routes.routine import serialize_day, UTC7
+from service.routine_service import get_routine_by_user_id
+from service.snapshot_service import expire_partner_snapshots, refresh_partner_snapshot
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException
 from beanie import PydanticObjectId
 from models.user import User
-import asyncio
-from database.celery_worker import celery_app
-from config.config import initiate_database
+import time as time_module
+from pymongo import UpdateOne
+from database.celery_worker import celery_app, run_async
+from database.redis_client import run_exclusive
+from database.cache import user_cache
+from monitoring.fastapi_metrics import record_background_job_duration
 
-async def tracker_on_day(token: str, image_data: bytes, class_summary: dict):
+logger = logging.getLogger(__name__)
+
+STREAK_JOB = "update_all_users_streaks"
+DAY_MS = 24 * 60 * 60 * 1000
+
+async def tracker_on_day(user_id: PydanticObjectId, image_data: bytes, class_summary: dict):
     """
     Background task to save tracking data after skin condition detection.
     Checks if user already has a tracker for today and updates it instead of creating new.
 
     Args:
-        token: JWT token for user authentication
+        user_id: ID of the authenticated user
         image_data: Image bytes to be stored
         class_summary: Summary of detected skin conditions
     """
     try:
-        # Extract user ID from JWT token
-        token_data = decode_jwt(token)
-        user_id = token_data.get("sub")
-
-        if not user_id:
-            print("Error: Unable to extract user_id from token")
-            return
-        user_id = PydanticObjectId(user_id)  # Convert to PydanticObjectId
-
         # Upload image to Cloudinary
         img_url = await upload_scan_image_to_cloudinary(image_data)
         print(img_url)
@@ -48,24 +53,18 @@ async def tracker_on_day(token: str, image_data: bytes, class_summary: dict):
             return
 
         # Find user's routine
-        routine = await Routine.find_one(Routine.user_id == user_id)
+        routine = await get_routine_by_user_id(user_id)
 
         if not routine:
             print(f"Warning: No routine found for user {user_id}")
             day_routine = None
         else:
             # Get current day's routine
-            today_name = datetime.now().strftime("%A").lower()
-            day_routine = None
-
-            for day in routine.days:
-                if day.day_of_week.lower() == today_name:
-                    today_data = serialize_day(day)
-                    day_routine = DaySchema.model_validate(today_data)
-                    break
+            day = find_day(routine.days, datetime.now().weekday())
+            day_routine = DaySchema.model_validate(serialize_day(day)) if day else None
 
             if not day_routine:
-                print(f"Warning: No routine found for today ({today_name}) for user {user_id}")
+                print(f"Warning: No routine found for today ({datetime.now().strftime('%A')}) for user {user_id}")
 
         today = datetime.now().date()
         time_tracking = datetime.now().strftime("%H:%M")
@@ -91,89 +90,322 @@ async def tracker_on_day(token: str, image_data: bytes, class_summary: dict):
                 timeTracking=time_tracking
             )
             await add_tracker(tracker)
-            await update_user_streak(user_id)
+            await advance_user_streak(user_id, today)
+        await refresh_partner_snapshot(user_id, event="tracker")
     except Exception as e:
         print(f"Error in tracker_on_day: {str(e)}")
 
-async def update_user_streak(user_id: PydanticObjectId) -> int:
- 
+def current_week_utc7() -> Tuple[date, date]:
+    """Return Monday and Sunday of the current week in UTC+7."""
+    today = datetime.now(UTC7).date()
+    start = today - timedelta(days=today.weekday())
+    return start, start + timedelta(days=6)
+
+
+async def get_tracker_days(user_id: PydanticObjectId, start: date, end: date) -> Dict[str, List[str]]:
+    """
+    Group a user's tracker ids by day over a date range with a single query.
+
+    Tracker dates are stored as datetimes; every value inside a day,
+    midnight or not, falls into that day.
+
+    Args:
+        user_id: The user's ID
+        start: First day of the range
+        end: Last day of the range, inclusive
+
+    Returns:
+        Dict mapping "YYYY-MM-DD" to the tracker ids of that day, days without trackers are missing
+    """
+    pipeline = [
+        {"$match": {
+            "user_id": user_id,
+            "date": {
+                "$gte": datetime.combine(start, time.min),
+                "$lt": datetime.combine(end + timedelta(days=1), time.min)
+            }
+        }},
+        {"$sort": {"date": 1}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date"}},
+            "tracker_ids": {"$push": {"$toString": "$_id"}}
+        }}
+    ]
+    rows = await Tracker.get_motor_collection().aggregate(pipeline).to_list(None)
+    return {row["_id"]: row["tracker_ids"] for row in rows}
+
+
+def compute_streak(tracked_dates: List[date], today: date) -> Tuple[int, int, Optional[date]]:
+    """
+    Compute streak state from a user's tracked dates.
+
+    The current streak is the run of consecutive days ending today, or ending
+    yesterday when the user has not scanned yet today.
+
+    Args:
+        tracked_dates: Dates the user has a tracker for, in any order
+        today: The reference day
+
+    Returns:
+        Tuple of (current streak, longest streak, last tracked date)
+    """
+    days = sorted(d for d in set(tracked_dates) if d <= today)
+    if not days:
+        return 0, 0, None
+
+    longest = run = 1
+    for previous, current in zip(days, days[1:]):
+        run = run + 1 if current - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+
+    last_tracked = days[-1]
+    if last_tracked < today - timedelta(days=1):
+        return 0, longest, last_tracked
+    return run, longest, last_tracked
+
+
+async def advance_user_streak(user_id: PydanticObjectId, tracked_date: date) -> bool:
+    """
+    Count a newly tracked day towards the user's streak.
+
+    Runs as a single conditional update on the User document: the streak is
+    extended when the previous tracked day was the day before, restarted at 1
+    otherwise, and the update is a no-op when the day was already counted.
+
+    Args:
+        user_id: ID of the user
+        tracked_date: Day of the new tracker
+
+    Returns:
+        bool: True if the streak state was advanced
+    """
+    tracked_at = datetime.combine(tracked_date, time.min)
+    previous_day = tracked_at - timedelta(days=1)
+
+    result = await User.get_motor_collection().update_one(
+        {"_id": user_id, "last_tracked_date": {"$lt": tracked_at}},
+        [
+            {"$set": {
+                "streak": {"$cond": [
+                    {"$eq": ["$last_tracked_date", previous_day]},
+                    {"$add": [{"$ifNull": ["$streak", 0]}, 1]},
+                    1
+                ]},
+                "last_tracked_date": tracked_at
+            }},
+            {"$set": {"longest_streak": {"$max": [{"$ifNull": ["$longest_streak", 0]}, "$streak"]}}}
+        ]
+    )
+
+    if result.matched_count == 0:
+        # Users created before streak state was stored have no last_tracked_date yet
+        user = await User.find_one({"_id": user_id, "last_tracked_date": None})
+        if user:
+            await recompute_user_streak(user_id)
+            return True
+        return False
+    await user_cache.invalidate(user_id)
+    return True
+
+
+async def recompute_user_streak(user_id: PydanticObjectId) -> int:
+    """
+    Rebuild a user's streak state from their full tracker history.
+
+    This scans every tracker of the user and is meant for repair jobs only;
+    the upload path keeps the state current through advance_user_streak.
+    Any drift between the stored and recomputed state is logged.
+
+    Args:
+        user_id: ID of the user
+
+    Returns:
+        int: The recomputed current streak
+    """
     today = datetime.now().date()
-    
+
     trackers = await Tracker.find(
         {"user_id": user_id},
-        projection_model=Tracker
-    ).sort([("date", 1)]).to_list()
-
-    if not trackers:
-        await User.find_one(User.id == user_id).update({"$set": {"streak": 0}})
-        return 0
-
-    tracked_dates = [t.date for t in trackers]
-    streak = 0
-    current_date = today
-    allow_skip_today = True
-
-    for i in range(len(tracked_dates) - 1, -1, -1):
-        tracked_date = tracked_dates[i]
-
-        if tracked_date == current_date:
-            streak += 1
-            current_date -= timedelta(days=1)
-        elif tracked_date < current_date:
-            if allow_skip_today and current_date == today:
-                allow_skip_today = False
-                current_date -= timedelta(days=1)
-                if tracked_date == current_date:
-                    streak += 1
-                    current_date -= timedelta(days=1)
-                else:
-                    break
-            else:
-                break
-        else:
-            continue
+        projection_model=TrackerDate
+    ).to_list()
+
+    streak, longest, last_tracked = compute_streak([t.date for t in trackers], today)
+
+    user = await User.get(user_id)
+    if not user:
+        return streak
 
-    await User.find_one(User.id == user_id).update({"$set": {"streak": streak}})
+    if user.last_tracked_date is not None and (user.streak or 0) != streak:
+        logger.warning(f"Streak drift for user {user_id}: stored {user.streak}, recomputed {streak}")
+
+    await User.find_one(User.id == user_id).update({"$set": {
+        "streak": streak,
+        "longest_streak": max(longest, user.longest_streak or 0),
+        "last_tracked_date": datetime.combine(last_tracked, time.min) if last_tracked else None
+    }})
+    await user_cache.invalidate(user_id)
+    await refresh_partner_snapshot(user_id, event="streak")
     return streak
 
-async def real_update_all_users_streaks(batch_size=100):
+def _streak_runs_pipeline(today_at: datetime, window_start: datetime, after_id: Optional[PydanticObjectId]) -> list:
+    """
+    Aggregation computing, per user, the current streak run over recent trackers.
+
+    Dates are deduplicated per user and folded newest-first: the run starts
+    today (or yesterday when there is no tracker today) and stops at the
+    first missing day.
+    """
+    match = {"date": {"$gte": window_start, "$lte": today_at}}
+    if after_id is not None:
+        match["user_id"] = {"$gt": after_id}
+
+    yesterday_at = today_at - timedelta(days=1)
+    return [
+        {"$match": match},
+        {"$group": {"_id": {"user_id": "$user_id", "date": "$date"}}},
+        {"$sort": {"_id.user_id": 1, "_id.date": -1}},
+        {"$group": {"_id": "$_id.user_id", "dates": {"$push": "$_id.date"}}},
+        {"$sort": {"_id": 1}},
+        {"$project": {
+            "last_tracked_date": {"$arrayElemAt": ["$dates", 0]},
+            "run": {"$reduce": {
+                "input": "$dates",
+                "initialValue": {
+                    "next": {"$cond": [
+                        {"$eq": [{"$arrayElemAt": ["$dates", 0]}, today_at]},
+                        today_at,
+                        yesterday_at
+                    ]},
+                    "count": 0,
+                    "open": True
+                },
+                "in": {"$cond": [
+                    {"$and": ["$$value.open", {"$eq": ["$$this", "$$value.next"]}]},
+                    {
+                        "next": {"$subtract": ["$$this", DAY_MS]},
+                        "count": {"$add": ["$$value.count", 1]},
+                        "open": True
+                    },
+                    {"next": "$$value.next", "count": "$$value.count", "open": False}
+                ]}
+            }}
+        }}
+    ]
+
+
+def _streak_update(doc: dict, window_start: datetime) -> UpdateOne:
+    streak = doc["run"]["count"]
+    last_tracked = doc["last_tracked_date"]
+    # Skip users whose state moved past this snapshot while the job was running
+    guard = {"_id": doc["_id"], "$or": [
+        {"last_tracked_date": {"$lte": last_tracked}},
+        {"last_tracked_date": None}
+    ]}
+
+    if doc["run"]["next"] < window_start:
+        # The run reaches the start of the window, so it may be longer than
+        # what the window shows: never shorten the stored streak.
+        return UpdateOne(guard, {
+            "$set": {"last_tracked_date": last_tracked},
+            "$max": {"streak": streak, "longest_streak": streak}
+        })
+    return UpdateOne(guard, {
+        "$set": {"streak": streak, "last_tracked_date": last_tracked},
+        "$max": {"longest_streak": streak}
+    })
+
+
+async def real_update_all_users_streaks(batch_size=1000, window_days=35):
     """
     Updates streak counts for all users. This function is designed to be run
     daily at midnight to ensure all users have accurate streak counts.
-    
+
+    Streak runs are computed by one aggregation over the trackers of the last
+    `window_days` days and written back with batched bulk writes. Progress is
+    checkpointed per batch so an interrupted run resumes where it stopped.
+
     Args:
-        batch_size (int): Number of users to process in each batch
-    """
-    # Initialize database connection first
-    await initiate_database()
-    
-    print("Daily streak update job is running...")
-    skip = 0
-    
-    while True:
-        # Get users in batches to avoid memory issues with large user bases
-        users = await User.find().skip(skip).limit(batch_size).to_list()
-        
-        if not users:
-            break  # No more users to process
-            
-        # Process users in parallel for efficiency
-        tasks = []
-        for user in users:
-            tasks.append(update_user_streak(user.id))
-            
-        # Wait for all streak updates in this batch to complete
-        await asyncio.gather(*tasks)
-        
-        skip += batch_size
-        
-    print(f"Daily streak update completed for all users")
+        batch_size (int): Number of user updates per bulk write
+        window_days (int): Number of days of trackers to aggregate
+    """
+    started = time_module.monotonic()
+    today = datetime.now().date()
+    today_at = datetime.combine(today, time.min)
+    window_start = today_at - timedelta(days=window_days)
+
+    checkpoint = await get_or_create_checkpoint(STREAK_JOB, today)
+    if checkpoint.completed:
+        logger.info("Daily streak update already completed today, skipping")
+        return
+
+    logger.info(f"Daily streak update is running (resuming after {checkpoint.last_id})")
+    users = User.get_motor_collection()
+    operations = []
+
+    async def flush(last_id):
+        await users.bulk_write(operations, ordered=False)
+        checkpoint.last_id = last_id
+        checkpoint.processed += len(operations)
+        checkpoint.updated_at = datetime.now()
+        await checkpoint.save()
+        logger.info(f"Streak update checkpoint: {checkpoint.processed} users processed")
+        operations.clear()
+
+    runs = Tracker.aggregate(
+        _streak_runs_pipeline(today_at, window_start, checkpoint.last_id),
+        allowDiskUse=True
+    )
+    last_id = checkpoint.last_id
+    async for doc in runs:
+        operations.append(_streak_update(doc, window_start))
+        last_id = doc["_id"]
+        if len(operations) >= batch_size:
+            await flush(last_id)
+    if operations:
+        await flush(last_id)
+
+    # Users without a tracker today or yesterday have broken their streak
+    reset = await users.update_many(
+        {"streak": {"$gt": 0}, "$or": [
+            {"last_tracked_date": {"$lt": today_at - timedelta(days=1)}},
+            {"last_tracked_date": None}
+        ]},
+        {"$set": {"streak": 0}}
+    )
+
+    checkpoint.completed = True
+    checkpoint.updated_at = datetime.now()
+    await checkpoint.save()
+    await user_cache.invalidate_all()
+    await expire_partner_snapshots()
+
+    duration = time_module.monotonic() - started
+    record_background_job_duration(STREAK_JOB, duration)
+    logger.info(
+        f"Daily streak update completed: {checkpoint.processed} users updated, "
+        f"{reset.modified_count} streaks reset in {duration:.2f}s"
+    )
+
+async def real_repair_all_users_streaks(batch_size=500, concurrency=10):
+    """
+    Rebuild every user's streak state from their full tracker history.
+
+    This is the repair path for the incremental streak state and is not
+    scheduled; run it after data fixes or imports.
+    """
+    async def repair(user: UserId):
+        await recompute_user_streak(user.id)
+
+    repaired = await process_in_batches(
+        User, repair, "repair_all_users_streaks",
+        projection_model=UserId, batch_size=batch_size, concurrency=concurrency
+    )
+    logger.info(f"Streak state rebuilt for {repaired} users")
+
+@celery_app.task(bind=True)
+def repair_all_users_streaks(self):
+    run_async(run_exclusive("repair_all_users_streaks", real_repair_all_users_streaks, ttl=3600))
 
 @celery_app.task(bind=True)
 def update_all_users_streaks(self):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(real_update_all_users_streaks())
-    finally:
-        loop.close()
\ No newline at end of file
+    run_async(run_exclusive(STREAK_JOB, real_update_all_users_streaks, ttl=3600))
\ No newline at end of file
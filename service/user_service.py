@@ -1,8 +1,21 @@
 from fastapi import HTTPException
 from beanie import PydanticObjectId
 from bson import ObjectId
+import asyncio
+
+from typing import Optional
+
+from database.cache import user_cache
 from models.user import User
-from service.routine_service import get_routine_by_user_id
+from schemas.user import UserProfile
+from service.routine_service import routine_exists
+from service.snapshot_service import refresh_partner_snapshot
+
+async def get_user_profile(user_id: PydanticObjectId) -> Optional[UserProfile]:
+    """Get a user's profile (no password hash) through the user cache."""
+    return await user_cache.get(
+        user_id, lambda: User.find_one({"_id": ObjectId(user_id)}, projection_model=UserProfile)
+    )
 
 async def get_current_user(user_id: PydanticObjectId):
     try:
@@ -11,27 +24,19 @@ async def get_current_user(user_id: PydanticObjectId):
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid user_id format")
 
-    # Lấy thông tin người dùng từ MongoDB
-    user = await User.find_one({"_id": user_id})
-    # Lấy routine của người dùng
-    routine = await get_routine_by_user_id(user_id)
+    # Lấy thông tin người dùng từ MongoDB, chỉ các trường hồ sơ
+    # và kiểm tra routine tồn tại, hai truy vấn chạy song song
+    user, has_routine = await asyncio.gather(
+        get_user_profile(user_id),
+        routine_exists(user_id)
+    )
 
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    if routine is None:
+    if not has_routine:
         raise HTTPException(status_code=404, detail="Routine not found")
 
-    # Trả về thông tin người dùng và routine trong một dictionary
-    return {
-        "fullname": user.fullname,
-        "email": user.email,
-        "phone": user.phone,
-        "gender": user.gender,
-        "role": user.role,
-        "avatar": user.avatar,
-        "streak": user.streak,
-        "push_token": user.push_token
-    }
+    return user.model_dump(exclude={"id"})
 
 async def update_push_token_user(user_id: PydanticObjectId, push_token: str):
     user = await User.get(user_id)
@@ -39,5 +44,7 @@ async def update_push_token_user(user_id: PydanticObjectId, push_token: str):
         raise HTTPException(status_code=404, detail="User not found")
     user.push_token = push_token
     await user.save()
+    await user_cache.invalidate(user_id)
+    await refresh_partner_snapshot(user_id, event="profile")
     print(f"Updated push token: {user.push_token}")
     return {"message": "Push token updated successfully"}   
@@ -21,6 +21,20 @@ async def mock_database():
     )
 
 
+@pytest.fixture
+def local_only(monkeypatch):
+    """Run caches and partner events on their in-process tier only."""
+    monkeypatch.delenv("REDIS_URL", raising=False)
+
+
+@pytest.fixture
+async def document_database():
+    """A fresh mongomock database with every document model initialized."""
+    database = AsyncMongoMockClient().get_database(name="test")
+    await init_beanie(database=database, document_models=models.__all__)
+    return database
+
+
 def mock_no_authentication():
     app.dependency_overrides[token_listener] = lambda: {}
 
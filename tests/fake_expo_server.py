@@ -0,0 +1,71 @@
+"""
+Local stand-in for the Expo push API.
+
+Used by the push tests through httpx.ASGITransport, and for load benchmarks:
+
+    uvicorn tests.fake_expo_server:app --port 9000
+    push_notification_url=http://localhost:9000/--/api/v2/push/send
+
+Tokens containing "Unregistered" are answered with a DeviceNotRegistered
+error ticket, and tokens containing "Uninstalled" get one in their receipt.
+Set FAKE_EXPO_LATENCY_MS to simulate network latency.
+"""
+import asyncio
+import os
+import uuid
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, HTTPException
+
+app = FastAPI()
+app.state.requests = []
+app.state.tickets = {}
+
+MAX_BATCH_SIZE = 100
+LATENCY = float(os.getenv("FAKE_EXPO_LATENCY_MS", "0")) / 1000
+
+
+def _device_not_registered(push_token: str) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "message": f"\"{push_token}\" is not a registered push notification recipient",
+        "details": {"error": "DeviceNotRegistered"},
+    }
+
+
+def _ticket(message: Dict[str, Any]) -> Dict[str, Any]:
+    if "Unregistered" in message.get("to", ""):
+        return _device_not_registered(message["to"])
+    ticket_id = str(uuid.uuid4())
+    app.state.tickets[ticket_id] = message["to"]
+    return {"status": "ok", "id": ticket_id}
+
+
+@app.post("/--/api/v2/push/send")
+async def send(messages: List[Dict[str, Any]]):
+    if len(messages) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail="Too many messages in one request")
+    app.state.requests.append(len(messages))
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    return {"data": [_ticket(message) for message in messages]}
+
+
+@app.post("/--/api/v2/push/getReceipts")
+async def get_receipts(payload: Dict[str, List[str]]):
+    receipts = {}
+    for ticket_id in payload.get("ids", []):
+        push_token = app.state.tickets.get(ticket_id)
+        if push_token is None:
+            continue
+        # Tokens containing "Uninstalled" are accepted but fail on delivery
+        if "Uninstalled" in push_token:
+            receipts[ticket_id] = _device_not_registered(push_token)
+        else:
+            receipts[ticket_id] = {"status": "ok"}
+    return {"data": receipts}
+
+
+@app.get("/stats")
+async def stats():
+    return {"requests": len(app.state.requests), "messages": sum(app.state.requests)}
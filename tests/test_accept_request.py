@@ -0,0 +1,117 @@
+import os
+from collections import Counter
+
+import pytest
+from beanie import PydanticObjectId, init_beanie
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+import models as models
+from database.transactions import supports_transactions
+from models.couple import Couple
+from models.request import Request, StatusEnum
+from service.request import accept_request
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# Reads and writes the accept flow may send
+COLLECTION_METHODS = ["find", "find_one", "update_one", "insert_one", "delete_one", "delete_many", "replace_one"]
+
+
+@pytest.fixture
+def round_trips(monkeypatch):
+    """Count the collection calls, each one a round trip to a real server."""
+    calls = Counter()
+    for name in COLLECTION_METHODS:
+        method = getattr(AsyncMongoMockCollection, name)
+
+        def counted(self, *args, __name=name, __method=method, **kwargs):
+            calls[__name] += 1
+            return __method(self, *args, **kwargs)
+
+        monkeypatch.setattr(AsyncMongoMockCollection, name, counted)
+    return calls
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def seed_request(database):
+    await init_beanie(document_models=models.__all__, database=database)
+    user, partner = PydanticObjectId(), PydanticObjectId()
+    return await Request(user_id=user, partner_id=partner).create()
+
+
+class TestAcceptRequest:
+    @pytest.mark.anyio
+    async def test_accept_round_trips(self, round_trips):
+        database = AsyncMongoMockClient().get_database(name="accept")
+        request = await seed_request(database)
+        round_trips.clear()
+
+        accepted = await accept_request(request.id, request.partner_id)
+
+        # Load, mark accepted, upsert the couple, delete the other pending requests
+        assert sum(round_trips.values()) == 4
+        assert accepted.status == StatusEnum.accepted
+        assert (await Request.get(request.id)).status == StatusEnum.accepted
+        assert await Couple.find(Couple.pair_key == request.pair_key).count() == 1
+
+    @pytest.mark.anyio
+    async def test_accept_deletes_other_pending_requests(self):
+        request = await seed_request(AsyncMongoMockClient().get_database(name="accept_cleanup"))
+        # Duplicates from before the unique pair key index was built
+        await Request.get_motor_collection().drop_index("pair_key_1")
+        await Request(user_id=request.partner_id, partner_id=request.user_id).create()
+        await Request(user_id=request.user_id, partner_id=request.partner_id).create()
+
+        await accept_request(request.id, request.partner_id)
+
+        assert await Request.find_all().count() == 1
+
+    @pytest.mark.anyio
+    async def test_accept_is_rolled_back_when_the_couple_fails(self, monkeypatch):
+        request = await seed_request(AsyncMongoMockClient().get_database(name="accept_rollback"))
+
+        async def failing_upsert(*args, **kwargs):
+            raise RuntimeError("write failed")
+
+        monkeypatch.setattr("service.couple_service.upsert_couple", failing_upsert)
+        with pytest.raises(HTTPException) as error:
+            await accept_request(request.id, request.partner_id)
+
+        assert error.value.status_code == 500
+        assert (await Request.get(request.id)).status == StatusEnum.pending
+        with pytest.raises(HTTPException) as error:
+            await accept_request(request.id, request.user_id)
+        assert error.value.status_code == 403
+
+    @pytest.mark.anyio
+    @pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+    async def test_accept_commands_on_database(self):
+        listener = CommandCounter()
+        client = AsyncIOMotorClient(TEST_DATABASE_URL, event_listeners=[listener])
+        database = client.get_default_database()
+        await client.drop_database(database.name)
+        request = await seed_request(database)
+        transactions = await supports_transactions(database)
+        listener.commands.clear()
+
+        await accept_request(request.id, request.partner_id)
+
+        # One more to commit when the steps ran in a transaction
+        assert len(listener.commands) == 4 + transactions
+        assert await Couple.find(Couple.pair_key == request.pair_key).count() == 1
@@ -0,0 +1,88 @@
+import time
+from unittest.mock import patch
+
+import jwt
+import pytest
+from beanie import PydanticObjectId
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import config.jwt_handler as jwt_handler
+from config.jwt_bearer import Principal, get_principal, jwt_bearer
+from config.jwt_handler import decode_jwt, sign_jwt
+
+
+@pytest.fixture(autouse=True)
+def signing_key(monkeypatch):
+    monkeypatch.setattr(jwt_handler, "secret_key", "test-secret")
+    monkeypatch.setattr(jwt_handler, "ALGORITHM", "HS256")
+    jwt_handler._verified_tokens.clear()
+
+
+def make_token(user_id=None, exp_in: int = 60, **claims) -> str:
+    payload = {"sub": str(user_id or PydanticObjectId()), "role": "baseUser", "email": "user@test.com",
+               "exp": int(time.time()) + exp_in, **claims}
+    return jwt.encode(payload, "test-secret", algorithm="HS256")
+
+
+class TestDecodeJwt:
+    def test_signature_is_verified_once_per_token(self):
+        token = sign_jwt(PydanticObjectId(), "baseUser", "user@test.com", None)["access_token"]
+
+        with patch("config.jwt_handler.jwt.decode", wraps=jwt.decode) as verify:
+            first = decode_jwt(token)
+            first["sub"] = "changed"
+            second = decode_jwt(token)
+
+        assert verify.call_count == 1
+        assert second["sub"] != "changed"
+
+    def test_invalid_and_expired_tokens_are_rejected(self):
+        for token, detail in [
+            ("not-a-token", "Invalid token"),
+            (make_token(exp_in=-1), "Token has expired"),
+            (jwt.encode({"sub": "x"}, "test-secret", algorithm="HS256"), "Invalid token"),
+            (jwt.encode({"sub": "x", "exp": time.time() + 60}, "other-secret", algorithm="HS256"), "Invalid token"),
+        ]:
+            with pytest.raises(HTTPException) as error:
+                decode_jwt(token)
+            assert (error.value.status_code, error.value.detail) == (401, detail)
+
+    def test_cached_token_still_expires(self):
+        token = make_token(exp_in=60)
+        decode_jwt(token)
+
+        with patch("config.jwt_handler.time.time", return_value=time.time() + 61):
+            with pytest.raises(HTTPException) as error:
+                decode_jwt(token)
+        assert error.value.detail == "Token has expired"
+
+
+class TestPrincipal:
+    def make_client(self):
+        app = FastAPI()
+
+        @app.get("/me", dependencies=[Depends(jwt_bearer)])
+        async def me(principal: Principal = Depends(get_principal)):
+            return {"user_id": str(principal.user_id), "role": principal.role, "email": principal.email}
+
+        return TestClient(app)
+
+    def test_principal_is_decoded_once_per_request(self):
+        user_id = PydanticObjectId()
+        client = self.make_client()
+
+        with patch("config.jwt_bearer.decode_jwt", wraps=decode_jwt) as decode:
+            response = client.get("/me", headers={"Authorization": f"Bearer {make_token(user_id)}"})
+
+        assert response.status_code == 200
+        assert response.json() == {"user_id": str(user_id), "role": "baseUser", "email": "user@test.com"}
+        assert decode.call_count == 1
+
+    def test_token_without_user_id_is_rejected(self):
+        client = self.make_client()
+
+        assert client.get("/me").status_code == 403
+        assert client.get("/me", headers={"Authorization": "Bearer bad"}).status_code == 401
+        response = client.get("/me", headers={"Authorization": f"Bearer {make_token(sub='not-an-id')}"})
+        assert response.status_code == 400
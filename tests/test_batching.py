@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from database.batching import iter_batches, process_in_batches
+from models.user import User
+from schemas.user import UserId
+
+
+async def init_users(count):
+    client = AsyncMongoMockClient()
+    await init_beanie(document_models=[User], database=client.get_database(name="batching"))
+    await User.insert_many([
+        User(fullname=f"user {i}", email=f"user{i}@test.com", phone=None, password="secret", role="baseUser")
+        for i in range(count)
+    ])
+
+
+class TestKeysetBatches:
+    @pytest.mark.anyio
+    async def test_iter_batches_covers_every_document_once(self):
+        await init_users(23)
+
+        batches = [batch async for batch in iter_batches(User, projection_model=UserId, batch_size=10)]
+
+        assert [len(batch) for batch in batches] == [10, 10, 3]
+        ids = [user.id for batch in batches for user in batch]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == 23
+
+    @pytest.mark.anyio
+    async def test_process_in_batches_limits_concurrency(self):
+        await init_users(12)
+        running = 0
+        peak = 0
+
+        async def handler(user):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        processed = await process_in_batches(
+            User, handler, "test", query={"fullname": {"$ne": "user 0"}}, batch_size=5, concurrency=2
+        )
+
+        assert processed == 11
+        assert peak == 2
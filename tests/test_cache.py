@@ -0,0 +1,197 @@
+import asyncio
+import os
+
+import pytest
+
+from database.cache import DocumentCache, InvalidationBus
+from models.routine import Routine
+from models.user import User
+from monitoring.fastapi_metrics import cache_invalidations, cache_requests
+from service.routine_service import create_routine_for_new_user
+from schemas.user import UserProfile
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+pytestmark = pytest.mark.usefixtures("local_only")
+
+
+async def create_user():
+    return await User(
+        fullname="user", email="user@test.com", phone=None, password="hashed", role="baseUser"
+    ).create()
+
+
+def count(cache: str, result: str) -> float:
+    return cache_requests.labels(cache=cache, result=result)._value.get()
+
+
+class TestDocumentCache:
+    @pytest.mark.anyio
+    async def test_reads_through_and_invalidates(self, document_database):
+        user = await create_user()
+        await create_routine_for_new_user(user.id)
+        cache = DocumentCache("test_routine", Routine)
+        loads = []
+
+        async def loader():
+            loads.append(1)
+            return await Routine.find_one(Routine.user_id == user.id)
+
+        misses, hits = count("test_routine", "miss"), count("test_routine", "local_hit")
+        first = await cache.get(user.id, loader)
+        second = await cache.get(user.id, loader)
+
+        assert len(loads) == 1
+        assert second.id == first.id and second.days[0].sessions[0].minute_of_day == 7 * 60
+        assert second is not first
+        assert count("test_routine", "miss") == misses + 1
+        assert count("test_routine", "local_hit") == hits + 1
+
+        first.routine_name = "Renamed"
+        await first.save()
+        await cache.invalidate(user.id)
+        assert (await cache.get(user.id, loader)).routine_name == "Renamed"
+        assert len(loads) == 2
+
+        await cache.invalidate_all()
+        await cache.get(user.id, loader)
+        assert len(loads) == 3
+
+    @pytest.mark.anyio
+    async def test_invalidate_many_keeps_other_keys(self):
+        cache = DocumentCache("test_many", UserProfile)
+        loads = []
+
+        def loader(key):
+            async def load():
+                loads.append(key)
+                return UserProfile(fullname=key, email=f"{key}@test.com")
+            return load
+
+        for key in ["a", "b", "c"]:
+            await cache.get(key, loader(key))
+        await cache.invalidate_many(["a", "c", "a"])
+        for key in ["a", "b", "c"]:
+            await cache.get(key, loader(key))
+
+        assert loads == ["a", "b", "c", "a", "c"]
+
+    @pytest.mark.anyio
+    async def test_value_invalidated_while_loading_is_not_cached(self, document_database):
+        user = await create_user()
+        cache = DocumentCache("test_stale_fill", UserProfile)
+        loads = []
+
+        async def loader():
+            profile = await User.find_one({"_id": user.id}, projection_model=UserProfile)
+            if not loads:
+                # A writer saves and invalidates between the read and the fill
+                await User.find_one(User.id == user.id).update({"$set": {"streak": 3}})
+                await cache.invalidate(user.id)
+            loads.append(profile.streak)
+            return profile
+
+        await cache.get(user.id, loader)
+        profile = await cache.get(user.id, loader)
+
+        assert loads == [0, 3]
+        assert profile.streak == 3
+
+    @pytest.mark.anyio
+    async def test_missing_documents_are_not_cached(self, document_database):
+        user = await create_user()
+        cache = DocumentCache("test_user", UserProfile)
+        loads = []
+
+        async def loader():
+            loads.append(1)
+            return await User.find_one({"_id": user.id, "streak": 5}, projection_model=UserProfile)
+
+        assert await cache.get(user.id, loader) is None
+        await User.find_one(User.id == user.id).update({"$set": {"streak": 5}})
+        profile = await cache.get(user.id, loader)
+
+        assert len(loads) == 2
+        assert profile.id == user.id and profile.streak == 5
+
+
+class TestInvalidationBus:
+    def test_messages_evict_local_entries(self):
+        cache = DocumentCache("test_bus", UserProfile)
+        bus = InvalidationBus([cache])
+        cache.apply_invalidation(3)
+        cache._local.update({"a": "{}", "b": "{}"})
+
+        bus.handle('{"cache": "test_bus", "key": "a", "version": 4}')
+        assert list(cache._local) == ["b"]
+
+        bus.handle('{"cache": "other", "key": "b", "version": 9}')
+        bus.handle("not json")
+        assert list(cache._local) == ["b"]
+
+        bus.handle('{"cache": "test_bus", "key": "", "version": 5}')
+        assert not cache._local
+
+    def test_missed_message_drops_local_tier(self):
+        cache = DocumentCache("test_missed", UserProfile)
+        missed = cache_invalidations.labels(cache="test_missed", source="missed")._value.get()
+        cache.apply_invalidation(3)
+        cache._local.update({"a": "{}", "b": "{}"})
+
+        # Version 4 was never delivered
+        cache.apply_invalidation(5, "a", source="bus")
+        assert not cache._local
+
+        # The stamp is ahead of every message seen
+        cache._local["b"] = "{}"
+        cache.apply_invalidation(5)
+        assert list(cache._local) == ["b"]
+        cache.apply_invalidation(6)
+        assert not cache._local
+        assert cache_invalidations.labels(cache="test_missed", source="missed")._value.get() == missed + 2
+
+    @pytest.mark.anyio
+    @pytest.mark.skipif(not TEST_REDIS_URL, reason="TEST_REDIS_URL is not set")
+    async def test_write_evicts_other_processes(self, monkeypatch, document_database):
+        monkeypatch.setenv("REDIS_URL", TEST_REDIS_URL)
+        user = await create_user()
+        writer = DocumentCache("test_redis_user", UserProfile)
+        reader = DocumentCache("test_redis_user", UserProfile)
+        bus = InvalidationBus([reader])
+        await bus.start()
+
+        async def loader():
+            return await User.find_one({"_id": user.id}, projection_model=UserProfile)
+
+        try:
+            await asyncio.sleep(0.1)
+            assert (await reader.get(user.id, loader)).streak == 0
+            await User.find_one(User.id == user.id).update({"$set": {"streak": 2}})
+            await writer.invalidate(user.id)
+            await asyncio.sleep(0.1)
+            assert (await reader.get(user.id, loader)).streak == 2
+        finally:
+            await bus.stop()
+
+    @pytest.mark.anyio
+    @pytest.mark.skipif(not TEST_REDIS_URL, reason="TEST_REDIS_URL is not set")
+    async def test_write_during_load_is_not_filled(self, monkeypatch, document_database):
+        monkeypatch.setenv("REDIS_URL", TEST_REDIS_URL)
+        user = await create_user()
+        writer = DocumentCache("test_redis_fill", UserProfile)
+        reader = DocumentCache("test_redis_fill", UserProfile)
+        loads = []
+
+        async def loader():
+            profile = await User.find_one({"_id": user.id}, projection_model=UserProfile)
+            if not loads:
+                await User.find_one(User.id == user.id).update({"$set": {"streak": 4}})
+                await writer.invalidate(user.id)
+            loads.append(profile.streak)
+            return profile
+
+        await reader.get(user.id, loader)
+        # Another process sees no stale value in Redis
+        other = DocumentCache("test_redis_fill", UserProfile)
+        assert (await other.get(user.id, loader)).streak == 4
+        assert loads == [0, 4]
@@ -0,0 +1,96 @@
+"""
+Benchmark of the couple dashboard (GET /v1/couple), polled constantly by the app.
+
+Targets, for the service call with warm document caches:
+- p50 under 5 ms in-process, against mongomock (no network round trips), run when RUN_BENCHMARKS is set
+- p95 under 25 ms against a real MongoDB, run when TEST_DATABASE_URL is set
+
+Both are wall-clock measurements, so they are kept out of the default suite.
+"""
+import os
+import time
+from datetime import datetime
+
+import pytest
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import models as models
+from models.couple import Couple
+from models.routine import Routine, find_day
+from models.tracker import Tracker
+from models.user import User
+from routes.routine import serialize_day
+from schemas.routine import DayResponseSchema, DaySchema
+from service.couple_service import get_couples_by_user
+from service.routine_service import create_routine_for_new_user
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+RUN_BENCHMARKS = os.getenv("RUN_BENCHMARKS")
+
+MOCK_P50_TARGET_MS = 5
+DATABASE_P95_TARGET_MS = 25
+
+pytestmark = pytest.mark.usefixtures("local_only")
+
+
+async def seed_couple():
+    user = await User(fullname="user", email="user@test.com", phone=None, password="hashed", role="baseUser").create()
+    partner = await User(fullname="partner", email="partner@test.com", phone=None, password="hashed", role="baseUser").create()
+    await Couple(user_1=user.id, user_2=partner.id).create()
+    await create_routine_for_new_user(partner.id)
+    await Tracker(user_id=partner.id, img_url="https://img", date=datetime.now().date(), timeTracking="08:00").create()
+    return user, partner
+
+
+async def measure(user_id, runs: int = 200):
+    await get_couples_by_user(user_id)
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await get_couples_by_user(user_id)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[runs // 2], timings[int(runs * 0.95)]
+
+
+class TestCoupleDashboard:
+    @pytest.mark.anyio
+    async def test_dashboard_matches_schema(self, document_database):
+        user, partner = await seed_couple()
+
+        data = await get_couples_by_user(user.id)
+
+        routine = await Routine.find_one(Routine.user_id == partner.id)
+        day = find_day(routine.days, datetime.now().weekday())
+        expected = DayResponseSchema(
+            routine_name=routine.routine_name,
+            push_token=routine.push_token,
+            today=DaySchema.model_validate(serialize_day(day))
+        )
+        assert data["partner"]["id"] == str(partner.id)
+        assert data["partner"]["today_routine"] == expected.model_dump()
+        assert data["partner"]["today_tracker"]["img_url"] == "https://img"
+        assert await get_couples_by_user(partner.id) != {}
+
+    @pytest.mark.anyio
+    @pytest.mark.skipif(not RUN_BENCHMARKS, reason="RUN_BENCHMARKS is not set")
+    async def test_dashboard_latency_in_process(self, document_database):
+        user, _ = await seed_couple()
+
+        p50, p95 = await measure(user.id)
+
+        assert p50 < MOCK_P50_TARGET_MS, f"couple dashboard on mongomock: p50 {p50:.2f} ms, p95 {p95:.2f} ms"
+
+    @pytest.mark.anyio
+    @pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+    async def test_dashboard_latency_on_database(self):
+        client = AsyncIOMotorClient(TEST_DATABASE_URL)
+        database = client.get_default_database()
+        await client.drop_database(database.name)
+        await init_beanie(document_models=models.__all__, database=database)
+        user, _ = await seed_couple()
+
+        p50, p95 = await measure(user.id)
+
+        assert p95 < DATABASE_P95_TARGET_MS, f"couple dashboard on MongoDB: p50 {p50:.2f} ms, p95 {p95:.2f} ms"
@@ -0,0 +1,35 @@
+import asyncio
+
+from config import config
+from config.config import Settings, close_database, create_client, get_client
+
+
+class TestDatabaseClient:
+    def test_pool_settings_are_applied(self, monkeypatch):
+        monkeypatch.setenv("DATABASE_URL", "mongodb://localhost:27017/test")
+        monkeypatch.setenv("DATABASE_MAX_POOL_SIZE", "7")
+
+        client = create_client(Settings())
+        try:
+            assert client.options.pool_options.max_pool_size == 7
+            assert client.options.pool_options.min_pool_size == 5
+        finally:
+            client.close()
+
+    def test_one_client_per_event_loop(self, monkeypatch):
+        monkeypatch.setenv("DATABASE_URL", "mongodb://localhost:27017/test")
+
+        async def two_clients():
+            return get_client(), get_client()
+
+        try:
+            first, second = asyncio.run(two_clients())
+            assert first is second
+
+            # A new loop gets a new client and Beanie must be initialized again
+            config._beanie_initialized = True
+            third, _ = asyncio.run(two_clients())
+            assert third is not first
+            assert config._beanie_initialized is False
+        finally:
+            close_database()
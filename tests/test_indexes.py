@@ -0,0 +1,108 @@
+import os
+from datetime import date, datetime
+
+import pytest
+from beanie import PydanticObjectId, init_beanie
+from mongomock_motor import AsyncMongoMockClient
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import models as models
+from database.indexes import declared_indexes, find_missing_indexes
+from models.couple import pair_key
+from models.request import Request
+from models.routine import Routine
+from models.tracker import Tracker
+from models.user import User
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class TestDeclaredIndexes:
+    def test_index_declarations_are_normalized(self):
+        assert declared_indexes(User) == [((("email", 1),), True)]
+        assert declared_indexes(Tracker) == [
+            ((("user_id", 1), ("date", -1)), False),
+            ((("date", 1), ("user_id", 1)), False),
+        ]
+        assert ((("partner_id", 1), ("status", 1), ("created_at", -1), ("_id", -1)), False) in declared_indexes(Request)
+
+    @pytest.mark.anyio
+    async def test_missing_indexes_are_reported(self):
+        database = AsyncMongoMockClient().get_database(name="indexes")
+        await database["user"].insert_one({"email": "a@b.com"})
+
+        missing = await find_missing_indexes(database, [User, Routine])
+
+        assert missing == {"user": ["email_1 (unique)"], "routine": ["user_id_1 (unique)"]}
+
+        await init_beanie(database=database, document_models=[User, Routine])
+        assert await find_missing_indexes(database, [User, Routine]) == {}
+
+
+def winning_stages(plan):
+    """Return every stage name of a winning plan, including nested input stages."""
+    stages = []
+    stack = [plan["queryPlanner"]["winningPlan"]]
+    while stack:
+        stage = stack.pop()
+        stages.append(stage.get("stage"))
+        stack.extend(stage.get("inputStages", []))
+        if "inputStage" in stage:
+            stack.append(stage["inputStage"])
+        if "queryPlan" in stage:
+            stack.append(stage["queryPlan"])
+    return stages
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+class TestHotQueryPlans:
+    @pytest.mark.anyio
+    async def test_hot_queries_use_indexes(self):
+        client = AsyncIOMotorClient(TEST_DATABASE_URL)
+        database = client.get_default_database()
+        await client.drop_database(database.name)
+        await init_beanie(database=database, document_models=models.__all__)
+
+        user_id, partner_id = PydanticObjectId(), PydanticObjectId()
+        today = datetime.combine(date.today(), datetime.min.time())
+        for name, document in [
+            ("user", {"email": "a@b.com"}),
+            ("routine", {"user_id": user_id}),
+            ("tracker", {"user_id": user_id, "date": today}),
+            ("request", {"user_id": user_id, "partner_id": partner_id, "status": "pending", "created_at": today,
+                         "pair_key": pair_key(user_id, partner_id)}),
+            ("couple", {"user_1": user_id, "user_2": partner_id, "pair_key": pair_key(user_id, partner_id)}),
+            ("job_checkpoint", {"job": "mark_not_done", "run_date": today}),
+            ("session_schedule", {"routine_id": user_id, "weekday": 0, "minute_of_day": 60, "deadline_minute": 121}),
+        ]:
+            await database[name].insert_one(document)
+
+        hot_queries = [
+            ("user", {"email": "a@b.com"}, None),
+            ("routine", {"user_id": user_id}, None),
+            ("tracker", {"user_id": user_id, "date": today}, None),
+            ("tracker", {"user_id": user_id}, [("date", -1)]),
+            ("tracker", {"user_id": user_id, "date": {"$gte": today, "$lte": today}}, [("date", -1)]),
+            ("tracker", {"date": {"$gte": today, "$lte": today}, "user_id": {"$gt": PydanticObjectId()}}, None),
+            ("request", {"user_id": user_id, "status": "pending"}, None),
+            ("request", {"partner_id": partner_id, "status": "pending"}, None),
+            ("request", {"partner_id": partner_id, "status": "pending", "$or": [
+                {"created_at": {"$lt": today}},
+                {"created_at": today, "_id": {"$lt": PydanticObjectId()}}
+            ]}, [("created_at", -1), ("_id", -1)]),
+            ("request", {"pair_key": pair_key(user_id, partner_id), "status": {"$in": ["pending", "accepted"]}}, None),
+            ("couple", {"pair_key": pair_key(user_id, partner_id)}, None),
+            ("couple", {"$or": [{"user_1": user_id}, {"user_2": user_id}]}, None),
+            ("job_checkpoint", {"job": "mark_not_done", "run_date": today}, None),
+            ("session_schedule", {"weekday": 0, "minute_of_day": 60}, None),
+            ("session_schedule", {"weekday": 0, "deadline_minute": {"$gt": 60, "$lte": 121}}, None),
+        ]
+        try:
+            for name, query, sort in hot_queries:
+                cursor = database[name].find(query)
+                if sort:
+                    cursor = cursor.sort(sort)
+                stages = winning_stages(await cursor.explain())
+                assert "COLLSCAN" not in stages, f"{name} {query} does a COLLSCAN"
+        finally:
+            await client.drop_database(database.name)
@@ -0,0 +1,92 @@
+import os
+from datetime import datetime
+
+import pytest
+from beanie import PydanticObjectId, init_beanie
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
+
+import models as models
+from models.couple import Couple, pair_key
+from models.request import Request, StatusEnum
+from service.couple_service import create_couple, delete_couple_by_id, get_couple_by_users
+from service import migrate_pair_keys
+from service.request import check_can_create_request, create_send_request
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class TestPairKey:
+    @pytest.mark.anyio
+    async def test_pair_key_is_symmetric(self, document_database):
+        user, partner = PydanticObjectId(), PydanticObjectId()
+
+        assert pair_key(user, partner) == pair_key(partner, user)
+        assert Couple(user_1=partner, user_2=user).pair_key == pair_key(user, partner)
+        assert Request(user_id=user, partner_id=partner).pair_key == pair_key(user, partner)
+
+    @pytest.mark.anyio
+    async def test_one_couple_per_pair(self, document_database):
+        user, partner = PydanticObjectId(), PydanticObjectId()
+
+        couple = await create_couple(user, partner)
+        with pytest.raises(DuplicateKeyError):
+            await Couple(user_1=partner, user_2=user).create()
+
+        assert (await create_couple(partner, user)).id == couple.id
+        assert (await get_couple_by_users(partner, user)).id == couple.id
+        assert await Couple.count() == 1
+
+    @pytest.mark.anyio
+    async def test_one_request_per_pair(self, document_database):
+        user, partner = PydanticObjectId(), PydanticObjectId()
+
+        await create_send_request(user, partner)
+        with pytest.raises(HTTPException) as error:
+            await create_send_request(partner, user)
+
+        assert error.value.status_code == 409
+        assert not await check_can_create_request(partner, user)
+        assert await Request.find(Request.status == StatusEnum.pending).count() == 1
+
+    @pytest.mark.anyio
+    async def test_delete_couple_with_its_accepted_request(self, document_database):
+        user, partner = PydanticObjectId(), PydanticObjectId()
+        couple = await create_couple(user, partner)
+        await Request(user_id=partner, partner_id=user, status=StatusEnum.accepted).create()
+
+        assert await delete_couple_by_id(couple.id)
+        assert await Couple.count() == 0
+        assert await Request.count() == 0
+        assert not await delete_couple_by_id(couple.id)
+
+    # Legacy documents have no pair_key; mongomock ignores the partial filter of its unique index
+    @pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+    @pytest.mark.anyio
+    async def test_migration_keeps_the_accepted_request(self, monkeypatch):
+        client = AsyncIOMotorClient(TEST_DATABASE_URL)
+        database = client.get_default_database()
+        await client.drop_database(database.name)
+        await init_beanie(document_models=models.__all__, database=database)
+
+        async def initiated():
+            pass
+
+        monkeypatch.setattr(migrate_pair_keys, "initiate_database", initiated)
+        user, partner = PydanticObjectId(), PydanticObjectId()
+        # Legacy requests stored before pair_key, the pending one first
+        collection = Request.get_motor_collection()
+        await collection.insert_one(
+            {"user_id": partner, "partner_id": user, "status": "pending", "created_at": datetime.now()}
+        )
+        accepted = await collection.insert_one(
+            {"user_id": user, "partner_id": partner, "status": "accepted", "created_at": datetime.now()}
+        )
+
+        await migrate_pair_keys.migrate_pair_keys(verbose=False)
+
+        requests = await Request.find_all().to_list()
+        assert [(request.id, request.status) for request in requests] == [(accepted.inserted_id, StatusEnum.accepted)]
+        assert await collection.count_documents({"pair_key": pair_key(user, partner)}) == 1
+        await client.drop_database(database.name)
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+
+import pytest
+from beanie import PydanticObjectId
+
+from service.partner_events import (
+    PartnerEventHub,
+    Subscription,
+    format_sse,
+    partner_events_key,
+    publish_partner_event,
+)
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+class TestPartnerEventFormat:
+    def test_format_sse(self):
+        assert format_sse("1-0", "tracker", '{"a": 1}') == 'id: 1-0\nevent: tracker\ndata: {"a": 1}\n\n'
+        assert format_sse(None, "snapshot", "a\nb") == "event: snapshot\ndata: a\ndata: b\n\n"
+
+    def test_subscription_skips_events_already_sent(self):
+        subscription = Subscription(partner_events_key("user"), "1700000000000-1")
+
+        assert not subscription.accept("1700000000000-0")
+        assert not subscription.accept("1700000000000-1")
+        assert subscription.accept("1700000000000-2")
+        assert subscription.accept("1700000000001-0")
+        assert not subscription.accept("1700000000000-9")
+
+    def test_live_events_during_backlog_read_are_not_lost(self):
+        subscription = Subscription(partner_events_key("user"), "1-0")
+        subscription.hold()
+        # The hub reads event 3-0 while the backlog is being fetched
+        subscription.deliver("3-0", {"type": "tracker"})
+        subscription.release([("2-0", {"type": "session_done"}), ("3-0", {"type": "tracker"})])
+
+        sent = []
+        while not subscription.queue.empty():
+            event_id, fields = subscription.queue.get_nowait()
+            if subscription.accept(event_id):
+                sent.append((event_id, fields["type"]))
+
+        assert sent == [("2-0", "session_done"), ("3-0", "tracker")]
+
+    def test_slow_subscriber_is_flagged(self):
+        subscription = Subscription(partner_events_key("user"), "0-0")
+        for i in range(subscription.queue.maxsize + 1):
+            subscription.deliver(f"{i + 1}-0", {})
+
+        assert subscription.lagging
+
+    @pytest.mark.anyio
+    async def test_publish_without_redis_is_a_no_op(self, monkeypatch):
+        monkeypatch.delenv("REDIS_URL", raising=False)
+
+        assert await publish_partner_event(PydanticObjectId(), "tracker", {}) is None
+
+
+@pytest.mark.skipif(not TEST_REDIS_URL, reason="TEST_REDIS_URL is not set")
+class TestPartnerEventHub:
+    @pytest.fixture(autouse=True)
+    def redis_url(self, monkeypatch):
+        monkeypatch.setenv("REDIS_URL", TEST_REDIS_URL or "")
+
+    @pytest.mark.anyio
+    async def test_live_events_and_resume(self):
+        hub = PartnerEventHub(block_ms=100)
+        partner_id = PydanticObjectId()
+
+        live = await hub.subscribe(partner_id)
+        assert live.resync
+        first = await publish_partner_event(partner_id, "session_done", {"streak": 1})
+        second = await publish_partner_event(partner_id, "tracker", {"streak": 2})
+
+        received = [await asyncio.wait_for(live.queue.get(), 2) for _ in range(2)]
+        assert [event_id for event_id, _ in received] == [first, second]
+        assert json.loads(received[1][1]["data"]) == {"streak": 2}
+        hub.unsubscribe(live)
+
+        resumed = await hub.subscribe(partner_id, first)
+        assert not resumed.resync
+        event_id, fields = await asyncio.wait_for(resumed.queue.get(), 2)
+        assert event_id == second and fields["type"] == "tracker"
+        hub.unsubscribe(resumed)
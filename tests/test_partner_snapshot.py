@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.routine import WEEKDAYS, Routine
+from models.snapshot import PartnerSnapshot
+from models.user import User
+from service.routine_service import create_routine_for_new_user
+from service.snapshot_service import (
+    SNAPSHOT_MAX_AGE,
+    expire_partner_snapshots,
+    get_partner_snapshot,
+    refresh_partner_snapshot,
+)
+
+
+pytestmark = pytest.mark.usefixtures("local_only")
+
+
+async def seed_user():
+    user = await User(
+        fullname="user", email="user@test.com", phone=None, password="hashed", role="baseUser"
+    ).create()
+    await create_routine_for_new_user(user.id)
+    return user
+
+
+class TestPartnerSnapshot:
+    @pytest.mark.anyio
+    async def test_refresh_follows_writes(self, document_database):
+        user = await seed_user()
+        snapshot = await get_partner_snapshot(user.id)
+
+        assert snapshot.email == "user@test.com"
+        assert snapshot.today_tracker is None
+        assert [s["status"] for s in snapshot.today_routine["today"]["sessions"]] == ["pending", "pending"]
+        assert "minute_of_day" not in snapshot.today_routine["today"]["sessions"][0]
+
+        routine = await Routine.find_one(Routine.user_id == user.id)
+        routine.days[datetime.now().weekday()].sessions[0].status = "done"
+        await routine.save()
+        await User.find_one(User.id == user.id).update({"$set": {"streak": 4}})
+        await refresh_partner_snapshot(user.id)
+
+        snapshot = await get_partner_snapshot(user.id)
+        assert snapshot.streak == 4
+        assert snapshot.today_routine["today"]["sessions"][0]["status"] == "done"
+        assert await PartnerSnapshot.find(PartnerSnapshot.user_id == user.id).count() == 1
+
+    @pytest.mark.anyio
+    async def test_routine_without_weekday_falls_back_to_day_name(self, document_database):
+        user = await seed_user()
+        # A routine the weekday backfill has not reached yet
+        collection = Routine.get_motor_collection()
+        stored = await collection.find_one({"user_id": user.id})
+        for day in stored["days"]:
+            del day["weekday"]
+            day["day_of_week"] = day["day_of_week"].lower()
+        await collection.replace_one({"_id": stored["_id"]}, stored)
+
+        snapshot = await refresh_partner_snapshot(user.id)
+
+        assert snapshot.today_routine["today"]["day_of_week"] == WEEKDAYS[datetime.now().weekday()]
+        assert len(snapshot.today_routine["today"]["sessions"]) == 2
+
+    @pytest.mark.anyio
+    async def test_stale_snapshots_are_rebuilt(self, document_database):
+        user = await seed_user()
+        await refresh_partner_snapshot(user.id)
+        await User.find_one(User.id == user.id).update({"$set": {"fullname": "renamed"}})
+
+        # Within the max age the snapshot is served as is
+        assert (await get_partner_snapshot(user.id)).fullname == "user"
+
+        await PartnerSnapshot.find(PartnerSnapshot.user_id == user.id).update(
+            {"$set": {"built_at": datetime.now() - SNAPSHOT_MAX_AGE - timedelta(seconds=1)}}
+        )
+        assert (await get_partner_snapshot(user.id)).fullname == "renamed"
+
+        await User.find_one(User.id == user.id).update({"$set": {"fullname": "again"}})
+        assert await expire_partner_snapshots([user.id]) == 1
+        assert (await get_partner_snapshot(user.id)).fullname == "again"
+
+    @pytest.mark.anyio
+    async def test_older_refresh_does_not_overwrite(self, document_database):
+        user = await seed_user()
+        newer = await refresh_partner_snapshot(user.id)
+        await PartnerSnapshot.find(PartnerSnapshot.user_id == user.id).update(
+            {"$set": {"built_at": newer.built_at + timedelta(minutes=1), "fullname": "newer"}}
+        )
+
+        await refresh_partner_snapshot(user.id)
+
+        stored = await PartnerSnapshot.find_one(PartnerSnapshot.user_id == user.id)
+        assert stored.fullname == "newer"
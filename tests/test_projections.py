@@ -0,0 +1,43 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from models.tracker import Tracker
+from models.user import User
+from service.snapshot_service import get_today_tracker
+from service.routine_service import create_routine_for_new_user
+from service.user_service import get_current_user
+
+
+async def create_user():
+    return await User(
+        fullname="user", email="user@test.com", phone=None, password="hashed", role="baseUser"
+    ).create()
+
+
+class TestProjections:
+    @pytest.mark.anyio
+    async def test_current_user_without_password(self, document_database):
+        user = await create_user()
+
+        with pytest.raises(HTTPException) as error:
+            await get_current_user(user.id)
+        assert error.value.status_code == 404
+
+        await create_routine_for_new_user(user.id)
+        data = await get_current_user(user.id)
+
+        assert data["email"] == "user@test.com"
+        assert "password" not in data
+
+    @pytest.mark.anyio
+    async def test_partner_tracker_without_routine(self, document_database):
+        user = await create_user()
+        await Tracker(user_id=user.id, date=date.today(), timeTracking="10:00", img_url="img").create()
+
+        tracker = await get_today_tracker(user.id)
+
+        assert tracker.img_url == "img"
+        assert tracker.date == date.today()
+        assert not hasattr(tracker, "routine_of_day")
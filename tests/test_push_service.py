@@ -0,0 +1,71 @@
+import httpx
+import pytest
+
+from service.push_service import ExpoPushClient, build_push_message
+from tests.fake_expo_server import app as fake_expo
+
+
+@pytest.fixture
+def push_client():
+    fake_expo.state.requests = []
+    fake_expo.state.tickets = {}
+    return ExpoPushClient(
+        url="http://expo.test/--/api/v2/push/send",
+        max_concurrency=2,
+        transport=httpx.ASGITransport(app=fake_expo),
+    )
+
+
+class TestExpoPushClient:
+    @pytest.mark.anyio
+    async def test_messages_are_sent_in_batches_of_100(self, push_client):
+        messages = [
+            build_push_message(f"ExponentPushToken[{i}]", "Time for skincare", "body")
+            for i in range(250)
+        ]
+
+        tickets = await push_client.send(messages)
+
+        assert fake_expo.state.requests == [100, 100, 50]
+        assert len(tickets) == 250
+        assert all(ticket.status == "ok" and ticket.id for ticket in tickets)
+        assert [ticket.push_token for ticket in tickets] == [m["to"] for m in messages]
+        await push_client.aclose()
+
+    @pytest.mark.anyio
+    async def test_errors_are_reported_per_ticket(self, push_client):
+        tickets = await push_client.send([
+            build_push_message("ExponentPushToken[ok]", "title", "body"),
+            build_push_message("ExponentPushToken[Unregistered]", "title", "body"),
+            build_push_message("", "title", "body"),
+        ])
+
+        assert [ticket.status for ticket in tickets] == ["ok", "error"]
+        assert tickets[1].error == "DeviceNotRegistered"
+        await push_client.aclose()
+
+    @pytest.mark.anyio
+    async def test_receipts_are_fetched_for_tickets(self, push_client):
+        tickets = await push_client.send([
+            build_push_message("ExponentPushToken[ok]", "title", "body"),
+            build_push_message("ExponentPushToken[Uninstalled]", "title", "body"),
+        ])
+
+        receipts = await push_client.get_receipts([ticket.id for ticket in tickets] + ["unknown"])
+
+        assert receipts[tickets[0].id] == {"status": "ok"}
+        assert receipts[tickets[1].id]["details"]["error"] == "DeviceNotRegistered"
+        assert "unknown" not in receipts
+        await push_client.aclose()
+
+    @pytest.mark.anyio
+    async def test_transport_failure_marks_batch_failed(self):
+        def fail(request):
+            raise httpx.ConnectError("connection refused")
+
+        client = ExpoPushClient(url="http://expo.test/send", transport=httpx.MockTransport(fail))
+        tickets = await client.send([build_push_message("ExponentPushToken[a]", "title", "body")])
+
+        assert tickets[0].status == "error"
+        assert "connection refused" in tickets[0].message
+        await client.aclose()
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+from beanie import PydanticObjectId
+from fastapi import HTTPException
+
+from database.pagination import decode_cursor, encode_cursor
+from models.request import Request, StatusEnum
+from models.user import User
+from service.request import get_list_request_received, get_sent_request
+
+
+async def seed_requests(count: int):
+    receiver = await User(
+        fullname="receiver", email="receiver@test.com", phone=None, password="hashed", role="baseUser"
+    ).create()
+    created_at = datetime(2024, 1, 1)
+    for i in range(count):
+        sender = await User(
+            fullname=f"sender {i}", email=f"sender{i}@test.com", phone=None, password="hashed", role="baseUser",
+            avatar=f"https://img/{i}"
+        ).create()
+        # Pairs of requests share a created_at, so the _id has to break ties
+        await Request(user_id=sender.id, partner_id=receiver.id, created_at=created_at + timedelta(minutes=i // 2)).create()
+    await Request(user_id=PydanticObjectId(), partner_id=receiver.id, status=StatusEnum.accepted).create()
+    return receiver
+
+
+class TestRequestListing:
+    def test_cursor_round_trip(self):
+        document_id = PydanticObjectId()
+        created_at = datetime(2024, 1, 1, 8, 30, 15, 123000)
+
+        assert decode_cursor(encode_cursor(created_at, document_id)) == (created_at, document_id)
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    @pytest.mark.anyio
+    async def test_pages_cover_every_pending_request_once(self, document_database):
+        receiver = await seed_requests(7)
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = await get_list_request_received(receiver.id, limit=3, cursor=cursor)
+            seen.extend(page)
+            if cursor is None:
+                break
+
+        assert [request.sender_info.fullname for request in seen] == [f"sender {i}" for i in range(6, -1, -1)]
+        assert seen[-1].sender_info.avatar == "https://img/0"
+        assert seen[0].sender_info.model_dump().keys() == {"fullname", "email", "avatar"}
+
+    @pytest.mark.anyio
+    async def test_sent_requests_join_the_receiver(self, document_database):
+        receiver = await seed_requests(2)
+        sender_id = (await Request.find_one(Request.partner_id == receiver.id)).user_id
+
+        page, cursor = await get_sent_request(sender_id)
+
+        assert cursor is None
+        assert [request.receiver_info.email for request in page] == ["receiver@test.com"]
+        with pytest.raises(HTTPException) as error:
+            await get_sent_request(sender_id, cursor="not-a-cursor")
+        assert error.value.status_code == 400
+
+    @pytest.mark.anyio
+    async def test_malformed_stored_request_is_a_server_error(self, document_database):
+        receiver = await seed_requests(1)
+        await Request.get_motor_collection().insert_one(
+            {"user_id": "not-an-id", "partner_id": receiver.id, "status": "pending", "created_at": datetime(2024, 2, 1)}
+        )
+
+        with pytest.raises(HTTPException) as error:
+            await get_list_request_received(receiver.id)
+        assert error.value.status_code == 500
@@ -0,0 +1,154 @@
+import os
+import time
+from datetime import date, datetime
+
+import pytest
+from beanie import init_beanie
+from beanie import PydanticObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import models as models
+from database.database import get_or_create_checkpoint
+from models.job import JobCheckpoint
+from models.routine import Routine, Session
+from service.routine_service import (
+    MARK_NOT_DONE_JOB,
+    RESET_SESSIONS_JOB,
+    complete_mark_not_done,
+    create_routine_for_new_user,
+    real_mark_not_done_shard,
+    real_reset_sessions_status,
+)
+from service.schedule_service import get_overdue_sessions, sync_routine_schedule
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# Sessions of a new routine: 07:00 AM and 09:00 PM, missed 61 minutes later
+MORNING_DEADLINE = 7 * 60 + 61
+EVENING_DEADLINE = 21 * 60 + 61
+
+pytestmark = pytest.mark.usefixtures("local_only")
+
+
+@pytest.fixture
+async def database():
+    """A real MongoDB, needed for the array filter updates mongomock does not implement."""
+    client = AsyncIOMotorClient(TEST_DATABASE_URL)
+    database = client.get_default_database()
+    await client.drop_database(database.name)
+    await init_beanie(database=database, document_models=models.__all__)
+    yield database
+    await client.drop_database(database.name)
+
+
+def statuses(routine: Routine, weekday: int):
+    return [session.status for session in routine.days[weekday].sessions]
+
+
+class TestMarkNotDone:
+    @pytest.mark.anyio
+    async def test_overdue_window(self, document_database):
+        await create_routine_for_new_user(PydanticObjectId())
+
+        assert [e.time for e in await get_overdue_sessions(0, None, MORNING_DEADLINE - 1)] == []
+        assert [e.time for e in await get_overdue_sessions(0, None, MORNING_DEADLINE)] == ["07:00 AM"]
+        # Deadlines up to after_minute were handled by the previous run
+        assert [e.time for e in await get_overdue_sessions(0, MORNING_DEADLINE, EVENING_DEADLINE)] == ["09:00 PM"]
+        assert await get_overdue_sessions(0, EVENING_DEADLINE, 1439) == []
+
+    @pytest.mark.anyio
+    async def test_checkpoint_only_moves_forward(self, document_database):
+        run_date = date(2024, 5, 6)
+        checkpoint = await get_or_create_checkpoint(MARK_NOT_DONE_JOB, run_date)
+        # Left by an earlier run; mongomock cannot $max over the initial null
+        checkpoint.last_minute = 300
+        await checkpoint.save()
+        result = {"overdue": 2, "modified": 2, "duration": 0.1}
+
+        await complete_mark_not_done([result], run_date, 600, time.time())
+        # An older run finishing last does not move it back
+        await complete_mark_not_done([result], run_date, 540, time.time())
+
+        checkpoint = await JobCheckpoint.find_one(JobCheckpoint.job == MARK_NOT_DONE_JOB)
+        assert checkpoint.last_minute == 600
+        assert checkpoint.processed == 4
+
+    @pytest.mark.anyio
+    async def test_session_without_steps_added_after_the_checkpoint(self, document_database):
+        routine = await create_routine_for_new_user(PydanticObjectId())
+        # The morning deadline was already handled when the session is added
+        checkpoint_minute = MORNING_DEADLINE
+        routine.days[0].sessions.append(Session(time="03:00 PM", steps=[]))
+        await routine.save()
+        await sync_routine_schedule(routine)
+
+        assert await get_overdue_sessions(0, checkpoint_minute, 15 * 60 + 60) == []
+        overdue = await get_overdue_sessions(0, checkpoint_minute, 15 * 60 + 61)
+        assert [(entry.time, entry.steps_count) for entry in overdue] == [("03:00 PM", 0)]
+
+    @pytest.mark.anyio
+    @pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+    async def test_only_overdue_pending_sessions_are_marked(self, database):
+        pending = await create_routine_for_new_user(PydanticObjectId())
+        done = await create_routine_for_new_user(PydanticObjectId())
+        done.days[0].sessions[0].status = "done"
+        await done.save()
+
+        result = await real_mark_not_done_shard(0, None, MORNING_DEADLINE)
+
+        assert (result["overdue"], result["modified"]) == (2, 1)
+        pending = await Routine.get(pending.id)
+        assert statuses(pending, 0) == ["not_done", "pending"]
+        assert statuses(pending, 1) == ["pending", "pending"]
+        assert statuses(await Routine.get(done.id), 0) == ["done", "pending"]
+
+
+async def mark_sessions(routine: Routine, status: str):
+    for day in routine.days:
+        for session in day.sessions:
+            session.status = status
+    await routine.save()
+
+
+class TestResetSessionsStatus:
+    @pytest.mark.anyio
+    async def test_repeat_run_on_the_same_date_does_nothing(self, document_database):
+        routine = await create_routine_for_new_user(PydanticObjectId())
+        await mark_sessions(routine, "done")
+        checkpoint = await get_or_create_checkpoint(RESET_SESSIONS_JOB, datetime.now().date())
+        checkpoint.completed = True
+        await checkpoint.save()
+
+        await real_reset_sessions_status()
+
+        assert statuses(await Routine.get(routine.id), 0) == ["done", "done"]
+
+    @pytest.mark.anyio
+    @pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+    async def test_reset_runs_once_per_date(self, database):
+        routine = await create_routine_for_new_user(PydanticObjectId())
+        await mark_sessions(routine, "done")
+
+        await real_reset_sessions_status()
+        assert all(statuses(await Routine.get(routine.id), weekday) == ["pending", "pending"] for weekday in range(7))
+
+        await mark_sessions(routine, "not_done")
+        await real_reset_sessions_status()
+        assert statuses(await Routine.get(routine.id), 0) == ["not_done", "not_done"]
+
+    @pytest.mark.anyio
+    @pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+    async def test_chunked_reset(self, database):
+        routines = [await create_routine_for_new_user(PydanticObjectId()) for _ in range(5)]
+        for routine in routines[1:]:
+            await mark_sessions(routine, "not_done")
+
+        await real_reset_sessions_status(chunk_size=2)
+
+        for routine in routines:
+            assert all(statuses(await Routine.get(routine.id), weekday) == ["pending", "pending"] for weekday in range(7))
+        checkpoint = await JobCheckpoint.find_one(JobCheckpoint.job == RESET_SESSIONS_JOB)
+        assert checkpoint.completed
+        assert checkpoint.processed == 4
+        # The last full chunk ends at the fourth routine, the fifth is reset by the open-ended tail
+        assert checkpoint.last_id == sorted(routine.id for routine in routines)[3]
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from database.redis_client import run_exclusive
+from service.scheduler_service import SchedulerLeader
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_REDIS_URL, reason="TEST_REDIS_URL is not set")
+
+
+@pytest.fixture(autouse=True)
+def redis_url(monkeypatch):
+    monkeypatch.setenv("REDIS_URL", TEST_REDIS_URL or "")
+
+
+class TestSchedulerLeader:
+    @pytest.mark.anyio
+    async def test_only_one_process_leads(self):
+        first = SchedulerLeader(key="test:scheduler:leader", ttl=5)
+        second = SchedulerLeader(key="test:scheduler:leader", ttl=5)
+        try:
+            assert await first.refresh()
+            assert not await second.refresh()
+            assert await first.refresh()
+
+            await first.release()
+            assert await second.refresh()
+        finally:
+            await first.release()
+            await second.release()
+
+    @pytest.mark.anyio
+    async def test_overlapping_runs_are_skipped(self):
+        calls = []
+
+        async def job():
+            calls.append(await run_exclusive("test_overlap", inner, ttl=5))
+            return "outer"
+
+        async def inner():
+            return "inner"
+
+        assert await run_exclusive("test_overlap", job, ttl=5) == "outer"
+        assert calls == [None]
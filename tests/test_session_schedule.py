@@ -0,0 +1,110 @@
+from unittest.mock import patch
+
+import pytest
+from beanie import PydanticObjectId, init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
+from models.routine import Day, day_from_input, find_day, parse_session_time, weekday_index
+from models.schedule import SessionSchedule
+from service.routine_service import summarize_shard_results
+from service.schedule_service import due_sessions_query, routine_id_range, split_schedule_shards
+
+
+class TestSessionTimeParsing:
+    def test_twelve_hour_times(self):
+        assert parse_session_time("07:00 AM") == 7 * 60
+        assert parse_session_time("09:30 PM") == 21 * 60 + 30
+        assert parse_session_time("12:05 AM") == 5
+        assert parse_session_time(" 08:00 pm ") == 20 * 60
+
+    def test_twenty_four_hour_times(self):
+        assert parse_session_time("19:45") == 19 * 60 + 45
+
+    def test_invalid_time(self):
+        assert parse_session_time("soon") is None
+
+    def test_weekday_index(self):
+        assert weekday_index("Monday") == 0
+        assert weekday_index("sunday") == 6
+        assert weekday_index("Funday") is None
+
+
+class TestDerivedRoutineFields:
+    def test_missing_day_and_session_fields_are_derived(self):
+        day = Day.model_validate({
+            "day_of_week": "Wednesday",
+            "sessions": [{"time": "08:15 PM", "steps": []}]
+        })
+
+        assert day.weekday == 2
+        assert day.sessions[0].minute_of_day == 20 * 60 + 15
+
+    def test_stored_fields_are_trusted_on_load(self):
+        stored = {
+            "day_of_week": "Wednesday",
+            "weekday": 2,
+            "sessions": [{"time": "08:15 PM", "minute_of_day": 20 * 60 + 15, "steps": []}]
+        }
+
+        with patch("models.routine.parse_session_time") as parse, patch("models.routine.weekday_index") as index:
+            day = Day.model_validate(stored)
+
+        parse.assert_not_called()
+        index.assert_not_called()
+        assert (day.weekday, day.sessions[0].minute_of_day) == (2, 20 * 60 + 15)
+
+    def test_client_days_are_derived_afresh(self):
+        sent = Day.model_validate({
+            "day_of_week": "Wednesday",
+            "weekday": 0,
+            "sessions": [{"time": "08:15 PM", "minute_of_day": 1, "steps": []}]
+        })
+
+        day = day_from_input(sent)
+
+        assert day.weekday == 2
+        assert day.sessions[0].minute_of_day == 20 * 60 + 15
+
+    def test_find_day_by_weekday(self):
+        days = [Day(day_of_week=name, sessions=[]) for name in ["Monday", "Tuesday", "Sunday"]]
+
+        assert find_day(days, 6).day_of_week == "Sunday"
+        assert find_day(days, 3) is None
+        assert find_day(days, None) is None
+
+
+class TestScheduleShards:
+    def test_routine_id_range_bounds(self):
+        lower, upper = str(PydanticObjectId()), str(PydanticObjectId())
+
+        assert routine_id_range() == {}
+        assert routine_id_range(lower, None) == {"routine_id": {"$gte": PydanticObjectId(lower)}}
+        assert routine_id_range(None, upper) == {"routine_id": {"$lt": PydanticObjectId(upper)}}
+
+    @pytest.mark.anyio
+    async def test_small_workloads_are_not_sharded(self):
+        client = AsyncMongoMockClient()
+        await init_beanie(document_models=[SessionSchedule], database=client.get_database(name="shards"))
+        await SessionSchedule.insert_many([
+            SessionSchedule(
+                routine_id=PydanticObjectId(), user_id=PydanticObjectId(), push_token="token",
+                weekday=0, minute_of_day=60, time="01:00 AM", steps_count=1, deadline_minute=121
+            )
+            for _ in range(5)
+        ])
+
+        assert await split_schedule_shards(due_sessions_query(0, 60), 10, 4) == [(None, None)]
+        assert await split_schedule_shards(due_sessions_query(1, 60), 10, 4) == []
+
+    def test_shard_results_are_aggregated(self):
+        results = [
+            {"lower": None, "upper": "b", "due": 3, "sent": 2, "duration": 0.5},
+            {"lower": "b", "upper": None, "due": 4, "sent": 4, "duration": 0.25},
+        ]
+
+        summary = summarize_shard_results("cron_notification", results, 0)
+
+        assert summary["shards"] == 2
+        assert summary["due"] == 7
+        assert summary["sent"] == 6
+        assert summary["durations"] == [0.5, 0.25]
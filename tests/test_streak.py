@@ -0,0 +1,100 @@
+import os
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from beanie import PydanticObjectId, init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+import models as models
+from models.tracker import Tracker
+from service.tracker_service import _streak_runs_pipeline, _streak_update, compute_streak
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+TODAY = date(2024, 5, 10)
+WINDOW_START = datetime.combine(TODAY - timedelta(days=35), time.min)
+
+
+def days_ago(*offsets):
+    return [TODAY - timedelta(days=offset) for offset in offsets]
+
+
+class TestComputeStreak:
+    def test_no_trackers(self):
+        assert compute_streak([], TODAY) == (0, 0, None)
+
+    def test_run_ending_today(self):
+        assert compute_streak(days_ago(0, 1, 2), TODAY) == (3, 3, TODAY)
+
+    def test_run_ending_yesterday_is_kept(self):
+        assert compute_streak(days_ago(1, 2), TODAY) == (2, 2, TODAY - timedelta(days=1))
+
+    def test_gap_breaks_current_streak(self):
+        assert compute_streak(days_ago(2, 3, 4), TODAY) == (0, 3, TODAY - timedelta(days=2))
+
+    def test_longest_streak_from_history(self):
+        dates = days_ago(0, 1, 5, 6, 7, 8)
+        assert compute_streak(dates, TODAY) == (2, 4, TODAY)
+
+    def test_duplicate_and_future_dates_are_ignored(self):
+        dates = days_ago(0, 0, 1, -3)
+        assert compute_streak(dates, TODAY) == (2, 2, TODAY)
+
+
+class TestStreakUpdate:
+    def test_run_inside_the_window_is_set(self):
+        user_id = PydanticObjectId()
+        last_tracked = WINDOW_START + timedelta(days=10)
+        doc = {"_id": user_id, "last_tracked_date": last_tracked,
+               "run": {"count": 3, "next": last_tracked - timedelta(days=3)}}
+
+        assert _streak_update(doc, WINDOW_START) == UpdateOne(
+            {"_id": user_id, "$or": [{"last_tracked_date": {"$lte": last_tracked}}, {"last_tracked_date": None}]},
+            {"$set": {"streak": 3, "last_tracked_date": last_tracked}, "$max": {"longest_streak": 3}}
+        )
+
+    def test_run_reaching_the_window_start_never_shortens(self):
+        user_id = PydanticObjectId()
+        last_tracked = WINDOW_START + timedelta(days=1)
+        doc = {"_id": user_id, "last_tracked_date": last_tracked,
+               "run": {"count": 2, "next": WINDOW_START - timedelta(days=1)}}
+
+        assert _streak_update(doc, WINDOW_START) == UpdateOne(
+            {"_id": user_id, "$or": [{"last_tracked_date": {"$lte": last_tracked}}, {"last_tracked_date": None}]},
+            {"$set": {"last_tracked_date": last_tracked}, "$max": {"streak": 2, "longest_streak": 2}}
+        )
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+class TestStreakRunsPipeline:
+    @pytest.mark.anyio
+    async def test_runs_per_user(self):
+        client = AsyncIOMotorClient(TEST_DATABASE_URL)
+        database = client.get_default_database()
+        await client.drop_database(database.name)
+        await init_beanie(database=database, document_models=models.__all__)
+        today_at = datetime.combine(TODAY, time.min)
+        window_start = today_at - timedelta(days=35)
+        today_user, yesterday_user, broken_user = PydanticObjectId(), PydanticObjectId(), PydanticObjectId()
+        for user_id, offsets in [
+            (today_user, [0, 0, 1, 2, 4]),
+            (yesterday_user, [1, 2]),
+            (broken_user, [3, 4]),
+        ]:
+            for offset in offsets:
+                await Tracker(user_id=user_id, date=TODAY - timedelta(days=offset)).create()
+
+        try:
+            rows = await Tracker.aggregate(_streak_runs_pipeline(today_at, window_start, None)).to_list()
+            runs = {row["_id"]: (row["run"]["count"], row["last_tracked_date"]) for row in rows}
+
+            assert runs == {
+                today_user: (3, today_at),
+                yesterday_user: (2, today_at - timedelta(days=1)),
+                broken_user: (0, today_at - timedelta(days=3)),
+            }
+            resumed = await Tracker.aggregate(_streak_runs_pipeline(today_at, window_start, min(runs))).to_list()
+            assert [row["_id"] for row in resumed] == sorted(runs)[1:]
+        finally:
+            await client.drop_database(database.name)
@@ -0,0 +1,30 @@
+from datetime import date, datetime
+
+import pytest
+from beanie import PydanticObjectId
+
+from models.tracker import Tracker
+from service.tracker_service import current_week_utc7, get_tracker_days
+
+
+class TestTrackerDays:
+    @pytest.mark.anyio
+    async def test_trackers_grouped_by_day(self, document_database):
+        user_id = PydanticObjectId()
+        first = await Tracker(user_id=user_id, date=date(2024, 1, 2)).create()
+        second = await Tracker(user_id=user_id, date=date(2024, 1, 2)).create()
+        # Older trackers were stored with a time of day
+        await Tracker.get_motor_collection().insert_one({"user_id": user_id, "date": datetime(2024, 1, 7, 23, 30)})
+        await Tracker(user_id=user_id, date=date(2024, 1, 8)).create()
+        await Tracker(user_id=PydanticObjectId(), date=date(2024, 1, 3)).create()
+
+        days = await get_tracker_days(user_id, date(2024, 1, 1), date(2024, 1, 7))
+
+        assert sorted(days) == ["2024-01-02", "2024-01-07"]
+        assert sorted(days["2024-01-02"]) == sorted([str(first.id), str(second.id)])
+
+    def test_current_week_runs_monday_to_sunday(self):
+        start, end = current_week_utc7()
+
+        assert start.weekday() == 0
+        assert (end - start).days == 6
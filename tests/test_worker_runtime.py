@@ -0,0 +1,46 @@
+import asyncio
+
+from database.celery_worker import WorkerRuntime
+
+
+class TestWorkerRuntime:
+    def test_tasks_share_one_loop_and_one_initialization(self):
+        initialized = []
+
+        async def initializer():
+            initialized.append(asyncio.get_running_loop())
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        runtime = WorkerRuntime(initializer=initializer)
+        try:
+            loops = {runtime.run(current_loop()) for _ in range(3)}
+        finally:
+            runtime.shutdown()
+
+        assert len(loops) == 1
+        assert initialized == list(loops)
+
+    def test_failed_initialization_is_retried(self):
+        attempts = []
+
+        async def initializer():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError("database unavailable")
+
+        async def answer():
+            return 42
+
+        runtime = WorkerRuntime(initializer=initializer)
+        try:
+            try:
+                runtime.run(answer())
+            except ConnectionError:
+                pass
+            assert runtime.run(answer()) == 42
+        finally:
+            runtime.shutdown()
+
+        assert len(attempts) == 2